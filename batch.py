@@ -0,0 +1,103 @@
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Compiler options of each worker process, set once by init_worker
+worker_options = None
+
+
+def collect_sources(paths):
+    """Expand directories into the .hp files under them, keeping the order given"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                sources += [os.path.join(root, name) for name in sorted(files) if name.endswith('.hp')]
+        else:
+            sources.append(path)
+    return list(dict.fromkeys(sources))
+
+
+def print_summary(results, wall_time, workers):
+    """Print per-file results, (source, success, seconds), and the total wall time"""
+    width = max(len(source) for source, _, _ in results)
+    print(f"\nBuilt {sum(success for _, success, _ in results)}/{len(results)} programs with {workers}:")
+    for source, success, seconds in results:
+        print(f"  {source:<{width}}  {'ok    ' if success else 'FAILED'}  {seconds * 1000:8.1f} ms")
+    print(f"Total wall time: {wall_time * 1000:.1f} ms")
+
+
+def init_worker(options):
+    """Import the whole pipeline in a worker before its first file"""
+    global worker_options
+    import compiler, lexer, parser, sem_analyser, optimizer, generator  # noqa: F401
+    if options.get('backend') == 'ir':
+        import ir_lowering, ir_passes, ir_codegen  # noqa: F401
+    worker_options = options
+
+
+def compile_job(input_file, keep_c):
+    """Compile one file in a worker, returning (success, captured output, seconds)"""
+    from compiler import HinglishCompiler, choose_profile
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        # Without an explicit profile every program gets its own tuned flags
+        profile = choose_profile(worker_options['profile'], input_file,
+                                 worker_options.get('pgo', False), worker_options.get('verbose', False))
+        compiler = HinglishCompiler(**dict(worker_options, profile=profile))
+        success = compiler.compile(input_file, keep_c=keep_c)
+    return success, output.getvalue(), time.perf_counter() - start
+
+
+class BatchCompiler:
+    """Compiles many programs in a pool of worker processes.
+
+    Workers import the pipeline once and run gcc for their own files, so
+    up to `jobs` gcc processes build at once.  Output is captured per file
+    and printed in input order, however the builds finish.  Programs to run
+    afterwards run one at a time, also in input order.
+    """
+
+    def __init__(self, options, jobs=1, keep_c=False, run_after=False):
+        self.options = options  # HinglishCompiler keyword arguments; profile None means per-program
+        self.jobs = jobs
+        self.keep_c = keep_c
+        self.run_after = run_after
+        self.results = []       # (input file, success, seconds) in input order
+
+    def compile(self, paths):
+        """Compile every program under paths; True if all of them built"""
+        sources = collect_sources(paths)
+        if not sources:
+            print("Error: No .hp files found")
+            return False
+
+        start = time.perf_counter()
+        self.results = []
+        with ProcessPoolExecutor(self.jobs, initializer=init_worker, initargs=(self.options,)) as pool:
+            futures = [pool.submit(compile_job, source, self.keep_c) for source in sources]
+            for source, future in zip(sources, futures):
+                try:
+                    success, output, seconds = future.result()
+                except Exception as e:
+                    success, output, seconds = False, f"Error compiling '{source}': {e}\n", 0.0
+                if not success:
+                    print(f"{source}:")  # Failure messages do not name the file themselves
+                print(output, end="")
+                self.results.append((source, success, seconds))
+
+        print_summary(self.results, time.perf_counter() - start,
+                      f"{self.jobs} job{'s' if self.jobs != 1 else ''}")
+        success = all(success for _, success, _ in self.results)
+
+        if self.run_after:
+            from compiler import HinglishCompiler
+            runner = HinglishCompiler(verbose=self.options.get('verbose', False))
+            for source, built, _ in self.results:
+                if built and not runner.run_executable(os.path.splitext(source)[0]):
+                    success = False
+        return success
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Latency benchmark for fused analysis and code generation: time per
+# transpilation with and without --fused, at -O0 on the AST backend.
+
+import argparse
+import statistics
+import sys
+import time
+
+from service import TranspileService
+
+
+def measure(services, source, rounds):
+    """Transpile source `rounds` times with each service, taking turns so
+    neither runs on a warmer machine; returns the last result of each service
+    and per-call seconds, end to end and after parsing"""
+    results = [None] * len(services)
+    times = [([], []) for _ in services]
+    for _ in range(rounds):
+        for index, service in enumerate(services):
+            start = time.perf_counter()
+            results[index] = service.transpile(source)
+            total = time.perf_counter() - start
+            front = results[index].timings.get('lex', 0) + results[index].timings.get('parse', 0)
+            times[index][0].append(total)
+            times[index][1].append(total - front)
+    return results, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fused against two-pass transpilation')
+    parser.add_argument('files', nargs='*', default=['example.hp'], help='Hinglish programs to transpile')
+    parser.add_argument('--rounds', type=int, default=50, help='Transpilations of each file per mode')
+    args = parser.parse_args()
+
+    services = [TranspileService(), TranspileService(fused=True)]
+    print(f"Python {sys.version.split()[0]}, median of {args.rounds} transpilations, -O0 AST backend")
+    for path in args.files:
+        with open(path) as f:
+            source = f.read()
+        (expected, result), (before, after) = measure(services, source, args.rounds)
+        if expected.c_code is None:
+            raise SystemExit(f"{path}: {expected.errors[0]}")
+        if (result.c_code, result.errors) != (expected.c_code, expected.errors):
+            raise SystemExit(f"{path}: fused transpilation differs from two-pass")
+        (before, before_back), (after, after_back) = [[statistics.median(t) for t in mode] for mode in (before, after)]
+        print(f"  {path}: two-pass {before * 1000:9.3f} ms  fused {after * 1000:9.3f} ms  ({before / after:.2f}x)  "
+              f"analysis and generation {before_back * 1000:.3f} -> {after_back * 1000:.3f} ms "
+              f"({before_back / after_back:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Stress benchmark for TranspileService: throughput by number of threads.
+# Scaling beyond one thread needs a free-threaded (no GIL) CPython build.
+
+import argparse
+import os
+import sys
+import sysconfig
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from service import TranspileService
+
+
+def gil_enabled():
+    check = getattr(sys, '_is_gil_enabled', None)
+    return check() if check else True
+
+
+def run(service, sources, threads, rounds):
+    """Transpile every source `rounds` times on `threads` threads; return seconds taken"""
+    work = sources * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(service.transpile, work))
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result.success]
+    if failed:
+        raise SystemExit(f"{len(failed)} transpilations failed, e.g. {failed[0].errors}")
+    # Every thread must see the same output as a lone call would
+    expected = {source: service.transpile(source).c_code for source in sources}
+    if any(result.c_code != expected[source] for source, result in zip(work, results)):
+        raise SystemExit("Concurrent transpilations produced different C code")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent TranspileService calls')
+    parser.add_argument('files', nargs='*', default=['example.hp'], help='Hinglish programs to transpile')
+    parser.add_argument('--threads', default='1,2,4,8', help='Comma-separated thread counts (default: 1,2,4,8)')
+    parser.add_argument('--rounds', type=int, default=200, help='Transpilations of each file per run')
+    parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument('--backend', choices=['ast', 'ir'], default='ast')
+    args = parser.parse_args()
+
+    sources = []
+    for path in args.files:
+        with open(path) as f:
+            sources.append(f.read())
+    service = TranspileService(opt_level=args.opt_level, backend=args.backend)
+    calls = len(sources) * args.rounds
+
+    build = "free-threaded" if sysconfig.get_config_var("Py_GIL_DISABLED") else "standard"
+    print(f"Python {sys.version.split()[0]} ({build} build, GIL {'enabled' if gil_enabled() else 'disabled'}), "
+          f"{os.cpu_count()} CPUs, {calls} transpilations per run")
+
+    baseline = None
+    for threads in (int(count) for count in args.threads.split(',')):
+        seconds = run(service, sources, threads, args.rounds)
+        throughput = calls / seconds
+        baseline = baseline or throughput
+        print(f"  {threads:3d} threads: {throughput:9.1f} transpilations/s  ({throughput / baseline:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import contextlib
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # Bytes of cache entries kept before eviction
+
+
+def cache_root():
+    """Directory holding hpc's caches, overridable with HPC_CACHE_DIR"""
+    if os.environ.get("HPC_CACHE_DIR"):
+        return os.environ["HPC_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "hpc")
+
+
+@functools.lru_cache(maxsize=None)
+def transpiler_version():
+    """Digest of the transpiler's own modules, so editing any of them invalidates the cache"""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(MODULE_DIR)):
+        if name.endswith(".py"):
+            digest.update(name.encode())
+            with open(os.path.join(MODULE_DIR, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def gcc_version():
+    try:
+        result = subprocess.run(['gcc', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        return ""
+    return result.stdout.decode()
+
+
+class BuildCache:
+    """Content-addressed cache of generated C and executables.
+
+    Entries are directories named by the hash of everything a build depends
+    on: the source, the transpiler, gcc and the flags.  They are built in a
+    staging directory and renamed into place, so a visible entry is always
+    complete.  A lock file serializes writers; readers share it, so eviction
+    never removes an entry while it is being copied out.  Using an entry
+    bumps its modification time, and eviction removes the least recently
+    used entries once the cache grows beyond max_size.
+
+    With a remote cache, local misses read through to it and new entries
+    are uploaded to it, so machines sharing a remote build each program once.
+    """
+
+    ENTRY_EXECUTABLE = "program"
+    ENTRY_C = "program.c"
+    ARTIFACTS = [ENTRY_EXECUTABLE, ENTRY_C]
+
+    def __init__(self, root=None, max_size=DEFAULT_MAX_SIZE, remote=None):
+        self.root = root or os.path.join(cache_root(), "build")
+        self.max_size = max_size
+        self.remote = remote  # Shared cache such as an HTTPRemoteCache, or None
+        self.entries_dir = os.path.join(self.root, "entries")
+        self.staging_dir = os.path.join(self.root, "tmp")
+        self.stats_file = os.path.join(self.root, "stats.json")
+
+    def key(self, source_code, options):
+        """Hash of the source and everything else that affects the build"""
+        digest = hashlib.sha256()
+        for part in [source_code, transpiler_version(), gcc_version()] + list(options):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @contextlib.contextmanager
+    def locked(self, exclusive):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "lock"), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def fetch(self, key, output_file, c_file=None):
+        """Put the cached executable (and C code) for key in place; False on a miss"""
+        entry = os.path.join(self.entries_dir, key)
+        with self.locked(exclusive=False):
+            hit = os.path.isdir(entry)
+            if hit:
+                self.place(os.path.join(entry, self.ENTRY_EXECUTABLE), output_file)
+                if c_file:
+                    shutil.copyfile(os.path.join(entry, self.ENTRY_C), c_file)
+                os.utime(entry)
+        if hit:
+            self.count("hits")
+        elif self.remote and self.fetch_remote(key, output_file, c_file):
+            self.count("remote_hits")
+            hit = True
+        else:
+            self.count("misses")
+        return hit
+
+    def fetch_remote(self, key, output_file, c_file=None):
+        """Download an entry from the remote cache, keep it locally and put it in place"""
+        staging = self.staging()
+        for name in self.ARTIFACTS:
+            data = self.remote.get(key, name)
+            if data is None:
+                shutil.rmtree(staging)
+                return False
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(data)
+        os.chmod(os.path.join(staging, self.ENTRY_EXECUTABLE), 0o755)
+
+        self.place(os.path.join(staging, self.ENTRY_EXECUTABLE), output_file)
+        if c_file:
+            shutil.copyfile(os.path.join(staging, self.ENTRY_C), c_file)
+        self.publish(key, staging)
+        return True
+
+    def place(self, cached, output_file):
+        """Hard-link a cached file to output_file, copying across file systems"""
+        temporary = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            os.link(cached, temporary)
+        except OSError:
+            shutil.copy2(cached, temporary)
+        os.replace(temporary, output_file)
+
+    def staging(self):
+        """New directory in which a build writes a future entry"""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return tempfile.mkdtemp(dir=self.staging_dir)
+
+    def store(self, key, staging, executable):
+        """Turn a staging directory holding the C code into the entry for key"""
+        shutil.copy2(executable, os.path.join(staging, self.ENTRY_EXECUTABLE))
+        if self.remote:
+            for name in self.ARTIFACTS:
+                with open(os.path.join(staging, name), 'rb') as f:
+                    self.remote.put(key, name, f.read())
+        self.publish(key, staging)
+
+    def publish(self, key, staging):
+        """Rename a complete staging directory into the entry for key"""
+        entry = os.path.join(self.entries_dir, key)
+        with self.locked(exclusive=True):
+            if os.path.isdir(entry):
+                shutil.rmtree(staging)  # A parallel build stored the same entry first
+            else:
+                os.makedirs(self.entries_dir, exist_ok=True)
+                os.rename(staging, entry)
+            self.evict()
+
+    def entries(self):
+        """(last use, size in bytes, path) of every entry"""
+        if not os.path.isdir(self.entries_dir):
+            return []
+        result = []
+        for name in os.listdir(self.entries_dir):
+            path = os.path.join(self.entries_dir, name)
+            size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+            result.append((os.path.getmtime(path), size, path))
+        return result
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits; caller holds the lock"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path)
+            total -= size
+
+    def count(self, field):
+        with self.locked(exclusive=True):
+            counts = self.counts()
+            counts[field] = counts.get(field, 0) + 1
+            with open(self.stats_file, 'w') as f:
+                json.dump(counts, f)
+
+    def counts(self):
+        try:
+            with open(self.stats_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def stats(self):
+        """Entry count, total size and hit/miss counters"""
+        with self.locked(exclusive=False):
+            entries = self.entries()
+            counts = self.counts()
+        return {
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+            "max_size": self.max_size,
+            "hits": counts.get("hits", 0),
+            "remote_hits": counts.get("remote_hits", 0),
+            "misses": counts.get("misses", 0),
+        }
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self.locked(exclusive=True):
+            shutil.rmtree(self.entries_dir, ignore_errors=True)
+            if os.path.exists(self.stats_file):
+                os.remove(self.stats_file)
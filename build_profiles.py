@@ -0,0 +1,43 @@
+# gcc build profiles: how the generated C is turned into an executable
+
+
+class BuildProfile:
+    """Optimization flags plus the link-time options a profile turns on"""
+
+    def __init__(self, name, opt_flags, static=False, gc_sections=False, strip=False, description=""):
+        self.name = name
+        self.opt_flags = opt_flags      # Passed to gcc before anything else
+        self.static = static            # Link statically for self-contained binaries
+        self.gc_sections = gc_sections  # Drop unused functions and data at link time
+        self.strip = strip              # Remove symbols from the executable
+        self.description = description
+
+    def gcc_flags(self, static=None, extra_flags=()):
+        """Return the gcc flags for this profile; static overrides the profile default"""
+        flags = list(self.opt_flags)
+        if self.gc_sections:
+            flags += ["-ffunction-sections", "-fdata-sections", "-Wl,--gc-sections"]
+        if self.static if static is None else static:
+            flags.append("-static")
+        if self.strip:
+            flags.append("-s")
+        return flags + list(extra_flags)
+
+    def __repr__(self):
+        return f"BuildProfile({self.name}, {self.opt_flags})"
+
+
+PROFILES = {
+    "debug": BuildProfile("debug", ["-O0", "-g"],
+                          description="No optimization, with debug info"),
+    "release": BuildProfile("release", ["-O2"], gc_sections=True, strip=True,
+                            description="Optimized, portable binary"),
+    "fast": BuildProfile("fast", ["-O3", "-march=native"], gc_sections=True, strip=True,
+                         description="Fastest code for the building machine only"),
+    "size": BuildProfile("size", ["-Os"], gc_sections=True, strip=True,
+                         description="Smallest binary"),
+    "lto": BuildProfile("lto", ["-O2", "-flto"], static=True, gc_sections=True, strip=True,
+                        description="Whole-program optimized, statically linked binary"),
+}
+
+DEFAULT_PROFILE = "debug"
@@ -0,0 +1,37 @@
+# C spellings shared by the AST and IR backends: types, includes, printing
+# and string escapes
+
+# C spelling of each Hinglish type; comparisons produce `ank`
+C_TYPES = {
+    "ank": "int",
+    "sankhya": "float",
+    "vakya": "char*",
+    "akshar": "char",
+}
+
+PRINT_FORMATS = {"ank": "%d", "sankhya": "%f", "vakya": "%s", "akshar": "%c"}
+
+STANDARD_INCLUDES = ["#include <stdio.h>", "#include <stdlib.h>", "#include <string.h>"]
+RUNTIME_INCLUDES = ['#include "hinglish_rt.h"']
+
+C_ESCAPES = {"\n": "\\n", "\t": "\\t", "\r": "\\r", "\0": "\\0", "\\": "\\\\"}
+
+
+def print_call(value_type, expr, runtime=False):
+    """C statement printing a value of a Hinglish type on its own line"""
+    if runtime:
+        return f"hrt_print_{value_type}({expr});"
+    return f'printf("{PRINT_FORMATS[value_type]}\\n", {expr});'
+
+
+def escape(text, quote):
+    """Escape a string for use inside a C literal delimited by quote"""
+    result = []
+    for char in text:
+        if char in C_ESCAPES:
+            result.append(C_ESCAPES[char])
+        elif char == quote:
+            result.append("\\" + char)
+        else:
+            result.append(char)
+    return "".join(result)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Reference server for the remote build cache, for local testing and small teams
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from remote_cache import DIGEST_HEADER
+
+ARTIFACT_PATH = re.compile(r"^/([0-9a-f]{64})/([A-Za-z0-9_-][A-Za-z0-9._-]*)$")
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET and PUT of `/<key>/<name>` from the server's directory.
+
+    Each artifact is stored after a line holding the SHA-256 its upload
+    was checked against, which GET sends back so clients can verify it.
+    """
+
+    def artifact_path(self):
+        match = ARTIFACT_PATH.match(self.path)
+        if not match:
+            self.send_error(400, "Expected /<sha256 key>/<artifact name>")
+            return None
+        return os.path.join(self.server.directory, *match.groups())
+
+    def do_GET(self):
+        path = self.artifact_path()
+        if path is None:
+            return
+        try:
+            with open(path, 'rb') as f:
+                digest = f.readline().strip().decode('ascii', 'replace')
+                data = f.read()
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(DIGEST_HEADER, digest)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        path = self.artifact_path()
+        if path is None:
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        digest = hashlib.sha256(data).hexdigest()
+        if self.headers.get(DIGEST_HEADER) != digest:
+            self.send_error(400, f"Body does not match its {DIGEST_HEADER} header")
+            return
+
+        # Written beside the target and renamed, so readers never see half an artifact
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(digest.encode('ascii') + b"\n")
+            f.write(data)
+        os.replace(temporary, path)
+
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CacheServer(ThreadingHTTPServer):
+    def __init__(self, address, directory, verbose=False):
+        super().__init__(address, CacheRequestHandler)
+        self.directory = directory
+        self.verbose = verbose
+        os.makedirs(directory, exist_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reference remote build cache server for hpc')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--dir', default='hpc-remote-cache', help='Directory storing the artifacts')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = CacheServer((args.host, args.port), args.dir, args.verbose)
+    print(f"Serving build cache from '{args.dir}' on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
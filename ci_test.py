@@ -1,4 +1,4 @@
-from test import run_test, run_generator_test, tests, code_gen_tests
+from test import run_test, run_generator_test, tests, code_gen_tests, system_tests
 import sys
 import xml.etree.ElementTree as ET
 import datetime
@@ -61,11 +61,12 @@ def run_test_ci(name, source_code, expected_pattern=None, expect_semantic_errors
         print(f"❌ (error: {type(e).__name__})")
         return False
 
-def run_generator_test_ci(name, source_code, expected_output=None):
+def run_generator_test_ci(name, source_code, expected_output=None, opt_level=0, backend="ast", runtime=False):
     """Run a code generation test with minimal output for CI environments"""
     print(f"Running code gen test: {name}...", end=" ")
     
-    from test import Lexer, Parser, SemanticAnalyzer, CodeGenerator
+    from test import (Lexer, Parser, SemanticAnalyzer, CodeGenerator, FusedGenerator, Optimizer,
+                      IRLowering, PassManager, IREmitter, runtime_gcc_args)
     import tempfile, subprocess, os
     
     try:
@@ -74,28 +75,40 @@ def run_generator_test_ci(name, source_code, expected_output=None):
         tokens = lexer.tokenize()
         parser = Parser(tokens)
         ast = parser.parse()
-        analyzer = SemanticAnalyzer()
-        
-        analysis_result = analyzer.analyze(ast)
+        if backend == "fused":
+            # Analysis happens while the C is generated
+            generator = FusedGenerator(runtime)
+            c_code = generator.generate(ast)
+            analysis_result = generator.analyzer.report()
+        else:
+            analyzer = SemanticAnalyzer()
+            analysis_result = analyzer.analyze(ast)
 
         if not analysis_result['success']:
             print("❌ (analysis failed)")
             return False
+        
+        if opt_level:
+            ast = Optimizer(opt_level).optimize(ast)
             
-        generator = CodeGenerator(analysis_result['symbol_table'])
-        c_code = generator.generate(ast)
+        if backend == "ir":
+            module = IRLowering().lower(ast)
+            PassManager(opt_level).run(module)
+            c_code = IREmitter(runtime).emit(module)
+        elif backend != "fused":
+            generator = CodeGenerator(analysis_result['symbol_table'], runtime=runtime, attributes=opt_level > 0)
+            c_code = generator.generate(ast)
         
         # Only attempt to compile and run if there's expected output to verify
         if expected_output is not None:
-            # Save C code to a temporary file
-            with tempfile.NamedTemporaryFile(suffix='.c', delete=False) as temp_c_file:
-                temp_c_path = temp_c_file.name
-                temp_c_file.write(c_code.encode())
+            # Only the executable needs a path, gcc reads the C code from stdin
+            with tempfile.NamedTemporaryFile(suffix='.exe', delete=False) as temp_exe_file:
+                temp_exe_path = temp_exe_file.name
             
             # Compile the C code
-            temp_exe_path = temp_c_path + '.exe'
             compile_result = subprocess.run(
-                ['gcc', temp_c_path, '-o', temp_exe_path], 
+                ['gcc', '-x', 'c', '-'] + (runtime_gcc_args() if runtime else []) + ['-o', temp_exe_path], 
+                input=c_code,
                 capture_output=True, 
                 text=True
             )
@@ -104,7 +117,7 @@ def run_generator_test_ci(name, source_code, expected_output=None):
                 print("❌ (compilation failed)")
                 
                 # Clean up
-                os.unlink(temp_c_path)
+                os.unlink(temp_exe_path)
                 return False
             
             # Run the compiled program
@@ -115,7 +128,6 @@ def run_generator_test_ci(name, source_code, expected_output=None):
             )
             
             # Clean up
-            os.unlink(temp_c_path)
             os.unlink(temp_exe_path)
             
             # Check output
@@ -134,6 +146,26 @@ def run_generator_test_ci(name, source_code, expected_output=None):
         print(f"❌ (error: {type(e).__name__})")
         return False
 
+def run_system_test_ci(name, test):
+    """Run a system test with minimal output for CI environments"""
+    print(f"Running system test: {name}...", end=" ")
+
+    import contextlib, io
+
+    # The components' own messages would interleave with the results
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            test()
+        print("✅")
+        return True
+    except AssertionError as e:
+        print(f"❌ ({e})" if str(e) else "❌ (assertion failed)")
+        return False
+    except Exception as e:
+        print(f"❌ (error: {type(e).__name__})")
+        return False
+
 def run_all_tests_with_junit():
     """Run all test cases with minimal console output and generate JUnit XML report"""
     # Initialize test counters
@@ -189,7 +221,10 @@ def run_all_tests_with_junit():
         result = run_generator_test_ci(
             test["name"], 
             test["source"], 
-            test.get("expected_output")
+            test.get("expected_output"),
+            test.get("opt_level", 0),
+            test.get("backend", "ast"),
+            test.get("runtime", False)
         )
         end_time = datetime.datetime.now()
         
@@ -203,9 +238,32 @@ def run_all_tests_with_junit():
             failure = ET.SubElement(test_case, "failure")
             failure.set("message", f"Code generation test {test['name']} failed")
     
+    # Run system tests
+    print("\nRunning system tests...")
+    sys_passed = 0
+    sys_total = len(system_tests)
+
+    for test in system_tests:
+        test_case = ET.SubElement(test_suite, "testcase")
+        test_case.set("name", test["name"])
+        test_case.set("classname", "SystemTests")
+
+        start_time = datetime.datetime.now()
+        result = run_system_test_ci(test["name"], test["test"])
+        end_time = datetime.datetime.now()
+
+        duration = (end_time - start_time).total_seconds()
+        test_case.set("time", str(duration))
+
+        if result:
+            sys_passed += 1
+        else:
+            failure = ET.SubElement(test_case, "failure")
+            failure.set("message", f"System test {test['name']} failed")
+    
     # Update test counts in XML
-    test_suite.set("tests", str(total + gen_total))
-    test_suite.set("failures", str((total - passed) + (gen_total - gen_passed)))
+    test_suite.set("tests", str(total + gen_total + sys_total))
+    test_suite.set("failures", str((total - passed) + (gen_total - gen_passed) + (sys_total - sys_passed)))
     
     # Print summary to console
     print(f"\nSUMMARY:")
@@ -213,14 +271,15 @@ def run_all_tests_with_junit():
     print(f"  - Syntax: {syntax_passed}/{total-semantic_total}")
     print(f"  - Semantics: {semantic_passed}/{semantic_total}")
     print(f"- Code generation: {gen_passed}/{gen_total} passed")
-    print(f"- Overall: {passed + gen_passed}/{total + gen_total} passed")
+    print(f"- System tests: {sys_passed}/{sys_total} passed")
+    print(f"- Overall: {passed + gen_passed + sys_passed}/{total + gen_total + sys_total} passed")
     
     # Write XML to file
     tree = ET.ElementTree(test_suite)
     tree.write("test-results.xml", encoding="utf-8", xml_declaration=True)
     
     # Return overall success/failure
-    return (passed + gen_passed) == (total + gen_total)
+    return (passed + gen_passed + sys_passed) == (total + gen_total + sys_total)
 
 if __name__ == "__main__":
     print("Running Transpiler CI tests...")
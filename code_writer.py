@@ -0,0 +1,86 @@
+import io
+
+INDENT = "    "
+
+
+class IndentCache(dict):
+    """Maps an indentation level to its prefix, building each prefix only once"""
+
+    def __missing__(self, level):
+        prefix = self[level] = INDENT * level
+        return prefix
+
+
+INDENTS = IndentCache()
+
+
+def is_binary_stream(stream):
+    """Whether a stream takes bytes rather than str.
+
+    Decided by the io base class when there is one, then by a 'b' in the
+    stream's mode, as for tempfile wrappers; anything else is taken as text.
+    """
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    if isinstance(stream, io.TextIOBase):
+        return False
+    mode = getattr(stream, "mode", "")
+    return isinstance(mode, str) and "b" in mode
+
+
+class CodeWriter:
+    """Buffered line writer for generated code.
+
+    Has the `append`/`extend` interface of the line lists the emitters used
+    to build, but writes to a stream instead: text streams get the lines as
+    they are, binary streams (files opened with 'wb', pipes, io.BytesIO) get
+    them encoded.  Lines are separated, not terminated, by newlines, so the
+    output matches "\\n".join of the same lines.
+    """
+
+    def __init__(self, stream, buffer_size=1 << 16, encoding="utf-8", binary=None):
+        self.stream = stream
+        self.binary = is_binary_stream(stream) if binary is None else binary
+        self.encoding = encoding
+        self.buffer_size = buffer_size  # Characters collected before a write
+        self.pending = []
+        self.pending_size = 0
+        self.started = False
+
+    def append(self, line):
+        """Write one line"""
+        if self.started:
+            self.pending.append("\n")
+        self.started = True
+        self.pending.append(line)
+        self.pending_size += len(line) + 1
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+
+    def extend(self, lines):
+        """Write several lines"""
+        for line in lines:
+            self.append(line)
+
+    def flush(self):
+        """Write out everything buffered so far"""
+        if not self.pending:
+            return
+        chunk = "".join(self.pending)
+        self.stream.write(chunk.encode(self.encoding) if self.binary else chunk)
+        self.pending = []
+        self.pending_size = 0
+
+
+class TeeStream:
+    """Binary stream that copies every write to several streams"""
+
+    mode = "wb"
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, data):
+        for stream in self.streams:
+            stream.write(data)
+        return len(data)
@@ -1,43 +1,110 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import contextlib
+import io
 import os
+import shlex
+import shutil
 import sys
 import subprocess
+import threading
+import time
 import traceback
+import weakref
+
+from build_cache import DEFAULT_MAX_SIZE, BuildCache
+from build_profiles import DEFAULT_PROFILE, PROFILES
+from code_writer import TeeStream
+from pgo import PGOBuilder
+from phases import PhaseTimer, count_nodes, counting_stream
+from visitor_profile import VisitorProfiler
+from tune import Tuner, load_tuned_profile, save_tuning
 
 class HinglishCompiler:
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, opt_level=0, lookup_tables=False,
+                 inline_max_size=16, inline_max_depth=3, backend="ast", dump_ir=False,
+                 profile=DEFAULT_PROFILE, static=None, gcc_flags=(),
+                 pgo=False, train_inputs=(), train_args=(), train_timeout=60,
+                 use_cache=False, cache_size=DEFAULT_MAX_SIZE, remote_cache=None,
+                 max_concurrent=None, separate=False, jobs=None, unit_size=1, runtime=True,
+                 stream=False, fused=False, time_phases=False, profile_visitors=False):
         self.verbose = verbose
+        self.opt_level = opt_level          # AST optimization level (0 disables passes)
+        self.lookup_tables = lookup_tables  # Precompute tables for pure functions
+        self.inline_max_size = inline_max_size
+        self.inline_max_depth = inline_max_depth
+        self.backend = backend              # "ast" or "ir"
+        self.dump_ir = dump_ir              # Print the optimized IR
+        # gcc build profile, by name or a BuildProfile such as a tuned one
+        self.profile = PROFILES[profile] if isinstance(profile, str) else profile
+        self.static = static                # Overrides the profile's static linking if set
+        self.gcc_flags = list(gcc_flags)    # Extra flags passed through to gcc
+        self.pgo = pgo                      # Build with profile-guided optimization
+        self.train_inputs = list(train_inputs)  # stdin files for PGO training runs
+        self.train_args = list(train_args)      # Argument lists for PGO training runs
+        self.train_timeout = train_timeout
+        self.use_cache = use_cache          # Reuse executables from the build cache
+        self.cache_size = cache_size        # Bytes the build cache may hold
+        self.remote_cache = remote_cache    # URL of a shared build cache
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1  # Async jobs running at once
+        # Semaphores enforcing max_concurrent, one per event loop, since each is bound to its loop
+        self.async_slots = weakref.WeakKeyDictionary()
+        self.separate = separate            # Compile each function separately, caching objects
+        self.jobs = jobs                    # Parallel gcc runs for separate compilation
+        self.unit_size = unit_size          # Functions per translation unit when separate
+        self.runtime = runtime              # Link builds against the prebuilt hinglish_rt
+        self.stream = stream                # Transpile one top-level declaration at a time
+        self.fused = fused                  # Analyze and generate C in a single traversal
+        self.timer = PhaseTimer(enabled=time_phases)  # Per-phase timings, counters and memory
+        # Times the visits of the analyzer and generators per AST node type
+        self.visitor_profiler = VisitorProfiler() if profile_visitors else None
     
     def log(self, message):
         if self.verbose:
             print(message)
     
+    def instrument(self, visitor):
+        """Attach the visitor profiler, when enabled, to an analyzer or generator; returns the visitor."""
+        if self.visitor_profiler:
+            self.visitor_profiler.attach(visitor)
+        return visitor
+    
     def compile(self, input_file, output_file=None, keep_c=False, run_after=False):
         """
         Compile a Hinglish program (.hp) to an executable.
         
         Args:
-            input_file: Path to the .hp source file
-            output_file: Path to the output executable (default: input basename)
+            input_file: Path to the .hp source file, or '-' for standard input
+            output_file: Path to the output executable (default: input basename, or 'a.out' for stdin)
             keep_c: Whether to keep the intermediate C file (default: False)
             run_after: Whether to run the executable after compilation (default: False)
         """
         # Validate input file
-        if not input_file.endswith('.hp'):
+        if input_file != '-' and not input_file.endswith('.hp'):
             print(f"Warning: Input file '{input_file}' doesn't have .hp extension")
         
         # Determine output filenames
-        base_name = os.path.splitext(input_file)[0]
-        c_file = f"{base_name}.c"
-        executable = output_file or base_name
+        if input_file == '-':
+            executable = output_file or "a.out"
+            c_file = f"{os.path.splitext(executable)[0]}.c"
+        else:
+            base_name = os.path.splitext(input_file)[0]
+            c_file = f"{base_name}.c"
+            executable = output_file or base_name
         
         # Step 1: Read source file
         try:
-            with open(input_file, 'r') as f:
-                source_code = f.read()
-                self.log(f"Read source file: {input_file} ({len(source_code)} bytes)")
+            with self.timer.phase("read") as phase:
+                if input_file == '-':
+                    source_code = sys.stdin.read()
+                else:
+                    with open(input_file, 'r') as f:
+                        source_code = f.read()
+                if phase:
+                    phase.counters['bytes'] = len(source_code.encode())
+            self.log(f"Read source file: {input_file} ({len(source_code)} bytes)")
         except FileNotFoundError:
             print(f"Error: Source file '{input_file}' not found")
             return False
@@ -45,27 +112,10 @@ class HinglishCompiler:
             print(f"Error reading source file: {str(e)}")
             return False
         
-        # Step 2: Transpile to C
+        # Step 2: Transpile to C while gcc compiles it from its stdin; the C
+        # code only touches the disk when it is kept
         try:
-            c_code = self.transpile(source_code)
-            if not c_code:
-                return False
-                
-            self.log(f"Successfully transpiled to C code")
-            
-            # Write C code to file
-            with open(c_file, 'w') as f:
-                f.write(c_code)
-                self.log(f"Wrote C code to: {c_file}")
-        except Exception as e:
-            print(f"Error during transpilation: {str(e)}")
-            if self.verbose:
-                traceback.print_exc()
-            return False
-        
-        # Step 3: Compile C to executable
-        try:
-            result = self.compile_with_gcc(c_file, executable)
+            result = self.build(source_code, executable, c_file if keep_c else None)
             if not result:
                 return False
             self.log(f"Compilation successful: {executable}")
@@ -75,22 +125,45 @@ class HinglishCompiler:
                 traceback.print_exc()
             return False
         
-        # Step 4: Clean up C file if not keeping it
-        if not keep_c:
-            try:
-                os.remove(c_file)
-                self.log(f"Removed intermediate C file: {c_file}")
-            except Exception as e:
-                print(f"Warning: Could not remove intermediate C file: {str(e)}")
-        
         print(f"Successfully compiled '{input_file}' to '{executable}'")
         
-        # Step 5: Run the executable if requested
+        # Step 3: Run the executable if requested
         if run_after:
             return self.run_executable(executable)
             
         return True
     
+    def tune(self, input_file, repeat=3, timeout=10, run_input=None, run_args=(), configurations=None):
+        """Find the fastest gcc flags for a program and record them in its tuning file.
+        
+        configurations lists the flag lists to try; None tries the whole search space.
+        """
+        try:
+            with open(input_file, 'r') as f:
+                source_code = f.read()
+        except FileNotFoundError:
+            print(f"Error: Source file '{input_file}' not found")
+            return False
+        
+        try:
+            c_code = self.transpile(source_code)
+        except Exception as e:
+            print(f"Error during transpilation: {str(e)}")
+            if self.verbose:
+                traceback.print_exc()
+            return False
+        
+        print(f"Tuning '{input_file}' ({repeat} runs per configuration)...")
+        best = Tuner(repeat, timeout, run_input, run_args, configurations).tune(c_code)
+        if best is None:
+            print("Error: No flag configuration built and ran successfully")
+            return False
+        
+        flags, seconds = best
+        path = save_tuning(input_file, flags, seconds)
+        print(f"Fastest: {' '.join(flags)} ({seconds * 1000:.3f} ms), saved to '{path}'")
+        return True
+    
     def run_executable(self, executable):
         """Run the compiled executable."""
         print(f"Running '{executable}'...")
@@ -100,11 +173,12 @@ class HinglishCompiler:
                 executable = f"./{executable}"
                 
             # Run the executable and capture output
-            result = subprocess.run(
-                executable,
-                check=True,
-                text=True
-            )
+            with self.timer.process("run"):
+                result = subprocess.run(
+                    executable,
+                    check=True,
+                    text=True
+                )
             
             if result.returncode != 0:
                 print(f"Program execution failed with exit code {result.returncode}")
@@ -123,71 +197,525 @@ class HinglishCompiler:
             print("Try running 'chmod +x {executable}' first.")
             return False
     
-    def transpile(self, source_code):
-        """Transpile Hinglish code to C."""
-        # Import the components we need
+    def transpile_pipe(self, input_stream=None, output_stream=None):
+        """Read Hinglish from a stream and write C to another, for Unix pipelines."""
+        input_stream = input_stream or sys.stdin
+        output_stream = output_stream or sys.stdout
+        
+        # Diagnostics go to stderr so they never mix with the generated C
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                self.transpile_to(input_stream.read(), output_stream)
+            except Exception as e:
+                print(f"Error during transpilation: {str(e)}")
+                if self.verbose:
+                    traceback.print_exc()
+                return False
+        output_stream.flush()
+        return True
+    
+    def transpile(self, source_code, runtime=False):
+        """Transpile Hinglish code to C, using hinglish_rt.h if runtime is set."""
+        output = io.StringIO()
+        self.transpile_to(source_code, output, runtime)
+        return output.getvalue()
+    
+    def transpile_to(self, source_code, stream, runtime=False):
+        """Transpile Hinglish code to C, writing it into a text or binary stream.
+        
+        With runtime set the C includes hinglish_rt.h and prints through it,
+        so it must be built with runtime_args(); otherwise it stands alone.
+        """
+        from generator import CodeGenerator
+        
+        if self.timer.enabled:
+            stream = counting_stream(stream)
+        if self.stream:
+            if self.opt_level == 0 and self.backend == "ast":
+                from streaming import StreamingTranspiler
+                self.log("Transpiling one declaration at a time...")
+                with self.timer.phase("stream") as phase:
+                    StreamingTranspiler(runtime, self.log, self.instrument).transpile_to(source_code, stream)
+                    if phase:
+                        phase.counters['bytes'] = stream.bytes
+                return
+            self.log("Streaming needs -O0 and the AST backend; transpiling the whole program")
+        if self.fused:
+            if self.opt_level == 0 and self.backend == "ast":
+                self.transpile_fused(source_code, stream, runtime)
+                return
+            self.log("Fused generation needs -O0 and the AST backend; analyzing separately")
+        
+        ast, analysis_result, symbol_table = self.front_end(source_code)
+        if self.backend == "ir":
+            if analysis_result and analysis_result['success']:
+                self.generate_from_ir(ast, stream, runtime)
+                return
+            self.log("Semantic analysis failed, falling back to the AST backend")
+        
+        # Code generation - use the same generator as in run.py
+        self.log("Generating C code...")
+        with self.timer.phase("generate") as phase:
+            generator = self.instrument(CodeGenerator(symbol_table, runtime=runtime,
+                                                      attributes=self.opt_level > 0))
+            generator.generate_to(ast, stream)
+            if phase:
+                phase.counters['bytes'] = stream.bytes
+    
+    def transpile_fused(self, source_code, stream, runtime=False):
+        """Lex and parse, then analyze and generate C in one traversal of the AST."""
+        from fused import FusedGenerator
+        
+        ast = self.parse(source_code)
+        self.log("Analyzing and generating C code in one pass...")
+        with self.timer.phase("fused") as phase:
+            self.instrument(FusedGenerator(runtime)).transpile(ast, stream)
+            if phase:
+                phase.counters['bytes'] = stream.bytes
+    
+    def parse(self, source_code):
+        """Lex and parse source code into an AST."""
         from lexer import Lexer
         from parser import Parser
-        from generator import CodeGenerator
         
         # Lexical analysis
         self.log("Starting lexical analysis...")
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
+        with self.timer.phase("lex") as phase:
+            lexer = Lexer(source_code)
+            tokens = lexer.tokenize()
+            if phase:
+                phase.counters['tokens'] = len(tokens)
         
         # Parsing
         self.log("Parsing tokens to AST...")
-        parser = Parser(tokens)
-        ast = parser.parse()
+        with self.timer.phase("parse") as phase:
+            parser = Parser(tokens)
+            ast = parser.parse()
+            if phase:
+                phase.counters['nodes'] = count_nodes(ast)
+        return ast
+    
+    def front_end(self, source_code):
+        """Lex, parse, analyze and optimize; returns (ast, analysis result, symbol table)."""
+        ast = self.parse(source_code)
         
         # Perform semantic analysis to get symbol table
         self.log("Performing semantic analysis...")
         try:
             from sem_analyser import SemanticAnalyzer
-            analyzer = SemanticAnalyzer()
-            analysis_result = analyzer.analyze(ast)
+            with self.timer.phase("analyze"):
+                analyzer = self.instrument(SemanticAnalyzer())
+                analysis_result = analyzer.analyze(ast)
             symbol_table = analysis_result['symbol_table']
         except ImportError:
             self.log("Warning: Semantic analyzer not found, proceeding without symbol table")
+            analysis_result = None
             symbol_table = {}
         
-        # Code generation - use the same generator as in run.py
-        self.log("Generating C code...")
-        generator = CodeGenerator(symbol_table)
-        c_code = generator.generate(ast)
+        # Optimization passes only run on programs that analyzed cleanly
+        if self.opt_level > 0 and analysis_result and analysis_result['success']:
+            from optimizer import Optimizer
+            self.log(f"Optimizing AST (level {self.opt_level})...")
+            with self.timer.phase("optimize") as phase:
+                optimizer = Optimizer(self.opt_level, lookup_tables=self.lookup_tables,
+                                      inline_max_size=self.inline_max_size,
+                                      inline_max_depth=self.inline_max_depth)
+                ast = optimizer.optimize(ast)
+                if phase:
+                    phase.counters['nodes'] = count_nodes(ast)
+            for name, args, value in optimizer.reports.get('const_eval', []):
+                self.log(f"  Evaluated {name}({', '.join(map(str, args))}) = {value} at compile time")
+            for function, temp, expr, uses in optimizer.reports.get('cse', []):
+                self.log(f"  Computed {expr} once into {temp} in {function} ({uses} uses)")
+            for function, temp, expr in optimizer.reports.get('licm', []):
+                self.log(f"  Hoisted {expr} out of a loop into {temp} in {function}")
+            for caller, callee, depth in optimizer.reports.get('inline', []):
+                self.log(f"  Inlined {callee} into {caller} (depth {depth})")
+            for function, name, cases in optimizer.reports.get('switch', []):
+                self.log(f"  Lowered an if-else chain on {name} in {function} to a switch ({cases} cases)")
+        return ast, analysis_result, symbol_table
+    
+    def generate_from_ir(self, ast, stream, runtime=False):
+        """Lower the analyzed AST to IR, optimize it and emit C into a stream."""
+        from ir_lowering import IRLowering
+        from ir_passes import PassManager
+        from ir_codegen import IREmitter
+        
+        self.log("Lowering AST to IR...")
+        with self.timer.phase("lower"):
+            module = IRLowering().lower(ast)
+        
+        self.log(f"Running IR passes (level {self.opt_level})...")
+        with self.timer.phase("ir passes"):
+            manager = PassManager(self.opt_level)
+            manager.run(module)
+        for name, seconds in manager.timings.items():
+            self.log(f"  {name}: {seconds * 1000:.3f} ms")
+        if self.dump_ir:
+            print(module)
         
-        return c_code
+        self.log("Generating C code from IR...")
+        with self.timer.phase("generate") as phase:
+            IREmitter(runtime).emit_to(module, stream)
+            if phase:
+                phase.counters['bytes'] = stream.bytes
     
-    def compile_with_gcc(self, c_file, output_file):
-        """Compile C code with GCC."""
-        self.log(f"Compiling {c_file} to {output_file} using GCC...")
+    def build(self, source_code, output_file, c_file=None):
+        """Build an executable, reusing a cached build of the same inputs when enabled."""
+        if self.pgo:
+            return self.build_with_pgo(source_code, output_file, c_file)
+        if self.separate:
+            return self.build_separately(source_code, output_file, c_file)
+        # --dump-ir output comes from the transpiler, which a cache hit skips
+        if not self.use_cache or self.dump_ir:
+            return self.transpile_into_gcc(source_code, output_file, c_file)
+        
+        remote = None
+        if self.remote_cache:
+            from remote_cache import open_remote
+            remote = open_remote(self.remote_cache)
+        cache = BuildCache(max_size=self.cache_size, remote=remote)
+        with self.timer.phase("cache lookup"):
+            key = cache.key(source_code, self.cache_options())
+            hit = cache.fetch(key, output_file, c_file)
+        if hit:
+            self.log(f"Build cache hit: {key}")
+            return True
+        self.log(f"Build cache miss: {key}")
         
+        staging = cache.staging()
         try:
-            cmd = ['gcc', c_file, '-o', output_file]
-            self.log(f"Running command: {' '.join(cmd)}")
+            staged_c = os.path.join(staging, BuildCache.ENTRY_C)
+            if not self.transpile_into_gcc(source_code, output_file, staged_c):
+                return False
+            if c_file:
+                shutil.copyfile(staged_c, c_file)
+                self.log(f"Wrote C code to: {c_file}")
+            with self.timer.phase("cache store"):
+                cache.store(key, staging, output_file)
+            staging = None
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+        return True
+    
+    def build_separately(self, source_code, output_file, c_file=None):
+        """Build from one translation unit per function, recompiling only changed units."""
+        from generator import CodeGenerator
+        from separate import HEADER_NAME, SeparateBuilder, write_units
+        
+        ast, _, symbol_table = self.front_end(source_code)
+        if self.backend == "ir":
+            self.log("Separate compilation generates C from the AST; ignoring --backend ir")
+        self.log("Generating C code as separate units...")
+        runtime = self.runtime_args()
+        with self.timer.phase("generate") as phase:
+            generator = self.instrument(CodeGenerator(symbol_table, runtime=runtime is not None,
+                                                      attributes=self.opt_level > 0))
+            header, units = generator.generate_units(ast, HEADER_NAME, unit_size=self.unit_size)
+            if phase:
+                phase.counters['bytes'] = len(header.encode()) + sum(len(code.encode()) for _, code in units)
+                phase.counters['units'] = len(units)
+        if c_file:
+            directory = os.path.splitext(c_file)[0] + "_units"
+            write_units(directory, header, units)
+            self.log(f"Wrote C units to: {directory}")
+        
+        self.log(f"Build profile: {self.profile.name} ({self.profile.description})")
+        builder = SeparateBuilder(self.build_flags() + (runtime or []), self.jobs, log=self.log)
+        with self.timer.process("gcc"):
+            return builder.build(header, units, output_file)
             
-            result = subprocess.run(
-                cmd,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+    def cache_options(self):
+        """Settings besides the source that change the build, as build cache key parts."""
+        return [f"-O{self.opt_level}", f"lookup_tables={self.lookup_tables}",
+                f"inline={self.inline_max_size},{self.inline_max_depth}",
+                f"backend={self.backend}", f"stream={self.stream}",
+                f"runtime={self.runtime_key()}"] + self.build_flags()
             
-            if result.returncode != 0:
-                print(f"GCC compilation failed with code {result.returncode}")
-                print(f"Error: {result.stderr.decode()}")
+    def runtime_args(self):
+        """gcc arguments that include and link the prebuilt runtime, or None if not used."""
+        if not self.runtime:
+            return None
+        from runtime import RuntimeLibrary, RuntimeLibraryError
+        library = RuntimeLibrary(self.build_flags(), log=self.log)
+        try:
+            with self.timer.phase("runtime"):
+                return library.gcc_args(library.prepare())
+        except (RuntimeLibraryError, OSError) as e:
+            print(f"Warning: Cannot build the runtime library, generating standalone C: {e}")
+            return None
+            
+    def runtime_key(self):
+        """Build cache key part for the runtime the executable is linked against."""
+        if not self.runtime:
+            return "none"
+        from runtime import RuntimeLibrary
+        return RuntimeLibrary(self.build_flags()).key()
+            
+    def build_flags(self):
+        """gcc flags of the build profile with the command line overrides applied."""
+        return self.profile.gcc_flags(self.static, self.gcc_flags)
+            
+    def build_with_pgo(self, source_code, output_file, c_file=None):
+        """Build an executable with profile-guided optimization."""
+        # Every PGO stage compiles the same C, so it is generated once
+        c_code = self.transpile(source_code)
+        if c_file:
+            with open(c_file, 'w') as f:
+                f.write(c_code)
+            self.log(f"Wrote C code to: {c_file}")
+            
+        self.log(f"Build profile: {self.profile.name} ({self.profile.description})")
+        builder = PGOBuilder(self.build_flags(), self.train_inputs, self.train_args,
+                             self.train_timeout, log=self.log)
+        # The instrumented build, training runs and final build
+        with self.timer.process("gcc (pgo)"):
+            return builder.build(c_code, output_file)
+            
+    def transpile_into_gcc(self, source_code, output_file, c_file=None):
+        """Stream generated C into gcc over stdin, copying it to c_file if given."""
+        runtime = self.runtime_args()
+        cmd = ['gcc', '-x', 'c', '-'] + self.build_flags() + (runtime or []) + ['-o', output_file]
+        self.log(f"Build profile: {self.profile.name} ({self.profile.description})")
+        self.log(f"Running command: {' '.join(cmd)}")
+            
+        # gcc compiles while the C is generated, so the span overlaps those phases
+        with self.timer.process("gcc"):
+            try:
+                process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                print("Error: GCC compiler not found. Please install GCC.")
                 return False
-                
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"GCC compilation failed: {e.stderr.decode()}")
+            
+            # Drain gcc's diagnostics concurrently so a full stderr pipe can never
+            # stall it while we are still writing its input
+            errors = []
+            reader = threading.Thread(target=lambda: errors.append(process.stderr.read()))
+            reader.start()
+            
+            c_copy = open(c_file, 'wb') if c_file else None
+            try:
+                stream = TeeStream(process.stdin, c_copy) if c_copy else process.stdin
+                self.transpile_to(source_code, stream, runtime is not None)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # gcc gave up early; its exit status and stderr say why
+            except Exception:
+                # Killing the driver stops it before linking; closing stdin lets
+                # the cc1 child it started see EOF and exit too
+                process.kill()
+                with contextlib.suppress(BrokenPipeError):
+                    process.stdin.close()
+                process.wait()
+                reader.join()
+                raise
+            finally:
+                if c_copy:
+                    c_copy.close()
+                    self.log(f"Wrote C code to: {c_file}")
+            
+            returncode = process.wait()
+            reader.join()
+        if returncode != 0:
+            print(f"GCC compilation failed: {b''.join(errors).decode()}")
             return False
+        
+        self.log("Successfully transpiled to C code")
+        return True
+
+    
+    def slots(self):
+        """Semaphore limiting the async jobs running at once in the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self.async_slots.get(loop)
+        if slots is None:
+            slots = self.async_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        return slots
+    
+    async def compile_async(self, source_code, output_file, c_file=None, timeout=None):
+        """
+        Compile Hinglish source code to an executable without blocking the event loop.
+        
+        Transpilation runs in the loop's default executor and gcc runs as an
+        asyncio subprocess.  At most max_concurrent compiles and runs proceed at
+        once; the rest wait for a slot.  timeout (seconds, not counting the wait
+        for a slot) raises asyncio.TimeoutError, and cancelling the call kills gcc.
+        A transpilation that has already started finishes in its thread.
+        
+        Returns True on success; gcc errors are printed, as by compile().
+        """
+        async with self.slots():
+            return await asyncio.wait_for(self.build_async(source_code, output_file, c_file), timeout)
+    
+    async def build_async(self, source_code, output_file, c_file=None):
+        loop = asyncio.get_running_loop()
+        runtime = await loop.run_in_executor(None, self.runtime_args)
+        c_code = await loop.run_in_executor(None, self.transpile, source_code, runtime is not None)
+        if c_file:
+            with open(c_file, 'w') as f:
+                f.write(c_code)
+            self.log(f"Wrote C code to: {c_file}")
+        
+        cmd = ['gcc', '-x', 'c', '-'] + self.build_flags() + (runtime or []) + ['-o', output_file]
+        self.log(f"Running command: {' '.join(cmd)}")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         except FileNotFoundError:
             print("Error: GCC compiler not found. Please install GCC.")
             return False
+        _, errors = await self.communicate(process, c_code.encode())
+        if process.returncode != 0:
+            print(f"GCC compilation failed: {errors.decode()}")
+            return False
+        return True
+    
+    async def run_async(self, executable, args=(), input_data=None, timeout=None):
+        """
+        Run a compiled program without blocking the event loop.
+        
+        Shares the concurrency limit of compile_async.  Returns
+        (exit code, stdout bytes, stderr bytes); timeout raises
+        asyncio.TimeoutError after killing the program.
+        """
+        if not os.path.isabs(executable) and not executable.startswith('./'):
+            executable = f"./{executable}"
+        async with self.slots():
+            process = await asyncio.create_subprocess_exec(
+                executable, *args, stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            output, errors = await asyncio.wait_for(self.communicate(process, input_data), timeout)
+            return process.returncode, output, errors
+    
+    async def communicate(self, process, input_data):
+        """process.communicate that kills the process when cancelled or timed out."""
+        try:
+            return await process.communicate(input_data)
+        except asyncio.CancelledError:
+            # As in transpile_into_gcc, closing stdin lets a cc1 child of a
+            # killed gcc driver see EOF and exit too
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+            if process.stdin:
+                process.stdin.close()
+            await process.wait()
+            raise
+
+
+def choose_profile(profile, input_file, pgo=False, verbose=False):
+    """The profile given, else the program's tuned flags, else the default."""
+    if profile is not None:
+        return profile
+    if input_file != '-':
+        tuned = load_tuned_profile(input_file)
+        if tuned:
+            if verbose:
+                print(f"Using tuned gcc flags for {input_file}: {' '.join(tuned.opt_flags)}")
+            return tuned
+    return "release" if pgo else DEFAULT_PROFILE
+
+
+def compile_with_daemon(args, options, input_file):
+    """Hand a compile or transpile to the daemon; None if no daemon could take it."""
+    from daemon import DaemonClient
+    client = DaemonClient(args.socket)
+    if not os.path.exists(client.socket_path):
+        return None
+    
+    start = time.perf_counter()
+    try:
+        if input_file == '-':
+            response = client.transpile(options, sys.stdin.read())
+        else:
+            response = client.compile(options, input_file, args.output, args.keep_c)
+    except (OSError, ValueError) as e:
+        if input_file == '-':
+            # stdin has been consumed, so there is nothing left to fall back on
+            print(f"Error: Compiler daemon failed: {e}", file=sys.stderr)
+            return False
+        if args.verbose:
+            print(f"Compiler daemon unavailable ({e}), compiling in-process")
+        return None
+    latency = time.perf_counter() - start
+    
+    if input_file == '-':
+        # Diagnostics go to stderr so they never mix with the generated C
+        sys.stderr.write(response['output'])
+        if response['success']:
+            sys.stdout.write(response['c_code'])
+            sys.stdout.flush()
+    else:
+        print(response['output'], end="")
+    if args.verbose:
+        print(f"Daemon request: {latency * 1000:.1f} ms ({response['seconds'] * 1000:.1f} ms in the daemon)",
+              file=sys.stderr if input_file == '-' else sys.stdout)
+    
+    if response['success'] and args.run and input_file != '-':
+        executable = args.output or os.path.splitext(input_file)[0]
+        return HinglishCompiler().run_executable(executable)
+    return response['success']
+
+
+def tune_main(argv):
+    parser = argparse.ArgumentParser(
+        prog='hpc tune',
+        description='Find the fastest gcc flags for a Hinglish program and save them to '
+                    'hpc-tune.json next to it, where later builds pick them up'
+    )
+    parser.add_argument('input_file', help='Input .hp source file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
+    parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0,
+                        help='Transpiler optimization level (default: 0)')
+    parser.add_argument('--backend', choices=['ast', 'ir'], default='ast',
+                        help='Generate C directly from the AST or through the IR (default: ast)')
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help='Timed runs per flag configuration (default: 3)')
+    parser.add_argument('--timeout', type=float, default=10, metavar='SECONDS',
+                        help='Time limit for each run (default: 10)')
+    parser.add_argument('--input', metavar='FILE', help='File fed to each run on stdin')
+    parser.add_argument('--args', default='', metavar='ARGS', help='Arguments for each run')
+    parser.add_argument('--config', action='append', metavar='FLAGS',
+                        help='A flag configuration to try instead of the built-in search space (repeatable)')
+    
+    args = parser.parse_args(argv)
+    configurations = [shlex.split(flags) for flags in args.config] if args.config else None
+    compiler = HinglishCompiler(verbose=args.verbose, opt_level=args.opt_level, backend=args.backend)
+    success = compiler.tune(args.input_file, args.repeat, args.timeout, args.input, shlex.split(args.args),
+                            configurations)
+    return 0 if success else 1
+
+
+def cache_main(argv):
+    parser = argparse.ArgumentParser(prog='hpc cache', description='Inspect or empty the build cache')
+    parser.add_argument('action', choices=['stats', 'clear'])
+    args = parser.parse_args(argv)
+    
+    cache = BuildCache()
+    if args.action == 'clear':
+        cache.clear()
+        print(f"Cleared build cache at '{cache.root}'")
+        return 0
+    
+    stats = cache.stats()
+    hits = stats['hits'] + stats['remote_hits']
+    lookups = hits + stats['misses']
+    hit_rate = f"{100 * hits / lookups:.1f}%" if lookups else "n/a"
+    print(f"Build cache: {cache.root}")
+    print(f"  Entries: {stats['entries']}")
+    print(f"  Size:    {stats['size'] / 1024 / 1024:.1f} MB of {stats['max_size'] / 1024 / 1024:.0f} MB")
+    print(f"  Hits:    {stats['hits']} local, {stats['remote_hits']} remote")
+    print(f"  Misses:  {stats['misses']}")
+    print(f"  Hit rate: {hit_rate}")
+    return 0
 
 
 def main():
+    if sys.argv[1:2] == ['tune']:
+        return tune_main(sys.argv[2:])
+    if sys.argv[1:2] == ['cache']:
+        return cache_main(sys.argv[2:])
+    
     parser = argparse.ArgumentParser(
         description='Hinglish Programming Language Compiler',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -195,22 +723,198 @@ def main():
 Examples:
   hpc hello.hp               # Compile hello.hp to executable 'hello'
   hpc hello.hp -o greet      # Compile hello.hp to executable 'greet'
+  hpc src/ extra.hp -j 8     # Compile every .hp under src/ and extra.hp, 8 at a time
+  hpc --daemon &             # Keep a warm compiler running; later hpc calls use it
+  hpc src/ --coordinator 10.0.0.5:8766      # Build src/ on remote workers on a trusted network...
+  hpc --worker 10.0.0.5:8766 -j 8           # ...started like this on each node
   hpc hello.hp --keep-c      # Keep the intermediate C file
   hpc hello.hp -v            # Verbose output showing compilation steps
   hpc hello.hp --run         # Run the program after compilation
+  hpc hello.hp -O1           # Evaluate pure calls with constant arguments
+  hpc hello.hp -O2 -v        # Also inline small functions and list them
+  hpc hello.hp --backend ir  # Generate C through the three-address IR
+  hpc - < hello.hp > hello.c # Transpile from stdin to stdout
+  hpc hello.hp -p release    # Build an optimized, stripped executable
+  hpc hello.hp -p fast --gcc-flags="-fno-plt"  # Pass extra flags to gcc
+  hpc - -o hello < hello.hp  # Compile a program read from stdin
+  hpc hello.hp --pgo --train-input data.txt  # Profile-guided build
+  hpc tune hello.hp          # Find the fastest gcc flags for later builds
+  hpc hello.hp --no-cache    # Rebuild instead of reusing a cached executable
+  hpc cache stats            # Show build cache size and hit rate
+  hpc hello.hp --remote-cache http://127.0.0.1:8765  # Share builds via cache_server.py
 """
     )
     
-    parser.add_argument('input_file', help='Input .hp source file')
-    parser.add_argument('-o', '--output', help='Output executable name')
+    parser.add_argument('input_files', nargs='*', metavar='input_file',
+                        help="Input .hp source files or directories of them, or '-' to read standard input")
+    parser.add_argument('-o', '--output', help='Output executable name (single input only)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='Programs compiled in parallel when given several inputs (default: 1)')
     parser.add_argument('--keep-c', action='store_true', help='Keep intermediate C file')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
     parser.add_argument('--run', action='store_true', help='Run the executable after compilation')
+    parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0,
+                        help='Transpiler optimization level (default: 0)')
+    parser.add_argument('--lookup-tables', action='store_true',
+                        help='Precompute lookup tables for pure single-argument functions')
+    parser.add_argument('--inline-size', type=int, default=16, metavar='N',
+                        help='Largest function body, in AST nodes, inlined at -O2 (default: 16)')
+    parser.add_argument('--inline-depth', type=int, default=3, metavar='N',
+                        help='Maximum nesting of inlined calls at -O2 (default: 3)')
+    parser.add_argument('--backend', choices=['ast', 'ir'], default='ast',
+                        help='Generate C directly from the AST or through the IR (default: ast)')
+    parser.add_argument('--dump-ir', action='store_true',
+                        help='Print the optimized IR (with --backend ir)')
+    parser.add_argument('-p', '--profile', choices=list(PROFILES),
+                        help=f'gcc build profile (default: tuned flags from hpc-tune.json, '
+                             f'else {DEFAULT_PROFILE}, or release with --pgo)')
+    parser.add_argument('--static', action=argparse.BooleanOptionalAction, default=None,
+                        help="Link statically, overriding the profile's default")
+    parser.add_argument('--gcc-flags', action='append', default=[], metavar='FLAGS',
+                        help='Extra flags passed through to gcc (may be repeated)')
+    parser.add_argument('--pgo', action='store_true',
+                        help='Build with profile-guided optimization, training on the inputs below')
+    parser.add_argument('--train-input', action='append', default=[], metavar='FILE',
+                        help='File fed on stdin to a PGO training run (may be repeated)')
+    parser.add_argument('--train-args', action='append', default=[], metavar='ARGS',
+                        help='Arguments for a PGO training run (may be repeated)')
+    parser.add_argument('--train-timeout', type=float, default=60, metavar='SECONDS',
+                        help='Time limit for each PGO training run (default: 60)')
+    parser.add_argument('--separate', action='store_true',
+                        help='Compile every function to its own cached object file and link them, '
+                             'so rebuilds only recompile changed functions')
+    parser.add_argument('--unit-size', type=int, default=1, metavar='N',
+                        help='Functions per translation unit with --separate (default: 1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Transpile one top-level declaration at a time, in memory bounded by the '
+                             'largest one (-O0 and the AST backend only)')
+    parser.add_argument('--fused', action='store_true',
+                        help='Type-check and generate C in a single traversal of the AST '
+                             '(-O0 and the AST backend only)')
+    parser.add_argument('--time-phases', action='store_true',
+                        help='Report wall and CPU time, counters and peak traced memory of every phase, '
+                             'gcc and program run (compiles in this process, slower with memory tracing)')
+    parser.add_argument('--phases-json', metavar='FILE',
+                        help='Write the phase measurements to FILE as JSON (implies --time-phases)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write the phase measurements to FILE as a Chrome trace (implies --time-phases)')
+    parser.add_argument('--profile-visitors', action='store_true',
+                        help='Report call counts and time per AST node type and visit method of the '
+                             'semantic analyzer and code generator (compiles in this process)')
+    parser.add_argument('--no-runtime', action='store_true',
+                        help='Generate standalone C instead of linking the prebuilt hinglish_rt runtime')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Neither reuse nor store executables in the build cache')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), metavar='MB',
+                        help='Size the build cache is trimmed to, least recently used first (default: %(default)s)')
+    parser.add_argument('--remote-cache', default=os.environ.get('HPC_REMOTE_CACHE'), metavar='URL',
+                        help='Shared build cache read through and written to over HTTP '
+                             '(default: $HPC_REMOTE_CACHE)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run a compiler daemon that serves later hpc invocations (-j sets its workers)')
+    parser.add_argument('--stop-daemon', action='store_true', help='Stop the running compiler daemon')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Compile in this process even if a daemon is running')
+    parser.add_argument('--coordinator', metavar='[HOST:]PORT',
+                        help='Build the inputs on workers that connect to this address')
+    parser.add_argument('--worker', metavar='[HOST:]PORT',
+                        help='Build programs for the coordinator at this address (-j sets parallel jobs)')
+    parser.add_argument('--token', default=os.environ.get('HPC_DISTRIBUTED_TOKEN'), metavar='SECRET',
+                        help='Shared secret workers present to the coordinator (default: $HPC_DISTRIBUTED_TOKEN)')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Unix socket of the compiler daemon (default: $HPC_DAEMON_SOCKET, '
+                             'else daemon.sock in the cache directory)')
     
     args = parser.parse_args()
     
-    compiler = HinglishCompiler(verbose=args.verbose)
-    success = compiler.compile(args.input_file, args.output, args.keep_c, args.run)
+    if args.daemon:
+        from daemon import CompilerDaemon
+        jobs = args.jobs if args.jobs > 1 else None
+        return 0 if CompilerDaemon(args.socket, jobs).serve_forever() else 1
+    if args.stop_daemon:
+        from daemon import DaemonClient
+        try:
+            DaemonClient(args.socket).shutdown()
+        except OSError:
+            print("Error: No compiler daemon is running")
+            return 1
+        return 0
+    if args.worker:
+        from distributed import CompileWorker, parse_address
+        return 0 if CompileWorker(parse_address(args.worker), args.jobs, token=args.token).run() else 1
+    if not args.input_files:
+        parser.error("the following arguments are required: input_file")
+    
+    options = dict(verbose=args.verbose, opt_level=args.opt_level,
+                   lookup_tables=args.lookup_tables,
+                   inline_max_size=args.inline_size,
+                   inline_max_depth=args.inline_depth,
+                   backend=args.backend, dump_ir=args.dump_ir,
+                   profile=args.profile,
+                   static=args.static,
+                   gcc_flags=[flag for flags in args.gcc_flags for flag in shlex.split(flags)],
+                   pgo=args.pgo, train_inputs=args.train_input,
+                   train_args=[shlex.split(train) for train in args.train_args],
+                   train_timeout=args.train_timeout,
+                   use_cache=not args.no_cache, cache_size=args.cache_size * 1024 * 1024,
+                   remote_cache=args.remote_cache, separate=args.separate, unit_size=args.unit_size,
+                   runtime=not args.no_runtime, stream=args.stream, fused=args.fused)
+    time_phases = args.time_phases or args.phases_json or args.trace
+    # Measurements are made and reported by this process
+    measured = time_phases or args.profile_visitors
+    
+    if args.coordinator:
+        if args.output or '-' in args.input_files:
+            parser.error("-o and '-' cannot be used with --coordinator")
+        if measured:
+            parser.error("--time-phases, --phases-json, --trace and --profile-visitors "
+                         "cannot be used with --coordinator")
+        from distributed import build_distributed, parse_address
+        success = build_distributed(args.input_files, options, parse_address(args.coordinator), args.keep_c,
+                                    token=args.token)
+        return 0 if success else 1
+    
+    # Several inputs, or a directory, are compiled as a batch
+    if len(args.input_files) > 1 or os.path.isdir(args.input_files[0]):
+        if args.output or '-' in args.input_files:
+            parser.error("-o and '-' need a single input file")
+        if measured:
+            parser.error("--time-phases, --phases-json, --trace and --profile-visitors need a single input file")
+        from batch import BatchCompiler
+        success = BatchCompiler(options, args.jobs, args.keep_c, args.run).compile(args.input_files)
+        return 0 if success else 1
+    
+    input_file = args.input_files[0]
+    # With a single input, -j is the number of gcc runs of a separate build
+    options['jobs'] = args.jobs if args.jobs > 1 else None
+    # A running daemon does the work without this process importing the pipeline;
+    # programs read from stdin are only sent to it for transpiling
+    if not args.no_daemon and not measured and not (input_file == '-' and args.output):
+        success = compile_with_daemon(args, options, input_file)
+        if success is not None:
+            return 0 if success else 1
+    
+    # Flags found by `hpc tune` apply unless a profile is chosen explicitly
+    options['profile'] = choose_profile(args.profile, input_file, args.pgo, args.verbose)
+    compiler = HinglishCompiler(**options, time_phases=bool(time_phases),
+                                profile_visitors=args.profile_visitors)
+    # Without an output name, stdin input is transpiled to stdout
+    if input_file == '-' and not args.output:
+        success = compiler.transpile_pipe()
+    else:
+        success = compiler.compile(input_file, args.output, args.keep_c, args.run)
+    
+    if time_phases:
+        # stderr, so a C file transpiled to stdout stays clean
+        for line in compiler.timer.report():
+            print(line, file=sys.stderr)
+        if args.phases_json:
+            compiler.timer.write_json(args.phases_json)
+        if args.trace:
+            compiler.timer.write_chrome_trace(args.trace)
+    if args.profile_visitors:
+        for line in compiler.visitor_profiler.report():
+            print(line, file=sys.stderr)
     
     return 0 if success else 1
 
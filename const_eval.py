@@ -0,0 +1,334 @@
+from parser import *  # Import all AST node classes
+from optimizer import (NodeTransformer, function_table, int_constant, int_literal,
+                       make_token, variable, walk)
+
+# C `int` range; results outside it would be undefined behaviour at runtime
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+
+class EvaluationError(Exception):
+    """Raised when an expression cannot be evaluated at compile time"""
+    pass
+
+
+def check_range(value):
+    """Reject results that would overflow a C int"""
+    if value < INT_MIN or value > INT_MAX:
+        raise EvaluationError("Integer overflow")
+    return value
+
+
+def int_binary(op, left, right):
+    """Apply a binary operator with C int semantics"""
+    if op == "+":
+        return check_range(left + right)
+    if op == "-":
+        return check_range(left - right)
+    if op == "*":
+        return check_range(left * right)
+    if op in ("/", "%"):
+        if right == 0:
+            raise EvaluationError("Division by zero")
+        # C division truncates toward zero
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        if op == "/":
+            return check_range(quotient)
+        return left - right * quotient
+
+    comparisons = {
+        "<": left < right, ">": left > right,
+        "<=": left <= right, ">=": left >= right,
+        "==": left == right, "!=": left != right,
+    }
+    if op in comparisons:
+        return 1 if comparisons[op] else 0
+    raise EvaluationError(f"Unknown binary operator: {op}")
+
+
+class ReturnSignal(Exception):
+    """Unwinds the interpreter stack when a wapas statement executes"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class ConstantEvaluator:
+    """Interprets pure integer Hinglish functions over the AST.
+
+    Only functions taking and returning `ank` are evaluated.  Anything with an
+    observable effect (likho, globals) or behaviour that C leaves undefined
+    (overflow, division by zero) aborts evaluation with an EvaluationError so
+    the call is simply left for runtime.
+    """
+
+    def __init__(self, functions, fuel=100000, max_depth=64):
+        self.functions = functions  # Function name -> FunctionDeclaration
+        self.fuel = fuel            # Node visits allowed per evaluation
+        self.max_depth = max_depth  # Maximum interpreted call depth
+        self.remaining = fuel
+        self.depth = 0
+        self.scopes = []
+        self.memo = {}              # (name, args) -> result of completed calls
+
+    def evaluate(self, name, args):
+        """Evaluate a call to a function with constant integer arguments"""
+        self.remaining = self.fuel
+        self.depth = 0
+        self.scopes = []
+        try:
+            return self.call(name, args)
+        except RecursionError:
+            raise EvaluationError("Python recursion limit reached")
+
+    def is_candidate(self, func):
+        """Check whether a function has a signature the evaluator supports"""
+        if func.name == "main" or func.return_type is None:
+            return False
+        if func.return_type.value != "ank":
+            return False
+        return all(param.type.value == "ank" for param in func.params)
+
+    def call(self, name, args):
+        """Interpret a single function call"""
+        key = (name, tuple(args))
+        if key in self.memo:
+            return self.memo[key]
+
+        func = self.functions.get(name)
+        if func is None or not self.is_candidate(func):
+            raise EvaluationError(f"Function '{name}' cannot be evaluated at compile time")
+        if len(args) != len(func.params):
+            raise EvaluationError(f"Wrong number of arguments to '{name}'")
+        if self.depth >= self.max_depth:
+            raise EvaluationError(f"Recursion limit reached in '{name}'")
+
+        saved_scopes = self.scopes
+        self.scopes = [{param.name: arg for param, arg in zip(func.params, args)}]
+        self.depth += 1
+        try:
+            self.visit(func.body)
+        except ReturnSignal as signal:
+            result = signal.value
+        else:
+            raise EvaluationError(f"Function '{name}' ended without returning a value")
+        finally:
+            self.depth -= 1
+            self.scopes = saved_scopes
+
+        self.memo[key] = result
+        return result
+
+    def visit(self, node):
+        """Visit an AST node and dispatch to the appropriate method"""
+        self.remaining -= 1
+        if self.remaining < 0:
+            raise EvaluationError("Evaluation fuel exhausted")
+        method_name = f"visit_{type(node).__name__}"
+        method = getattr(self, method_name, self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node):
+        """Default handler for nodes with effects or unsupported types"""
+        raise EvaluationError(f"Cannot evaluate {type(node).__name__} at compile time")
+
+    # Statements
+    def visit_BlockStatement(self, block):
+        self.scopes.append({})
+        try:
+            for statement in block.statements:
+                self.visit(statement)
+        finally:
+            self.scopes.pop()
+
+    def visit_VarDeclaration(self, var_decl):
+        if var_decl.var_type.value != "ank":
+            raise EvaluationError(f"Unsupported variable type {var_decl.var_type.value}")
+        value = self.visit(var_decl.initializer) if var_decl.initializer else 0
+        self.scopes[-1][var_decl.name] = value
+
+    def visit_ExpressionStatement(self, expr_stmt):
+        self.visit(expr_stmt.expression)
+
+    def visit_IfStatement(self, if_stmt):
+        if self.visit(if_stmt.condition):
+            self.visit(if_stmt.then_branch)
+        elif if_stmt.else_branch:
+            self.visit(if_stmt.else_branch)
+
+    def visit_WhileStatement(self, while_stmt):
+        while self.visit(while_stmt.condition):
+            self.visit(while_stmt.body)
+
+    def visit_ForStatement(self, for_stmt):
+        self.scopes.append({})
+        try:
+            if for_stmt.initializer:
+                self.visit(for_stmt.initializer)
+            while for_stmt.condition is None or self.visit(for_stmt.condition):
+                self.visit(for_stmt.body)
+                if for_stmt.increment:
+                    self.visit(for_stmt.increment)
+        finally:
+            self.scopes.pop()
+
+    def visit_ReturnStatement(self, return_stmt):
+        if return_stmt.value is None:
+            raise EvaluationError("Return without a value")
+        raise ReturnSignal(self.visit(return_stmt.value))
+
+    # Expressions
+    def visit_Assignment(self, assign):
+        value = self.visit(assign.value)
+        for scope in reversed(self.scopes):
+            if assign.name in scope:
+                scope[assign.name] = value
+                return value
+        raise EvaluationError(f"Assignment to non-local variable '{assign.name}'")
+
+    def visit_Variable(self, variable):
+        for scope in reversed(self.scopes):
+            if variable.name in scope:
+                return scope[variable.name]
+        raise EvaluationError(f"Read of non-local variable '{variable.name}'")
+
+    def visit_Literal(self, literal):
+        value = literal.value
+        if isinstance(value, str) and value.isdigit():
+            return check_range(int(value))
+        raise EvaluationError(f"Unsupported literal {value!r}")
+
+    def visit_Grouping(self, grouping):
+        return self.visit(grouping.expression)
+
+    def visit_Unary(self, unary):
+        value = self.visit(unary.right)
+        if unary.operator.value == "-":
+            return check_range(-value)
+        if unary.operator.value == "nahi":
+            return 0 if value else 1
+        raise EvaluationError(f"Unknown unary operator: {unary.operator.value}")
+
+    def visit_Logical(self, logical):
+        left = self.visit(logical.left)
+        if logical.operator.value == "aur":
+            return 1 if left and self.visit(logical.right) else 0
+        if logical.operator.value == "ya":
+            return 1 if left or self.visit(logical.right) else 0
+        raise EvaluationError(f"Unknown logical operator: {logical.operator.value}")
+
+    def visit_Binary(self, binary):
+        left = self.visit(binary.left)
+        right = self.visit(binary.right)
+        return int_binary(binary.operator.value, left, right)
+
+    def visit_Call(self, call):
+        if not isinstance(call.callee, Variable):
+            raise EvaluationError("Cannot call a non-function value")
+        args = [self.visit(arg) for arg in call.arguments]
+        return self.call(call.callee.name, args)
+
+
+class ConstantCallFolder(NodeTransformer):
+    """Replaces calls with constant arguments by their compile-time result.
+
+    With build_tables enabled, expensive pure functions of one `ank` parameter
+    also get a `static const` lookup table covering the inputs 0..table_size-1
+    that could be evaluated, plus a range-checked lookup at function entry.
+    """
+
+    def __init__(self, fuel=100000, max_depth=64, build_tables=False, table_size=64):
+        self.fuel = fuel
+        self.max_depth = max_depth
+        self.build_tables = build_tables
+        self.table_size = table_size
+        self.evaluator = None
+        self.report = []  # (function name, arguments, result) for folded calls
+
+    def fold(self, program):
+        """Fold constant calls in the program and return the new program"""
+        self.evaluator = ConstantEvaluator(function_table(program), self.fuel, self.max_depth)
+        self.report = []
+        program = self.visit(program)
+        if self.build_tables:
+            program = self.add_lookup_tables(program)
+        return program
+
+    def visit_Call(self, call):
+        call = self.generic_visit(call)  # Fold nested calls in the arguments first
+        if not isinstance(call.callee, Variable):
+            return call
+
+        args = [int_constant(arg) for arg in call.arguments]
+        if any(arg is None for arg in args):
+            return call
+
+        try:
+            value = self.evaluator.evaluate(call.callee.name, args)
+        except EvaluationError:
+            return call
+
+        self.report.append((call.callee.name, args, value))
+        return int_literal(value)
+
+    def add_lookup_tables(self, program):
+        """Precompute lookup tables for expensive single-argument functions"""
+        called = set(self.called_functions(program))
+        tables = []
+        statements = []
+
+        for stmt in program.statements:
+            if (isinstance(stmt, FunctionDeclaration) and stmt.name in called
+                    and len(stmt.params) == 1 and self.evaluator.is_candidate(stmt)
+                    and self.is_expensive(stmt.body)):
+                values = []
+                for n in range(self.table_size):
+                    try:
+                        values.append(self.evaluator.evaluate(stmt.name, [n]))
+                    except EvaluationError:
+                        break
+
+                if len(values) > 1:
+                    table = ConstTable(f"hp_table_{stmt.name}", "ank", values)
+                    tables.append(table)
+                    stmt = self.with_table_lookup(stmt, table)
+
+            statements.append(stmt)
+
+        if not tables:
+            return program
+        return Program(tables + statements)
+
+    def with_table_lookup(self, func, table):
+        """Return a copy of the function that consults the table first
+
+        The guard is typed like analyzed code, since the IR lowering needs
+        a type on every expression.
+        """
+        param = variable(func.params[0].name, "ank")
+        at_least_zero = Binary(param, make_token(TokenType.GREATER_EQUAL, ">="), int_literal(0))
+        below_size = Binary(param, make_token(TokenType.LESS_THAN, "<"), int_literal(len(table.values)))
+        in_range = Logical(at_least_zero, make_token(TokenType.AND, "aur"), below_size)
+        for node in (at_least_zero, below_size, in_range):
+            node.type = "boolean"
+        lookup = TableLookup(table.name, param)
+        lookup.type = table.elem_type
+        guard = IfStatement(
+            in_range,
+            BlockStatement([ReturnStatement(lookup)]),
+            None,
+        )
+        body = BlockStatement([guard] + func.body.statements)
+        return FunctionDeclaration(func.name, func.params, func.return_type, body)
+
+    def called_functions(self, node):
+        """Yield the names of all functions called anywhere under a node"""
+        for child in walk(node):
+            if isinstance(child, Call) and isinstance(child.callee, Variable):
+                yield child.callee.name
+
+    def is_expensive(self, node):
+        """Check whether a subtree contains a loop or a call"""
+        return any(isinstance(child, (WhileStatement, ForStatement, Call)) for child in walk(node))
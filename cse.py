@@ -0,0 +1,273 @@
+import copy
+
+from parser import *  # Import all AST node classes
+from optimizer import TEMP_TYPES, NodeTransformer, declare_temp, walk
+
+# Node types that compute a value without side effects from their children
+PURE_NODES = (Binary, Unary, Grouping, Logical, TableLookup)
+
+
+class HashConser(NodeTransformer):
+    """Interns pure expression subtrees into a DAG.
+
+    Structurally equal subtrees are replaced by a single canonical node, so
+    equality checks become identity checks and duplicate subtrees are only
+    kept in memory once.  Canonical nodes are shared and must not be mutated.
+    """
+
+    def __init__(self):
+        self.table = {}         # Structural key -> canonical node
+        self.canonical = set()  # ids of the canonical nodes kept alive by the table
+
+    def visit(self, node):
+        node = super().visit(node)
+        key = self.key(node)
+        if key is None:
+            return node
+        canonical = self.table.setdefault(key, node)
+        self.canonical.add(id(canonical))
+        return canonical
+
+    def key(self, node):
+        """Return the structural key of a node, or None if it is not pure"""
+        node_type = getattr(node, 'type', None)
+        if isinstance(node, Literal):
+            return ('Literal', node.value, node_type)
+        if isinstance(node, Variable):
+            return ('Variable', node.name, node_type)
+
+        children = [child for child in vars(node).values() if isinstance(child, ASTNode)]
+        if not isinstance(node, PURE_NODES) or not all(id(c) in self.canonical for c in children):
+            return None
+        if isinstance(node, (Binary, Logical)):
+            return (type(node).__name__, node.operator.value, id(node.left), id(node.right))
+        if isinstance(node, Unary):
+            return ('Unary', node.operator.value, id(node.right))
+        if isinstance(node, TableLookup):
+            return ('TableLookup', node.table, id(node.index))
+        return ('Grouping', id(node.expression))
+
+
+class OccurrenceReplacer(NodeTransformer):
+    """Replaces selected occurrences of a canonical node, counted in scan order"""
+
+    def __init__(self, target, replacement, wanted):
+        self.target = target
+        self.replacement = replacement
+        self.wanted = wanted  # Ordinals of the occurrences to replace
+        self.seen = 0
+
+    def visit(self, node):
+        if node is self.target:
+            self.seen += 1
+            return self.replacement if self.seen in self.wanted else node
+        if isinstance(node, Logical):
+            # The right operand is evaluated conditionally and never scanned
+            left = self.visit(node.left)
+            if left is node.left:
+                return node
+            # A copy keeps the node's type annotation
+            logical = copy.copy(node)
+            logical.left = left
+            return logical
+        return super().visit(node)
+
+
+class CommonSubexpressionEliminator(NodeTransformer):
+    """Eliminates repeated pure expressions within straight-line code.
+
+    Each statement list is treated as a sequence of basic blocks.  Pure
+    subexpressions over local variables that are evaluated more than once
+    before any of their operands is reassigned are computed once into a
+    `hp_cse_<n>` temporary declared just before the first use.  Statements
+    with nested assignments and all control flow end a block for the
+    variables they may assign.
+    """
+
+    def __init__(self):
+        self.report = []  # (function, temporary, expression, uses)
+        self.global_names = set()
+        self.local_names = set()
+        self.current_function = None
+        self.temp_counter = 0
+
+    def eliminate(self, program):
+        """Run CSE on every function and return the new program"""
+        self.report = []
+        self.global_names = {stmt.name for stmt in program.statements
+                             if isinstance(stmt, VarDeclaration)}
+        return self.visit(program)
+
+    def visit_FunctionDeclaration(self, func):
+        self.current_function = func
+        self.local_names = {param.name for param in func.params}
+        self.local_names.update(node.name for node in walk(func.body)
+                                if isinstance(node, VarDeclaration))
+        self.local_names -= self.global_names
+
+        conser = HashConser()
+        body = self.visit(conser.visit(func.body))
+        self.current_function = None
+        if body is func.body:
+            return func
+        return FunctionDeclaration(func.name, func.params, func.return_type, body)
+
+    def visit_BlockStatement(self, block):
+        block = self.generic_visit(block)
+        if self.current_function is None:
+            return block
+        statements = self.eliminate_in(block.statements)
+        if statements is block.statements:
+            return block
+        return BlockStatement(statements)
+
+    # Analysis helpers
+    def is_candidate(self, node):
+        """Check whether an expression is worth computing into a temporary"""
+        if not isinstance(node, PURE_NODES):
+            return False
+        if getattr(node, 'type', None) not in TEMP_TYPES:
+            return False
+        has_variable = False
+        has_operator = False
+        for child in walk(node):
+            if isinstance(child, Variable):
+                if child.name not in self.local_names:
+                    return False
+                has_variable = True
+            elif isinstance(child, (Binary, Unary, Logical, TableLookup)):
+                has_operator = True
+            elif not isinstance(child, (Literal, Grouping)):
+                return False
+        return has_variable and has_operator
+
+    def statement_roots(self, stmt):
+        """Return the expressions a simple statement evaluates, or None"""
+        if isinstance(stmt, ExpressionStatement):
+            if isinstance(stmt.expression, Assignment):
+                roots = [stmt.expression.value]
+            else:
+                roots = [stmt.expression]
+        elif isinstance(stmt, VarDeclaration):
+            roots = [stmt.initializer] if stmt.initializer else []
+        elif isinstance(stmt, (PrintStatement, ReturnStatement)):
+            roots = [stmt.expression if isinstance(stmt, PrintStatement) else stmt.value]
+            roots = [root for root in roots if root is not None]
+        elif isinstance(stmt, IfStatement):
+            roots = [stmt.condition]
+        else:
+            return None
+
+        # Nested assignments make the evaluation order within C unspecified
+        for root in roots:
+            if any(isinstance(node, (Assignment, Sequence)) for node in walk(root)):
+                return None
+        return roots
+
+    def assigned_names(self, stmt):
+        """Names a statement may assign or redeclare"""
+        names = set()
+        for node in walk(stmt):
+            if isinstance(node, (Assignment, VarDeclaration)):
+                names.add(node.name)
+        return names
+
+    def scan(self, node, visit_occurrence):
+        """Visit candidate occurrences in evaluation order"""
+        if self.is_candidate(node):
+            visit_occurrence(node)
+        if isinstance(node, Logical):
+            self.scan(node.left, visit_occurrence)
+            return
+        for value in vars(node).values():
+            children = value if isinstance(value, list) else [value]
+            for child in children:
+                if isinstance(child, ASTNode):
+                    self.scan(child, visit_occurrence)
+
+    def find_groups(self, statements):
+        """Group occurrences of equal expressions between reassignments"""
+        active = {}   # id(canonical node) -> group
+        closed = []
+
+        for index, stmt in enumerate(statements):
+            roots = self.statement_roots(stmt)
+            if roots is not None:
+                ordinals = {}
+                has_call = any(isinstance(node, Call) for root in roots for node in walk(root))
+
+                def record(node):
+                    ordinals[id(node)] = ordinals.get(id(node), 0) + 1
+                    group = active.get(id(node))
+                    if group is None:
+                        names = {child.name for child in walk(node) if isinstance(child, Variable)}
+                        traps = any(isinstance(child, Binary) and child.operator.value in ("/", "%")
+                                    for child in walk(node))
+                        group = {'node': node, 'names': names, 'uses': [],
+                                 'hoistable': not (traps and has_call)}
+                        active[id(node)] = group
+                    group['uses'].append((index, ordinals[id(node)]))
+
+                for root in roots:
+                    self.scan(root, record)
+
+            # Reassigned operands end the lifetime of every expression using them
+            killed = self.assigned_names(stmt)
+            for key, group in list(active.items()):
+                if group['names'] & killed:
+                    closed.append(active.pop(key))
+
+        return closed + list(active.values())
+
+    def eliminate_in(self, statements):
+        """Repeatedly replace the most expensive redundant expression"""
+        while True:
+            groups = [group for group in self.find_groups(statements)
+                      if len(group['uses']) > 1 and group['hoistable']]
+            if not groups:
+                return statements
+            best = max(groups, key=lambda group: (
+                sum(1 for node in walk(group['node']) if not isinstance(node, (Literal, Variable, Grouping))),
+                -group['uses'][0][0],
+            ))
+            statements = self.replace_group(statements, best)
+
+    def replace_group(self, statements, group):
+        """Compute a group's expression once into a temporary"""
+        node = group['node']
+        self.temp_counter += 1
+        temp_name = f"hp_cse_{self.temp_counter}"
+        declaration, temp = declare_temp(temp_name, node)
+
+        wanted = {}
+        for index, ordinal in group['uses']:
+            wanted.setdefault(index, set()).add(ordinal)
+
+        result = []
+        for index, stmt in enumerate(statements):
+            if index == group['uses'][0][0]:
+                result.append(declaration)
+            if index in wanted:
+                stmt = self.replace_in_statement(stmt, node, temp, wanted[index])
+            result.append(stmt)
+
+        self.local_names.add(temp_name)
+        self.report.append((self.current_function.name, temp_name, node, len(group['uses'])))
+        return result
+
+    def replace_in_statement(self, stmt, node, temp, wanted):
+        """Replace occurrences in the expressions a statement evaluates"""
+        replacer = OccurrenceReplacer(node, temp, wanted)
+        if isinstance(stmt, ExpressionStatement):
+            if isinstance(stmt.expression, Assignment):
+                assignment = copy.copy(stmt.expression)
+                assignment.value = replacer.visit(assignment.value)
+                return ExpressionStatement(assignment)
+            return ExpressionStatement(replacer.visit(stmt.expression))
+        if isinstance(stmt, VarDeclaration):
+            return VarDeclaration(stmt.var_type, stmt.name, replacer.visit(stmt.initializer))
+        if isinstance(stmt, PrintStatement):
+            return PrintStatement(replacer.visit(stmt.expression))
+        if isinstance(stmt, ReturnStatement):
+            return ReturnStatement(replacer.visit(stmt.value))
+        return IfStatement(replacer.visit(stmt.condition), stmt.then_branch, stmt.else_branch)
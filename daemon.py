@@ -0,0 +1,163 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from build_cache import cache_root
+
+
+def default_socket_path():
+    """Socket of the compiler daemon, overridable with HPC_DAEMON_SOCKET"""
+    return os.environ.get("HPC_DAEMON_SOCKET") or os.path.join(cache_root(), "daemon.sock")
+
+
+def warm_up():
+    """Import the whole pipeline in a worker before its first request"""
+    import compiler, lexer, parser, sem_analyser, optimizer, generator  # noqa: F401
+    import ir_lowering, ir_passes, ir_codegen  # noqa: F401
+
+
+def handle_request(request):
+    """Run a compile or transpile request in a worker, capturing what it prints"""
+    from compiler import HinglishCompiler, choose_profile
+    start = time.perf_counter()
+    # Workers serve one request at a time, so they can take on the client's directory
+    os.chdir(request['cwd'])
+    options = request['options']
+    output = io.StringIO()
+    response = {}
+    with contextlib.redirect_stdout(output):
+        if request['action'] == 'transpile':
+            c_code = io.StringIO()
+            try:
+                HinglishCompiler(**options).transpile_to(request['source'], c_code)
+                response['success'] = True
+            except Exception as e:
+                print(f"Error during transpilation: {str(e)}")
+                response['success'] = False
+            response['c_code'] = c_code.getvalue()
+        else:
+            input_file = request['input_file']
+            profile = choose_profile(options['profile'], input_file, options['pgo'], options['verbose'])
+            compiler = HinglishCompiler(**dict(options, profile=profile))
+            response['success'] = compiler.compile(input_file, request['output_file'], request['keep_c'])
+    response['output'] = output.getvalue()
+    response['seconds'] = time.perf_counter() - start
+    return response
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request line and answers with one JSON response line"""
+
+    def handle(self):
+        start = time.perf_counter()
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        action = request.get('action')
+
+        if action == 'ping':
+            response = {'success': True}
+        elif action == 'shutdown':
+            response = {'success': True}
+        elif action in ('compile', 'transpile'):
+            try:
+                response = self.server.pool.submit(handle_request, request).result()
+            except Exception as e:
+                response = {'success': False, 'output': f"Error in compiler daemon: {str(e)}\n"}
+        else:
+            response = {'success': False, 'output': f"Error: Unknown daemon request '{action}'\n"}
+
+        self.wfile.write((json.dumps(response) + "\n").encode())
+        if action == 'shutdown':
+            # Handlers run in their own threads, so this cannot block serve_forever
+            self.server.shutdown()
+        elif action in ('compile', 'transpile'):
+            target = request.get('input_file') or '<stdin>'
+            print(f"{action} {target}: {(time.perf_counter() - start) * 1000:.1f} ms", flush=True)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CompilerDaemon:
+    """Keeps compiler processes warm and serves requests over a Unix domain socket.
+
+    Requests run in a pool of worker processes that imported the pipeline at
+    startup, so a request pays neither interpreter startup nor imports, and
+    per-process caches such as the gcc version stay filled between requests.
+    Each request and response is one line of JSON.
+    """
+
+    def __init__(self, socket_path=None, jobs=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.jobs = jobs or os.cpu_count() or 1
+
+    def serve_forever(self):
+        if DaemonClient(self.socket_path).running():
+            print(f"Error: A compiler daemon is already listening on '{self.socket_path}'")
+            return False
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # Left behind by a daemon that did not shut down cleanly
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+
+        with ProcessPoolExecutor(self.jobs, initializer=warm_up) as pool:
+            # Start every worker now rather than on the first requests
+            for future in [pool.submit(time.sleep, 0.01) for _ in range(self.jobs)]:
+                future.result()
+
+            server = DaemonServer(self.socket_path, DaemonRequestHandler)
+            server.pool = pool
+            print(f"Compiler daemon listening on '{self.socket_path}' with {self.jobs} workers", flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                os.remove(self.socket_path)
+        print("Compiler daemon stopped")
+        return True
+
+
+class DaemonClient:
+    """Sends requests to a running compiler daemon"""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+
+    def request(self, request):
+        """Send one request and return the response; raises OSError if no daemon answers"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(request) + "\n").encode())
+            line = sock.makefile('rb').readline()
+        if not line:
+            raise ConnectionError("The compiler daemon closed the connection")
+        return json.loads(line)
+
+    def running(self):
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            self.request({'action': 'ping'})
+            return True
+        except OSError:
+            return False
+
+    def compile(self, options, input_file, output_file=None, keep_c=False):
+        return self.request({'action': 'compile', 'cwd': os.getcwd(), 'options': options,
+                             'input_file': input_file, 'output_file': output_file, 'keep_c': keep_c})
+
+    def transpile(self, options, source_code):
+        return self.request({'action': 'transpile', 'cwd': os.getcwd(), 'options': options,
+                             'source': source_code})
+
+    def shutdown(self):
+        return self.request({'action': 'shutdown'})
@@ -0,0 +1,441 @@
+import hmac
+import ipaddress
+import json
+import os
+import re
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+
+from build_profiles import PROFILES
+
+DEFAULT_PORT = 8766
+
+# Largest message a peer may send: a JSON header, then a source file or an executable
+MAX_HEADER_SIZE = 1 << 20
+MAX_PAYLOAD_SIZE = 256 << 20
+
+# gcc flags a worker accepts from a coordinator: optimization, code generation,
+# warning and macro options, but none that name files or programs for gcc to
+# use, such as -wrapper, -B, -specs=, -fplugin=, -Wl,... or @file
+SAFE_GCC_FLAG = re.compile(r"-(O[0-3sgz]?|Ofast|g[0-3]?|s|static|m(arch|tune)=[\w.-]+|"
+                           r"f(no-)?[a-z0-9-]+|W(no-)?[a-z0-9-]+|[DU]\w+(=\w*)?)$")
+PROFILE_FLAGS = {flag for profile in PROFILES.values() for flag in profile.gcc_flags(static=True)}
+
+
+def parse_address(address):
+    """Split HOST:PORT (or just PORT) into a (host, port) pair"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port) if port else DEFAULT_PORT
+
+
+def allowed_gcc_flag(flag):
+    """Whether a worker builds with a gcc flag sent by a coordinator"""
+    return flag in PROFILE_FLAGS or SAFE_GCC_FLAG.match(flag) is not None
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def send_message(sock, header, payload=b""):
+    """Send a JSON header and a binary payload, each length-prefixed"""
+    data = json.dumps(dict(header, size=len(payload))).encode()
+    sock.sendall(struct.pack("!I", len(data)) + data + payload)
+
+
+def receive_message(stream):
+    """Read one message from a socket file; (None, b"") once the peer has closed.
+
+    Raises ValueError for a header that is malformed or announces more than
+    the size limits, before reading any more of it.
+    """
+    prefix = stream.read(4)
+    if len(prefix) < 4:
+        return None, b""
+    length = struct.unpack("!I", prefix)[0]
+    if length > MAX_HEADER_SIZE:
+        raise ValueError(f"Message header of {length} bytes exceeds the limit of {MAX_HEADER_SIZE}")
+    header = json.loads(stream.read(length))
+    if not isinstance(header, dict) or type(header.get('size')) is not int or header['size'] < 0:
+        raise ValueError("Malformed message header")
+    if header['size'] > MAX_PAYLOAD_SIZE:
+        raise ValueError(f"Message payload of {header['size']} bytes exceeds the limit of {MAX_PAYLOAD_SIZE}")
+    payload = stream.read(header['size'])
+    if len(payload) < header['size']:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return header, payload
+
+
+class Job:
+    """One program to build, and what came back for it"""
+
+    def __init__(self, index, source_file, source_code, gcc_flags):
+        self.index = index
+        self.source_file = source_file
+        self.source_code = source_code
+        self.gcc_flags = gcc_flags
+        self.attempts = 0
+        self.done = False
+        self.success = False
+        self.output = ""
+        self.executable = b""
+        self.c_code = None
+        self.worker = None
+        self.seconds = 0.0
+
+
+class Coordinator:
+    """Hands compile jobs to the workers connected to it and collects the results.
+
+    Every worker slot holds its own connection and asks for the next job
+    only once its previous one is done, so busy or slow workers get fewer
+    jobs.  A job whose worker disconnects or exceeds job_timeout goes back
+    in the queue, up to max_attempts times.  Results are kept by job index
+    and reported in input order, whichever worker finishes first.
+
+    With a token, workers must present the same one when they register.
+    It keeps stray peers out of a trusted network, but travels in the
+    clear, so the port must not be reachable from untrusted ones.
+    """
+
+    def __init__(self, address, options, max_attempts=3, job_timeout=300, idle_timeout=60, token=None,
+                 log=print):
+        self.address = address
+        self.options = options            # Transpiler settings sent along with every job
+        self.token = token                # Shared secret workers register with, or None to accept any
+        self.max_attempts = max_attempts
+        self.job_timeout = job_timeout    # Seconds a worker may take for one job
+        self.idle_timeout = idle_timeout  # Seconds to wait with work left but no workers
+        self.log = log
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.jobs = []
+        self.finished = 0
+        self.connections = set()
+        self.port = None                  # Port listened on, once listening, as address may give 0
+        self.listening = threading.Event()
+
+    def run(self, jobs, keep_c=False, on_result=None):
+        """Build every job; on_result is called with each job in input order"""
+        self.jobs = jobs
+        self.keep_c = keep_c
+        self.pending = deque(jobs)
+        self.finished = 0
+
+        server = socket.create_server(self.address)
+        self.port = server.getsockname()[1]
+        self.listening.set()
+        if self.token is None and not is_loopback(self.address[0]):
+            self.log("Warning: Any host that can reach the coordinator may register as a worker; "
+                     "set a shared token with --token or $HPC_DISTRIBUTED_TOKEN")
+        threading.Thread(target=self.accept, args=(server,), daemon=True).start()
+        self.log(f"Coordinator listening on {self.address[0]}:{self.port} "
+                 f"with {len(jobs)} jobs")
+        reported = 0
+        idle_since = time.monotonic()
+        try:
+            with self.condition:
+                while reported < len(jobs):
+                    # Results are passed on in input order as soon as they are available
+                    while reported < len(jobs) and jobs[reported].done:
+                        if on_result:
+                            on_result(jobs[reported])
+                        reported += 1
+                    if reported == len(jobs):
+                        break
+                    if self.connections:
+                        idle_since = time.monotonic()
+                    elif time.monotonic() - idle_since > self.idle_timeout:
+                        self.pending.clear()
+                        for job in jobs[reported:]:
+                            if not job.done:
+                                self.finish(job, f"Error: No workers connected for {self.idle_timeout}s\n")
+                        continue
+                    self.condition.wait(1)
+        finally:
+            server.close()
+            with self.condition:
+                connections = list(self.connections)
+            for connection in connections:
+                connection.close()
+        return all(job.success for job in jobs)
+
+    def accept(self, server):
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return  # The server socket was closed
+            threading.Thread(target=self.serve_worker, args=(connection,), daemon=True).start()
+
+    def next_job(self):
+        """Wait for a job to hand out; None once everything is finished"""
+        with self.condition:
+            while not self.pending:
+                if self.finished == len(self.jobs):
+                    return None
+                self.condition.wait()
+            job = self.pending.popleft()
+            job.attempts += 1
+            return job
+
+    def serve_worker(self, connection):
+        stream = connection.makefile('rb')
+        job = None
+        try:
+            header, _ = receive_message(stream)
+            if header is None or header.get('type') != 'register':
+                return
+            worker = header.get('name')
+            if not isinstance(worker, str):
+                self.log(f"Rejected worker from {connection.getpeername()[0]}: malformed registration")
+                send_message(connection, {'type': 'rejected', 'reason': "malformed registration"})
+                return
+            if not self.authorized(header.get('token')):
+                self.log(f"Rejected worker {worker} from {connection.getpeername()[0]}: invalid token")
+                send_message(connection, {'type': 'rejected', 'reason': "invalid token"})
+                return
+            with self.condition:
+                self.connections.add(connection)
+                self.condition.notify_all()
+
+            while True:
+                job = self.next_job()
+                if job is None:
+                    send_message(connection, {'type': 'shutdown'})
+                    return
+                start = time.perf_counter()
+                connection.settimeout(None)
+                send_message(connection, {'type': 'job', 'id': job.index, 'name': job.source_file,
+                                          'options': self.options, 'gcc_flags': job.gcc_flags,
+                                          'keep_c': self.keep_c}, job.source_code.encode())
+                connection.settimeout(self.job_timeout)
+                header, payload = receive_message(stream)
+                if header is None:
+                    raise ConnectionError("Worker disconnected")
+                self.complete(job, header, payload, worker, time.perf_counter() - start)
+                job = None
+        except (OSError, ValueError, KeyError) as e:
+            # KeyError: a result header without the fields complete() reads
+            if job is not None:
+                self.retry(job, e)
+        finally:
+            with self.condition:
+                self.connections.discard(connection)
+                self.condition.notify_all()
+            connection.close()
+
+    def authorized(self, token):
+        if self.token is None:
+            return True
+        return isinstance(token, str) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def complete(self, job, header, payload, worker, seconds):
+        with self.condition:
+            job.success = header['success']
+            job.c_code = header.get('c_code')
+            job.executable = payload
+            job.worker = worker
+            job.seconds = seconds
+            self.finish(job, header['output'])
+
+    def retry(self, job, error):
+        with self.condition:
+            if job.attempts < self.max_attempts:
+                self.log(f"Worker failed on {job.source_file} ({error}), retrying")
+                self.pending.append(job)
+                self.condition.notify_all()
+            else:
+                self.finish(job, f"Error: Gave up on {job.source_file} after {job.attempts} attempts ({error})\n")
+
+    def finish(self, job, output):
+        """Record a job's final outcome; the caller holds the condition"""
+        job.output = output
+        job.done = True
+        self.finished += 1
+        self.condition.notify_all()
+
+
+class CompileWorker:
+    """Connects to a coordinator and builds the jobs it sends.
+
+    Each of the `slots` threads holds its own connection and builds one job
+    at a time with a TranspileService and gcc, sending back the executable.
+    The worker exits when the coordinator has no more work.  gcc flags that
+    allowed_gcc_flag does not accept fail the job rather than reach gcc.
+    """
+
+    def __init__(self, address, slots=1, name=None, connect_timeout=60, token=None, log=print):
+        self.address = address
+        self.slots = slots
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.connect_timeout = connect_timeout  # Seconds to keep trying to reach the coordinator
+        self.token = token                      # Shared secret of the coordinator, if it has one
+        self.log = log
+        self.built = 0
+        self.rejected = False
+        self.lock = threading.Lock()
+
+    def run(self):
+        threads = [threading.Thread(target=self.serve_slot, args=(slot,)) for slot in range(self.slots)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.log(f"Worker {self.name} built {self.built} programs")
+        return not self.rejected
+
+    def connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection(self.address)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def serve_slot(self, slot):
+        try:
+            connection = self.connect()
+        except OSError as e:
+            self.log(f"Error: Cannot reach coordinator at {self.address[0]}:{self.address[1]}: {e}")
+            return
+        with connection:
+            stream = connection.makefile('rb')
+            register = {'type': 'register', 'name': f"{self.name}/{slot}"}
+            if self.token is not None:
+                register['token'] = self.token
+            send_message(connection, register)
+            while True:
+                try:
+                    header, payload = receive_message(stream)
+                except (OSError, ValueError):
+                    return
+                if header is None or header.get('type') == 'shutdown':
+                    return
+                if header.get('type') == 'rejected':
+                    self.log(f"Error: Coordinator rejected slot {slot}: {header.get('reason')}")
+                    self.rejected = True
+                    return
+                result, executable = self.build(header, payload)
+                try:
+                    send_message(connection, result, executable)
+                except OSError:
+                    return  # The coordinator gave up on the job, or stopped
+                with self.lock:
+                    self.built += 1
+
+    def build(self, job, payload):
+        """Build one job; returns the result header and executable.
+
+        Any failure, even of the worker itself such as gcc missing, comes
+        back as a failed result, so one bad job cannot end a slot.
+        """
+        try:
+            return self.build_job(job, payload.decode())
+        except Exception as e:
+            return {'type': 'result', 'id': job['id'], 'success': False,
+                    'output': f"Error on worker {self.name}: {e}\n"}, b""
+
+    def build_job(self, job, source_code):
+        """Transpile and compile one job; returns the result header and executable"""
+        from service import TranspileService
+        service = TranspileService(**job['options'])
+        transpiled = service.transpile(source_code)
+        # Messages read as they would from a local hpc run
+        output = [f"Semantic Error: {error}" for error in transpiled.errors]
+        result = {'type': 'result', 'id': job['id'], 'success': False}
+        refused = [flag for flag in job['gcc_flags'] if not allowed_gcc_flag(flag)]
+        if refused:
+            result['output'] = f"Error: Worker {self.name} refuses gcc flags: {' '.join(refused)}\n"
+            return result, b""
+        if job['keep_c']:
+            result['c_code'] = transpiled.c_code
+        if transpiled.c_code is None:
+            output = [f"Error during compilation: {error}" for error in transpiled.errors]
+            result['output'] = "\n".join(output) + "\n"
+            return result, b""
+
+        with tempfile.TemporaryDirectory(prefix="hpc-worker-") as workdir:
+            executable = os.path.join(workdir, "program")
+            try:
+                process = subprocess.run(['gcc', '-x', 'c', '-'] + job['gcc_flags'] + ['-o', executable],
+                                         input=transpiled.c_code.encode(),
+                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                output.append(f"Error: GCC compiler not found on worker {self.name}")
+                result['output'] = "\n".join(output) + "\n"
+                return result, b""
+            if process.returncode != 0:
+                output.append(f"GCC compilation failed: {process.stderr.decode()}")
+                result['output'] = "\n".join(output) + "\n"
+                return result, b""
+            with open(executable, 'rb') as f:
+                data = f.read()
+
+        result['success'] = True
+        result['output'] = "".join(line + "\n" for line in output)
+        return result, data
+
+
+def build_distributed(paths, options, address, keep_c=False, max_attempts=3, token=None):
+    """Build every program under paths on the workers of a coordinator at address"""
+    from batch import collect_sources, print_summary
+    from compiler import HinglishCompiler, choose_profile
+
+    jobs = []
+    for source_file in collect_sources(paths):
+        try:
+            with open(source_file) as f:
+                source_code = f.read()
+        except OSError as e:
+            print(f"Error reading source file '{source_file}': {e}")
+            return False
+        # gcc flags are settled here, where the programs' tuning files are
+        profile = choose_profile(options['profile'], source_file, verbose=options['verbose'])
+        compiler = HinglishCompiler(**dict(options, profile=profile))
+        gcc_flags = compiler.build_flags()
+        refused = [flag for flag in gcc_flags if not allowed_gcc_flag(flag)]
+        if refused:
+            print(f"Error: Workers do not accept the gcc flags {' '.join(refused)} for '{source_file}'")
+            return False
+        jobs.append(Job(len(jobs), source_file, source_code, gcc_flags))
+    if not jobs:
+        print("Error: No .hp files found")
+        return False
+
+    def write_result(job):
+        if not job.success:
+            print(f"{job.source_file}:")  # Failure messages do not name the file themselves
+        print(job.output, end="")
+        if not job.success:
+            return
+        executable = os.path.splitext(job.source_file)[0]
+        temporary = f"{executable}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(job.executable)
+        os.chmod(temporary, 0o755)
+        os.replace(temporary, executable)
+        if keep_c and job.c_code is not None:
+            with open(f"{executable}.c", 'w') as f:
+                f.write(job.c_code)
+        print(f"Successfully compiled '{job.source_file}' to '{executable}' on {job.worker}")
+
+    transpile_options = {name: options[name] for name in
+                         ('opt_level', 'lookup_tables', 'inline_max_size', 'inline_max_depth', 'backend', 'fused')}
+    coordinator = Coordinator(address, transpile_options, max_attempts, token=token)
+    start = time.perf_counter()
+    success = coordinator.run(jobs, keep_c, write_result)
+    workers = len({job.worker for job in jobs if job.worker})
+    print_summary([(job.source_file, job.success, job.seconds) for job in jobs],
+                  time.perf_counter() - start, f"{workers} worker slot{'s' if workers != 1 else ''}")
+    return success
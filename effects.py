@@ -0,0 +1,191 @@
+from parser import *  # Import all AST node classes
+from inliner import call_graph, is_recursive
+from optimizer import function_table, walk
+
+# Effect classes, ordered from most to least optimizable
+CONST = "const"    # Result depends only on the arguments
+PURE = "pure"      # May also read global variables
+IMPURE = "impure"  # Prints, writes globals or calls something that does
+
+EFFECT_ORDER = [CONST, PURE, IMPURE]
+
+
+class FunctionSummary:
+    """Local effects of a single function body, before looking at callees"""
+
+    def __init__(self):
+        self.prints = False
+        self.reads_globals = False
+        self.writes_globals = False
+        self.calls_unknown = False
+        self.callees = set()
+
+
+class EffectAnalyzer:
+    """Classifies every function as const, pure or impure.
+
+    Each function body is summarised once, then the summaries are combined
+    over the call graph by a fixed point that starts from the optimistic
+    assumption that everything is const, so recursive functions that only
+    compute on their arguments are still recognised as const.
+    """
+
+    def __init__(self):
+        self.global_names = set()
+        self.summaries = {}  # Function name -> FunctionSummary
+        self.effects = {}    # Function name -> CONST, PURE or IMPURE
+        self.scopes = []
+        self.summary = None
+
+    def analyze(self, program):
+        """Return a mapping from function names to their effect class"""
+        self.global_names = {stmt.name for stmt in program.statements
+                             if isinstance(stmt, VarDeclaration)}
+        self.summaries = {}
+        for stmt in program.statements:
+            if isinstance(stmt, FunctionDeclaration):
+                self.summaries[stmt.name] = self.summarize(stmt)
+
+        self.effects = {name: CONST for name in self.summaries}
+        changed = True
+        while changed:
+            changed = False
+            for name, summary in self.summaries.items():
+                effect = self.combine(summary)
+                if effect != self.effects[name]:
+                    self.effects[name] = effect
+                    changed = True
+        return self.effects
+
+    def combine(self, summary):
+        """Compute a function's effect from its summary and its callees"""
+        if summary.prints or summary.writes_globals or summary.calls_unknown:
+            return IMPURE
+        effect = PURE if summary.reads_globals else CONST
+        for callee in summary.callees:
+            callee_effect = self.effects.get(callee, IMPURE)  # Unknown functions
+            if EFFECT_ORDER.index(callee_effect) > EFFECT_ORDER.index(effect):
+                effect = callee_effect
+        return effect
+
+    def effect_of(self, name):
+        """Effect class of a function, treating unknown functions as impure"""
+        return self.effects.get(name, IMPURE)
+
+    # Summarising function bodies
+    def summarize(self, func):
+        """Collect the local effects of one function"""
+        self.summary = FunctionSummary()
+        self.scopes = [{param.name for param in func.params}]
+        self.visit(func.body)
+        return self.summary
+
+    def is_global(self, name):
+        """Check whether a name refers to a global in the current scope"""
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return False
+        return True  # Globals and undefined names are treated alike
+
+    def visit(self, node):
+        """Visit a node in the AST"""
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node):
+        """Visit all children of nodes without special scoping rules"""
+        for value in vars(node).values():
+            children = value if isinstance(value, list) else [value]
+            for child in children:
+                if isinstance(child, ASTNode):
+                    self.visit(child)
+
+    def visit_BlockStatement(self, block):
+        self.scopes.append(set())
+        for statement in block.statements:
+            self.visit(statement)
+        self.scopes.pop()
+
+    def visit_ForStatement(self, for_stmt):
+        self.scopes.append(set())
+        self.generic_visit(for_stmt)
+        self.scopes.pop()
+
+    def visit_VarDeclaration(self, var_decl):
+        if var_decl.initializer:
+            self.visit(var_decl.initializer)
+        self.scopes[-1].add(var_decl.name)
+
+    def visit_PrintStatement(self, print_stmt):
+        self.summary.prints = True
+        self.visit(print_stmt.expression)
+
+    def visit_Assignment(self, assign):
+        if self.is_global(assign.name):
+            self.summary.writes_globals = True
+        self.visit(assign.value)
+
+    def visit_Variable(self, variable):
+        if self.is_global(variable.name):
+            self.summary.reads_globals = True
+
+    def visit_Call(self, call):
+        if isinstance(call.callee, Variable):
+            self.summary.callees.add(call.callee.name)
+        else:
+            self.summary.calls_unknown = True
+        for arg in call.arguments:
+            self.visit(arg)
+
+
+def loop_callees(func):
+    """Names of the functions called inside the loops of a function"""
+    names = set()
+    for node in walk(func.body):
+        if isinstance(node, (WhileStatement, ForStatement)):
+            names.update(call.callee.name for call in walk(node)
+                         if isinstance(call, Call) and isinstance(call.callee, Variable))
+    return names
+
+
+def function_attributes(program):
+    """Map every function except main to the gcc attributes it qualifies for.
+
+    const and pure come from the effect analysis.  Functions main cannot
+    reach are cold; reachable ones that recurse or are called from a loop
+    are hot.
+    """
+    functions = function_table(program)
+    effects = EffectAnalyzer().analyze(program)
+    graph = call_graph(program)
+
+    reachable = set()
+    pending = ["main"]
+    while pending:
+        name = pending.pop()
+        if name in functions and name not in reachable:
+            reachable.add(name)
+            pending.extend(graph[name])
+    called_in_loops = set()
+    for name in reachable:
+        called_in_loops |= loop_callees(functions[name])
+
+    attributes = {}
+    for name, func in functions.items():
+        if name == "main":
+            continue
+        names = []
+        if func.return_type is not None:  # gcc ignores const and pure on void functions
+            effect = effects[name]
+            # const also forbids reading memory through pointer arguments
+            if effect == CONST and any(param.type.value == "vakya" for param in func.params):
+                effect = PURE
+            if effect != IMPURE:
+                names.append(effect)
+        if "main" in functions and name not in reachable:
+            names.append("cold")
+        elif name in called_in_loops or is_recursive(name, graph):
+            names.append("hot")
+        attributes[name] = names
+    return attributes
@@ -0,0 +1,193 @@
+from parser import *  # Import all AST node classes
+from c_support import C_TYPES
+from generator import CodeGenerator
+from sem_analyser import SemanticAnalyzer
+
+
+class FusedGenerator(CodeGenerator):
+    """Type-checks and generates C in a single traversal of the AST.
+
+    Each visit_* method makes the checks of its SemanticAnalyzer
+    counterpart, by calling the analyzer's own check methods in the same
+    order, while it emits the node's C, and annotates expressions with
+    their types as it goes, so likho picks the same formats.  The C and the
+    errors are those of analyzing and then generating at -O0.
+    """
+
+    def __init__(self, runtime=False):
+        super().__init__(runtime=runtime)
+        self.analyzer = SemanticAnalyzer()
+        self.symbol_table = self.analyzer.symbols
+        self.checking = True  # False inside expressions the analyzer would not visit
+
+    def transpile(self, program, stream, print_errors=True):
+        """Write the C for a parsed program into a stream; returns the analysis result"""
+        self.generate_to(program, stream)
+        return self.analyzer.report(print_errors)
+
+    def unchecked(self, expression):
+        """Generate an expression the analyzer skips after an error, without checking it"""
+        checking = self.checking
+        self.checking = False
+        try:
+            return self.visit(expression)
+        finally:
+            self.checking = checking
+
+    def typed(self, node, node_type, code):
+        """Annotate an expression with its type, as SemanticAnalyzer.visit does, and return its C"""
+        node.type = node_type
+        return code
+
+    def visit_Program(self, program):
+        """Generate code for a program node, declaring its functions first"""
+        self.analyzer.declare_functions(stmt for stmt in program.statements
+                                        if isinstance(stmt, FunctionDeclaration))
+        super().visit_Program(program)
+
+    def visit_FunctionDeclaration(self, func):
+        """Generate code for a function declaration inside its scope"""
+        self.analyzer.enter_function(func)
+        super().visit_FunctionDeclaration(func)
+        self.analyzer.exit_function()
+
+    def visit_VarDeclaration(self, var_decl):
+        """Generate code for a variable declaration and define the variable"""
+        self.analyzer.check_redefinition(var_decl.name)
+        super().visit_VarDeclaration(var_decl)
+        self.analyzer.define_variable(var_decl)
+
+    def visit_BlockStatement(self, block):
+        """Generate code for a block of statements in a new scope"""
+        self.analyzer.symbols.enter_scope()
+        super().visit_BlockStatement(block)
+        self.analyzer.symbols.exit_scope()
+
+    def condition(self, expression, statement):
+        """Generate the condition of a statement, which must be boolean"""
+        code = self.visit(expression)
+        self.analyzer.check_condition(expression.type, statement)
+        return code
+
+    def visit_IfStatement(self, if_stmt):
+        """Generate code for if statements"""
+        condition = self.condition(if_stmt.condition, "if")
+        self.c_code.append(f"{self.indent()}if ({condition}) {{")
+        self.indent_level += 1
+        self.visit(if_stmt.then_branch)
+        self.indent_level -= 1
+
+        if if_stmt.else_branch:
+            self.c_code.append(f"{self.indent()}}} else {{")
+            self.indent_level += 1
+            self.visit(if_stmt.else_branch)
+            self.indent_level -= 1
+
+        self.c_code.append(f"{self.indent()}}}")
+
+    def visit_WhileStatement(self, while_stmt):
+        """Generate code for while statements"""
+        condition = self.condition(while_stmt.condition, "while")
+        self.c_code.append(f"{self.indent()}while ({condition}) {{")
+        self.indent_level += 1
+        self.visit(while_stmt.body)
+        self.indent_level -= 1
+        self.c_code.append(f"{self.indent()}}}")
+
+    def visit_ForStatement(self, for_stmt):
+        """Generate code for for statements, whose initializer is scoped to the loop"""
+        self.analyzer.symbols.enter_scope()
+        initializer = ""
+        if isinstance(for_stmt.initializer, VarDeclaration):
+            var_decl = for_stmt.initializer
+            self.analyzer.check_redefinition(var_decl.name)
+            init_expr = self.visit(var_decl.initializer) if var_decl.initializer else "0"
+            self.analyzer.define_variable(var_decl)
+            initializer = f"{C_TYPES[var_decl.var_type.value]} {var_decl.name} = {init_expr}"
+        elif for_stmt.initializer:
+            initializer = self.visit(for_stmt.initializer)
+        condition = self.condition(for_stmt.condition, "for") if for_stmt.condition else ""
+        increment = self.visit(for_stmt.increment) if for_stmt.increment else ""
+
+        self.c_code.append(f"{self.indent()}for ({initializer}; {condition}; {increment}) {{")
+        self.indent_level += 1
+        self.visit(for_stmt.body)
+        self.indent_level -= 1
+        self.c_code.append(f"{self.indent()}}}")
+        self.analyzer.symbols.exit_scope()
+
+    def visit_ReturnStatement(self, return_stmt):
+        """Generate code for return statements, checking them against the current function"""
+        expected_type = self.analyzer.expected_return_type(return_stmt)
+        if return_stmt.value is None:
+            self.c_code.append(f"{self.indent()}return;")
+        elif expected_type is None:
+            self.c_code.append(f"{self.indent()}return {self.unchecked(return_stmt.value)};")
+        else:
+            value = self.visit(return_stmt.value)
+            self.analyzer.check_return_type(expected_type, return_stmt.value.type)
+            self.c_code.append(f"{self.indent()}return {value};")
+
+    def visit_Assignment(self, assign):
+        """Generate code for assignment expressions"""
+        if not self.checking:
+            return super().visit_Assignment(assign)
+        var_type = self.analyzer.variable_type(assign.name)
+        if var_type is None:
+            return self.typed(assign, "unknown", f"{assign.name} = {self.unchecked(assign.value)}")
+        code = super().visit_Assignment(assign)
+        self.analyzer.check_assignable(assign.name, var_type, assign.value.type)
+        return self.typed(assign, var_type, code)
+
+    def visit_Logical(self, logical):
+        """Generate code for logical expressions, whose operands must be boolean"""
+        code = super().visit_Logical(logical)
+        if not self.checking:
+            return code
+        return self.typed(logical, self.analyzer.logical_type(logical.left.type, logical.right.type), code)
+
+    def visit_Binary(self, binary):
+        """Generate code for binary expressions, typing them as the analyzer does"""
+        code = super().visit_Binary(binary)
+        if not self.checking:
+            return code
+        binary_type = self.analyzer.binary_type(binary.operator.value, binary.left.type, binary.right.type)
+        return self.typed(binary, binary_type, code)
+
+    def visit_Unary(self, unary):
+        """Generate code for unary expressions, typing them as the analyzer does"""
+        code = super().visit_Unary(unary)
+        if not self.checking:
+            return code
+        return self.typed(unary, self.analyzer.unary_type(unary.operator.value, unary.right.type), code)
+
+    def visit_Call(self, call):
+        """Generate code for function calls, checking the callee is a known function"""
+        if not self.checking:
+            return super().visit_Call(call)
+        # The analyzer never visits the callee itself
+        callee = self.unchecked(call.callee)
+        call_type, check_arguments = self.analyzer.call_type(call)
+        generate_arg = self.visit if check_arguments else self.unchecked
+        args = [generate_arg(arg) for arg in call.arguments]
+        return self.typed(call, call_type, f"{callee}({', '.join(args)})")
+
+    def visit_Variable(self, variable):
+        """Generate code for variable references, which must be defined"""
+        if self.checking:
+            return self.typed(variable, self.analyzer.visit_Variable(variable), variable.name)
+        return variable.name
+
+    def visit_Literal(self, literal):
+        """Generate code for literals, typing them as the analyzer does"""
+        code = super().visit_Literal(literal)
+        if self.checking:
+            return self.typed(literal, self.analyzer.visit_Literal(literal), code)
+        return code
+
+    def visit_Grouping(self, grouping):
+        """Generate code for grouped expressions, which take the type of their contents"""
+        code = super().visit_Grouping(grouping)
+        if not self.checking:
+            return code
+        return self.typed(grouping, grouping.expression.type, code)
@@ -1,14 +1,27 @@
+import io
+
 from parser import *  # Import all AST node classes
+from c_support import C_TYPES, RUNTIME_INCLUDES, STANDARD_INCLUDES, escape, print_call
+from code_writer import INDENTS, CodeWriter
 
 class CodeGenerator:
-    def __init__(self, symbol_table=None):
+    def __init__(self, symbol_table=None, runtime=False, attributes=False):
         self.c_code = []
         self.indent_level = 0
         self.symbol_table = symbol_table  # Store the symbol table
+        self.external_linkage = False     # Functions visible to other translation units
+        self.runtime = runtime            # Include hinglish_rt.h and print through it
+        self.attributes = attributes      # Give prototypes gcc attributes from effect analysis
     
     def generate(self, program, symbol_table=None):
         """Convert AST to C code"""
-        self.c_code = []
+        output = io.StringIO()
+        self.generate_to(program, output, symbol_table)
+        return output.getvalue()
+    
+    def generate_to(self, program, stream, symbol_table=None):
+        """Convert AST to C code, streaming it into a text or binary stream"""
+        self.c_code = CodeWriter(stream)
         self.indent_level = 0
         
         # Use provided symbol table or the one from initialization
@@ -16,11 +29,11 @@ class CodeGenerator:
             self.symbol_table = symbol_table
             
         self.visit(program)
-        return "\n".join(self.c_code)
+        self.c_code.flush()
     
     def indent(self):
         """Return the current indentation string"""
-        return "    " * self.indent_level
+        return INDENTS[self.indent_level]
     
     def visit(self, node):
         """Visit an AST node and dispatch to the appropriate method"""
@@ -34,18 +47,140 @@ class CodeGenerator:
     
     def visit_Program(self, program):
         """Generate code for a program node"""
-        # Include standard headers
-        self.c_code.append("#include <stdio.h>")
-        self.c_code.append("#include <stdlib.h>")
-        self.c_code.append("#include <string.h>")
-        self.c_code.append("")
+        # Include standard headers, or the runtime header that includes them
+        self.c_code.extend(self.includes())
+        
+        # Prototypes make call order independent of definition order and
+        # carry the attributes gcc needs to optimize across calls
+        prototypes = self.prototypes(program)
+        self.c_code.extend(prototypes)
+        if prototypes:
+            self.c_code.append("")
         
         # Generate code for all statements
         for statement in program.statements:
             self.visit(statement)
     
+    def includes(self):
+        """Return the #include lines that open a generated file"""
+        return (RUNTIME_INCLUDES if self.runtime else STANDARD_INCLUDES) + [""]
+    
+    def prototypes(self, program, attributes=None):
+        """Return the prototype lines of every function except main"""
+        linkage = "" if self.external_linkage else "static "
+        if attributes is None:
+            attributes = self.function_attributes(program)
+        lines = []
+        for func in program.statements:
+            if isinstance(func, FunctionDeclaration) and func.name != "main":
+                names = attributes.get(func.name)
+                suffix = f" __attribute__(({', '.join(names)}))" if names else ""
+                lines.append(f"{linkage}{self.function_signature(func)}{suffix};")
+        return lines
+    
+    def function_attributes(self, program):
+        """Map function names to their gcc attributes, if the generator emits any"""
+        if not self.attributes:
+            return {}
+        # Effect analysis shares the optimizer's call graph, so only optimized builds pay for it
+        from effects import function_attributes
+        return function_attributes(program)
+    
+    def generate_declarations_to(self, signatures, declarations, stream):
+        """
+        Convert top-level declarations to C one at a time as they are produced.
+        
+        signatures lists every function of the program, bodies not required,
+        for the prototypes; without the bodies they carry no gcc attributes.
+        declarations can be a generator, and nothing is kept from one
+        declaration to the next besides what the stream has not taken yet.
+        """
+        self.c_code = CodeWriter(stream)
+        self.indent_level = 0
+        self.c_code.extend(self.includes())
+        prototypes = self.prototypes(Program(signatures), attributes={})
+        self.c_code.extend(prototypes)
+        if prototypes:
+            self.c_code.append("")
+        
+        for declaration in declarations:
+            self.visit(declaration)
+        self.c_code.flush()
+    
+    def generate_units(self, program, header_name, symbol_table=None, unit_size=1):
+        """
+        Split a program into a shared header and separately compilable units.
+        
+        Returns (header, units) where units is a list of (name, code): one per
+        unit_size consecutive functions, named after the first of them, plus
+        "globals" defining the global variables if there are any.  The header holds the includes, lookup tables, extern
+        declarations of the globals and the prototypes, and every unit
+        includes it as header_name.
+        """
+        if symbol_table:
+            self.symbol_table = symbol_table
+        self.external_linkage = True
+        
+        header = io.StringIO()
+        self.c_code = CodeWriter(header)
+        self.indent_level = 0
+        self.c_code.extend(self.includes())
+        for statement in program.statements:
+            if isinstance(statement, ConstTable):
+                self.visit(statement)
+        globals_ = [stmt for stmt in program.statements if isinstance(stmt, VarDeclaration)]
+        for var_decl in globals_:
+            self.c_code.append(f"extern {C_TYPES[var_decl.var_type.value]} {var_decl.name};")
+        if globals_:
+            self.c_code.append("")
+        self.c_code.extend(self.prototypes(program))
+        self.c_code.append("")
+        self.c_code.flush()
+        
+        # gcc only uses the precompiled runtime header if it comes first
+        include = "".join(line + "\n" for line in RUNTIME_INCLUDES) if self.runtime else ""
+        include += f'#include "{header_name}"\n\n'
+        units = []
+        if globals_:
+            units.append(("globals", include + self.render(globals_)))
+        functions = [stmt for stmt in program.statements if isinstance(stmt, FunctionDeclaration)]
+        for start in range(0, len(functions), unit_size):
+            group = functions[start:start + unit_size]
+            units.append((group[0].name, include + self.render(group)))
+        return header.getvalue(), units
+    
+    def render(self, statements):
+        """Return the C code of top-level statements as a string"""
+        output = io.StringIO()
+        self.c_code = CodeWriter(output)
+        self.indent_level = 0
+        for statement in statements:
+            self.visit(statement)
+        self.c_code.append("")
+        self.c_code.flush()
+        return output.getvalue()
+    
     def visit_FunctionDeclaration(self, func):
         """Generate code for a function declaration"""
+        # Everything except main is private to the translation unit,
+        # unless the functions are split over several units
+        linkage = "" if func.name == "main" or self.external_linkage else "static "
+        self.c_code.append(f"{linkage}{self.function_signature(func)} {{")
+        self.indent_level += 1
+        
+        # Function body
+        self.visit(func.body)
+        
+        # Add default return for main if needed - FIX HERE
+        if func.name == "main" and not any(isinstance(stmt, ReturnStatement) for stmt in func.body.statements):
+            self.c_code.append(f"{self.indent()}return 0;")
+        
+        self.indent_level -= 1
+        self.c_code.append("}")
+        self.c_code.append("")
+    
+    def function_signature(self, func):
+        """Return the C return type, name and parameter list of a function"""
         # Determine return type
         return_type = "int" if func.name == "main" or (func.return_type and func.return_type.value == "ank") else \
                       "float" if func.return_type and func.return_type.value == "sankhya" else \
@@ -63,21 +198,7 @@ class CodeGenerator:
             params.append(f"{param_type} {param.name}")
         
         param_list = ", ".join(params) if params else "void"
-        
-        # Function header
-        self.c_code.append(f"{return_type} {func.name}({param_list}) {{")
-        self.indent_level += 1
-        
-        # Function body
-        self.visit(func.body)
-        
-        # Add default return for main if needed - FIX HERE
-        if func.name == "main" and not any(isinstance(stmt, ReturnStatement) for stmt in func.body.statements):
-            self.c_code.append(f"{self.indent()}return 0;")
-        
-        self.indent_level -= 1
-        self.c_code.append("}")
-        self.c_code.append("")
+        return f"{return_type} {func.name}({param_list})"
     
     def visit_VarDeclaration(self, var_decl):
         """Generate code for variable declarations"""
@@ -150,52 +271,45 @@ class CodeGenerator:
     def visit_PrintStatement(self, print_stmt):
         """Generate code for print statements"""
         expr = self.visit(print_stmt.expression)
-        
+        self.c_code.append(f"{self.indent()}{print_call(self.print_type(print_stmt.expression), expr, self.runtime)}")
+    
+    def print_type(self, expression):
+        """Hinglish type a printed expression is formatted as"""
         # Try to determine the type of the expression
-        if isinstance(print_stmt.expression, Literal):
-            value = print_stmt.expression.value
+        if isinstance(expression, Literal):
+            value = expression.value
             if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
-                self.c_code.append(f"{self.indent()}printf(\"%d\\n\", {expr});")
+                return "ank"
             elif isinstance(value, float) or self.is_float(value):
-                self.c_code.append(f"{self.indent()}printf(\"%f\\n\", {expr});")
+                return "sankhya"
             elif isinstance(value, str):
                 if len(value) == 1 and value.startswith("'") and value.endswith("'"):
                     # Character
-                    self.c_code.append(f"{self.indent()}printf(\"%c\\n\", {expr});")
+                    return "akshar"
                 else:
                     # String
-                    self.c_code.append(f"{self.indent()}printf(\"%s\\n\", {expr});")
-        elif isinstance(print_stmt.expression, Variable):
-            var_name = print_stmt.expression.name
+                    return "vakya"
+        elif isinstance(expression, Variable):
+            var_name = expression.name
             
             # Use type annotation if available from semantic analyzer
-            if hasattr(print_stmt.expression, 'type'):
-                var_type = print_stmt.expression.type
+            if hasattr(expression, 'type'):
+                var_type = expression.type
             # Or look up in symbol table
             elif self.symbol_table:
                 var_type = self.symbol_table.lookup(var_name)
             else:
                 var_type = None
                 
-            if var_type == "vakya":
-                self.c_code.append(f"{self.indent()}printf(\"%s\\n\", {expr});")
-            elif var_type == "akshar":
-                self.c_code.append(f"{self.indent()}printf(\"%c\\n\", {expr});")
-            elif var_type == "ank":
-                self.c_code.append(f"{self.indent()}printf(\"%d\\n\", {expr});")
-            elif var_type == "sankhya":
-                self.c_code.append(f"{self.indent()}printf(\"%f\\n\", {expr});")
-            else:
-                # Fall back to guessing based on variable name
-                if var_name == 'message' or var_name.endswith('_msg') or var_name.endswith('_str'):
-                    self.c_code.append(f"{self.indent()}printf(\"%s\\n\", {expr});")
-                elif var_name == 'first' or var_name == 'ch' or (len(var_name) == 1 and var_name.isalpha()):
-                    self.c_code.append(f"{self.indent()}printf(\"%c\\n\", {expr});")
-                else:
-                    self.c_code.append(f"{self.indent()}printf(\"%d\\n\", {expr});")
-        else:
-            # Default to integer for complex expressions
-            self.c_code.append(f"{self.indent()}printf(\"%d\\n\", {expr});")
+            if var_type in ("vakya", "akshar", "ank", "sankhya"):
+                return var_type
+            # Fall back to guessing based on variable name
+            if var_name == 'message' or var_name.endswith('_msg') or var_name.endswith('_str'):
+                return "vakya"
+            elif var_name == 'first' or var_name == 'ch' or (len(var_name) == 1 and var_name.isalpha()):
+                return "akshar"
+        # Default to integer for complex expressions
+        return "ank"
     
     def visit_IfStatement(self, if_stmt):
         """Generate code for if statements"""
@@ -213,6 +327,36 @@ class CodeGenerator:
         
         self.c_code.append(f"{self.indent()}}}")
     
+    def visit_SwitchStatement(self, switch):
+        """Generate a switch for an if-else chain lowered by the optimizer"""
+        subject = self.visit(switch.subject)
+        self.c_code.append(f"{self.indent()}switch ({subject}) {{")
+        self.indent_level += 1
+        for case in switch.cases:
+            labels = [f"case {self.case_label(value)}:" for value in case.values]
+            self.visit_case(labels, case.body)
+        if switch.default:
+            self.visit_case(["default:"], switch.default)
+        self.indent_level -= 1
+        self.c_code.append(f"{self.indent()}}}")
+    
+    def visit_case(self, labels, body):
+        """Generate one switch case, braced so its body can declare variables"""
+        for label in labels[:-1]:
+            self.c_code.append(f"{self.indent()}{label}")
+        self.c_code.append(f"{self.indent()}{labels[-1]} {{")
+        self.indent_level += 1
+        self.visit(body)
+        self.c_code.append(f"{self.indent()}break;")
+        self.indent_level -= 1
+        self.c_code.append(f"{self.indent()}}}")
+    
+    def case_label(self, value):
+        """Return the C constant for a case value"""
+        if isinstance(value, int):
+            return str(value)
+        return f"'{escape(value, chr(39))}'"
+    
     def visit_WhileStatement(self, while_stmt):
         """Generate code for while statements"""
         condition = self.visit(while_stmt.condition)
@@ -352,7 +496,32 @@ class CodeGenerator:
         callee = self.visit(call.callee)
         args = [self.visit(arg) for arg in call.arguments]
         return f"{callee}({', '.join(args)})"
+
+    def visit_Sequence(self, sequence):
+        """Generate a comma expression evaluating its parts in order"""
+        parts = [self.visit(expr) for expr in sequence.expressions]
+        return f"({', '.join(parts)})"
     
+    def visit_ConstTable(self, table):
+        """Generate a static lookup table precomputed at compile time"""
+        elem_type = "int" if table.elem_type == "ank" else \
+                    "float" if table.elem_type == "sankhya" else \
+                    "char"
+        self.c_code.append(f"static const {elem_type} {table.name}[{len(table.values)}] = {{")
+
+        # Ten values per line keeps large tables readable
+        for start in range(0, len(table.values), 10):
+            row = ", ".join(str(value) for value in table.values[start:start + 10])
+            self.c_code.append(f"    {row},")
+
+        self.c_code.append("};")
+        self.c_code.append("")
+
+    def visit_TableLookup(self, lookup):
+        """Generate code for indexing a precomputed table"""
+        index = self.visit(lookup.index)
+        return f"{lookup.table}[{index}]"
+
     # Utility methods
     def is_float(self, value):
         """Check if a string can be parsed as a float"""
@@ -397,13 +566,10 @@ if __name__ == "__main__":
             print("Semantic analysis failed. Cannot generate code.")
             sys.exit(1)
         
-        # Generate code
+        # Generate code straight into the output file
         generator = CodeGenerator()
-        c_code = generator.generate(ast)
-        
-        # Write to output file
         with open(output_file, 'w') as f:
-            f.write(c_code)
+            generator.generate_to(ast, f)
         
         print(f"Successfully translated {input_file} to {output_file}")
         
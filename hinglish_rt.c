@@ -0,0 +1,34 @@
+/* Runtime support for C generated by the Hinglish transpiler. */
+#include "hinglish_rt.h"
+
+void hrt_print_ank(int value) {
+    /* Formatting by hand skips parsing a printf format on every print */
+    char buffer[16];
+    char *end = buffer + sizeof buffer;
+    char *digits = end;
+    unsigned int magnitude = value < 0 ? 0u - (unsigned int)value : (unsigned int)value;
+
+    *--digits = '\n';
+    do {
+        *--digits = (char)('0' + magnitude % 10);
+        magnitude /= 10;
+    } while (magnitude);
+    if (value < 0) {
+        *--digits = '-';
+    }
+    fwrite(digits, 1, (size_t)(end - digits), stdout);
+}
+
+void hrt_print_sankhya(double value) {
+    printf("%f\n", value);
+}
+
+void hrt_print_vakya(const char *value) {
+    fputs(value, stdout);
+    putchar('\n');
+}
+
+void hrt_print_akshar(char value) {
+    putchar(value);
+    putchar('\n');
+}
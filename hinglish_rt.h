@@ -0,0 +1,20 @@
+/* Runtime support for C generated by the Hinglish transpiler.
+ *
+ * hpc compiles this header once per set of gcc flags into a precompiled
+ * header and hinglish_rt.c into libhinglish_rt.a, so building a program
+ * only compiles the program's own code.
+ */
+#ifndef HINGLISH_RT_H
+#define HINGLISH_RT_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* likho: print a value of each Hinglish type on its own line */
+void hrt_print_ank(int value);
+void hrt_print_sankhya(double value);
+void hrt_print_vakya(const char *value);
+void hrt_print_akshar(char value);
+
+#endif
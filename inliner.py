@@ -0,0 +1,176 @@
+from parser import *  # Import all AST node classes
+from optimizer import NodeTransformer, function_table, variable, walk
+
+
+def expression_size(node):
+    """Count the AST nodes in an expression"""
+    return sum(1 for _ in walk(node))
+
+
+def call_graph(program):
+    """Map each function name to the set of function names it calls"""
+    graph = {}
+    for name, func in function_table(program).items():
+        graph[name] = {node.callee.name for node in walk(func.body)
+                       if isinstance(node, Call) and isinstance(node.callee, Variable)}
+    return graph
+
+
+def is_recursive(name, graph):
+    """Check whether a function can reach itself through the call graph"""
+    seen = set()
+    pending = list(graph.get(name, ()))
+    while pending:
+        callee = pending.pop()
+        if callee == name:
+            return True
+        if callee not in seen:
+            seen.add(callee)
+            pending.extend(graph.get(callee, ()))
+    return False
+
+
+class Substituter(NodeTransformer):
+    """Replaces variable references by name with the given expressions"""
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def visit_Variable(self, var):
+        return self.mapping.get(var.name, var)
+
+
+class Inliner(NodeTransformer):
+    """Substitutes the bodies of small expression functions at their call sites.
+
+    A function qualifies when its body is a single `wapas <expr>;`, it is not
+    (mutually) recursive, the expression assigns nothing and has at most
+    max_size nodes.  Arguments that are not literals or caller locals are
+    bound to fresh temporaries in a comma expression, so each argument is
+    still evaluated exactly once and in order before the body.
+    """
+
+    def __init__(self, max_size=16, max_depth=3):
+        self.max_size = max_size    # Largest callee expression, in AST nodes
+        self.max_depth = max_depth  # How many levels of nested calls to inline
+        self.candidates = {}
+        self.report = []            # (caller, callee, depth) per inlined call
+        self.current_function = None
+        self.scope_names = set()
+        self.temp_decls = []
+        self.depth = 0
+        self.temp_counter = 0
+
+    def inline(self, program):
+        """Inline eligible calls in the program and return the new program"""
+        graph = call_graph(program)
+        self.candidates = {}
+        for name, func in function_table(program).items():
+            if self.is_candidate(func, graph):
+                self.candidates[name] = func
+        self.report = []
+        return self.visit(program)
+
+    def is_candidate(self, func, graph):
+        """Check whether a function is small enough and safe to inline"""
+        if func.name == "main" or func.return_type is None:
+            return False
+        statements = func.body.statements
+        if len(statements) != 1 or not isinstance(statements[0], ReturnStatement):
+            return False
+
+        expr = statements[0].value
+        if expr is None or expression_size(expr) > self.max_size:
+            return False
+        if any(isinstance(node, Assignment) for node in walk(expr)):
+            return False
+        # The result must already have the declared return type, since the
+        # implicit conversion of the C return statement disappears.
+        if getattr(expr, 'type', None) != func.return_type.value:
+            return False
+        return not is_recursive(func.name, graph)
+
+    def visit_FunctionDeclaration(self, func):
+        self.current_function = func
+        self.scope_names = {param.name for param in func.params}
+        self.scope_names.update(node.name for node in walk(func.body)
+                                if isinstance(node, VarDeclaration))
+        self.temp_decls = []
+
+        body = self.visit(func.body)
+        if self.temp_decls:
+            body = BlockStatement(self.temp_decls + body.statements)
+
+        self.current_function = None
+        if body is func.body:
+            return func
+        return FunctionDeclaration(func.name, func.params, func.return_type, body)
+
+    def visit_Call(self, call):
+        call = self.generic_visit(call)
+        if (self.current_function is None or self.depth >= self.max_depth
+                or not isinstance(call.callee, Variable)):
+            return call
+
+        callee = self.candidates.get(call.callee.name)
+        if callee is None or len(call.arguments) != len(callee.params):
+            return call
+
+        expr = callee.body.statements[0].value
+        # Names the body reads from the global scope must not be captured by
+        # locals of the caller or parameters of callees being inlined
+        params = {param.name for param in callee.params}
+        free_names = {node.name for node in walk(expr) if isinstance(node, Variable)} - params
+        free_names.update(node.callee.name for node in walk(expr)
+                          if isinstance(node, Call) and isinstance(node.callee, Variable))
+        if free_names & self.scope_names:
+            return call
+
+        # Inline calls inside the callee body first, with its parameters in scope
+        saved_names = self.scope_names
+        self.scope_names = saved_names | params
+        self.depth += 1
+        body = self.visit(expr)
+        self.depth -= 1
+        self.scope_names = saved_names
+
+        assigned = {node.name for arg in call.arguments for node in walk(arg)
+                    if isinstance(node, Assignment)}
+        mapping = {}
+        bindings = []
+        for param, arg in zip(callee.params, call.arguments):
+            if self.is_simple_argument(arg, param, assigned):
+                mapping[param.name] = arg
+            else:
+                temp = self.new_temp(callee.name, param)
+                binding = Assignment(temp.name, arg)
+                binding.type = param.type.value
+                bindings.append(binding)
+                mapping[param.name] = temp
+
+        result = Grouping(Substituter(mapping).visit(body))
+        result.type = callee.return_type.value
+        if bindings:
+            result = Sequence(bindings + [result])
+            result.type = callee.return_type.value
+
+        self.report.append((self.current_function.name, callee.name, self.depth + 1))
+        return result
+
+    def is_simple_argument(self, arg, param, assigned):
+        """Check whether an argument can be substituted without a temporary"""
+        if getattr(arg, 'type', None) != param.type.value:
+            return False  # A temporary performs the parameter type conversion
+        if isinstance(arg, Literal):
+            return True
+        # Caller locals cannot change while a pure expression body runs
+        return (isinstance(arg, Variable) and arg.name in self.scope_names
+                and arg.name not in assigned)
+
+    def new_temp(self, callee_name, param):
+        """Declare a fresh temporary in the calling function"""
+        self.temp_counter += 1
+        name = f"hp_inl_{callee_name}_{param.name}_{self.temp_counter}"
+        self.temp_decls.append(VarDeclaration(param.type, name, None))
+        self.scope_names.add(name)
+        return variable(name, param.type.value)
@@ -0,0 +1,285 @@
+# Typed three-address intermediate representation.
+#
+# A module holds globals, constant tables and functions.  Each function is a
+# list of basic blocks forming a control-flow graph: a block is a straight
+# sequence of instructions ended by exactly one terminator (Jump, Branch or
+# Return).  Every instruction reads at most two operands and writes at most
+# one destination, which keeps optimization passes simple.
+
+
+class IRVerificationError(Exception):
+    """Raised when a function violates an IR invariant"""
+    pass
+
+
+# Values
+class Value:
+    pass
+
+
+class Const(Value):
+    def __init__(self, value, type):
+        self.value = value  # Python int, float or str
+        self.type = type
+    def __eq__(self, other):
+        return isinstance(other, Const) and (self.value, self.type) == (other.value, other.type)
+    def __hash__(self):
+        return hash((self.value, self.type))
+    def __repr__(self):
+        return repr(self.value) if isinstance(self.value, str) else str(self.value)
+
+
+class Var(Value):
+    """A named storage location: parameter, local, compiler temporary or global"""
+
+    def __init__(self, name, type, kind):
+        self.name = name
+        self.type = type
+        self.kind = kind  # 'param', 'local', 'temp' or 'global'
+    def __repr__(self):
+        return f"%{self.name}" if self.kind != 'global' else f"@{self.name}"
+
+
+# Instructions
+class Instr:
+    dest = None
+    has_side_effects = False
+
+    def operands(self):
+        """Values read by the instruction"""
+        return []
+
+    def map_operands(self, fn):
+        """Replace every operand with fn(operand)"""
+        pass
+
+
+class Copy(Instr):
+    def __init__(self, dest, src):
+        self.dest = dest
+        self.src = src
+    def operands(self):
+        return [self.src]
+    def map_operands(self, fn):
+        self.src = fn(self.src)
+    def __repr__(self):
+        return f"{self.dest} = {self.src}"
+
+
+class BinOp(Instr):
+    def __init__(self, dest, op, left, right):
+        self.dest = dest
+        self.op = op  # C operator spelling
+        self.left = left
+        self.right = right
+    def operands(self):
+        return [self.left, self.right]
+    def map_operands(self, fn):
+        self.left = fn(self.left)
+        self.right = fn(self.right)
+    def __repr__(self):
+        return f"{self.dest} = {self.left} {self.op} {self.right}"
+
+
+class UnOp(Instr):
+    def __init__(self, dest, op, operand):
+        self.dest = dest
+        self.op = op  # '-' or '!'
+        self.operand = operand
+    def operands(self):
+        return [self.operand]
+    def map_operands(self, fn):
+        self.operand = fn(self.operand)
+    def __repr__(self):
+        return f"{self.dest} = {self.op}{self.operand}"
+
+
+class Index(Instr):
+    def __init__(self, dest, table, index):
+        self.dest = dest
+        self.table = table  # Name of a module table
+        self.index = index
+    def operands(self):
+        return [self.index]
+    def map_operands(self, fn):
+        self.index = fn(self.index)
+    def __repr__(self):
+        return f"{self.dest} = {self.table}[{self.index}]"
+
+
+class CallInstr(Instr):
+    has_side_effects = True
+
+    def __init__(self, dest, func, args):
+        self.dest = dest  # None for calls to void functions
+        self.func = func
+        self.args = args
+    def operands(self):
+        return list(self.args)
+    def map_operands(self, fn):
+        self.args = [fn(arg) for arg in self.args]
+    def __repr__(self):
+        call = f"call {self.func}({', '.join(map(repr, self.args))})"
+        return f"{self.dest} = {call}" if self.dest else call
+
+
+class Print(Instr):
+    has_side_effects = True
+
+    def __init__(self, value):
+        self.value = value
+    def operands(self):
+        return [self.value]
+    def map_operands(self, fn):
+        self.value = fn(self.value)
+    def __repr__(self):
+        return f"print {self.value}"
+
+
+# Terminators
+class Jump(Instr):
+    def __init__(self, target):
+        self.target = target  # BasicBlock
+    def successors(self):
+        return [self.target]
+    def __repr__(self):
+        return f"jump {self.target.label}"
+
+
+class Branch(Instr):
+    def __init__(self, cond, if_true, if_false):
+        self.cond = cond
+        self.if_true = if_true
+        self.if_false = if_false
+    def operands(self):
+        return [self.cond]
+    def map_operands(self, fn):
+        self.cond = fn(self.cond)
+    def successors(self):
+        return [self.if_true, self.if_false]
+    def __repr__(self):
+        return f"branch {self.cond} ? {self.if_true.label} : {self.if_false.label}"
+
+
+class Return(Instr):
+    def __init__(self, value):
+        self.value = value  # None in void functions
+    def operands(self):
+        return [self.value] if self.value is not None else []
+    def map_operands(self, fn):
+        if self.value is not None:
+            self.value = fn(self.value)
+    def successors(self):
+        return []
+    def __repr__(self):
+        return f"return {self.value}" if self.value is not None else "return"
+
+
+TERMINATORS = (Jump, Branch, Return)
+
+
+# Containers
+class BasicBlock:
+    def __init__(self, label):
+        self.label = label
+        self.instrs = []
+        self.terminator = None
+
+    def successors(self):
+        return self.terminator.successors() if self.terminator else []
+
+    def __repr__(self):
+        lines = [f"{self.label}:"]
+        lines += [f"    {instr}" for instr in self.instrs]
+        lines.append(f"    {self.terminator}")
+        return "\n".join(lines)
+
+
+class IRFunction:
+    def __init__(self, name, return_type, params):
+        self.name = name
+        self.return_type = return_type  # Hinglish type name or None for void
+        self.params = params            # List of Var
+        self.variables = []             # Locals and temporaries, in declaration order
+        self.blocks = []                # blocks[0] is the entry block
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    def predecessors(self):
+        """Map each block to the list of blocks that branch to it"""
+        preds = {block: [] for block in self.blocks}
+        for block in self.blocks:
+            for succ in block.successors():
+                if succ in preds:
+                    preds[succ].append(block)
+        return preds
+
+    def instruction_count(self):
+        return sum(len(block.instrs) + 1 for block in self.blocks)
+
+    def __repr__(self):
+        params = ", ".join(f"{p.type} {p}" for p in self.params)
+        header = f"function {self.name}({params}) -> {self.return_type or 'void'}"
+        return "\n".join([header] + [repr(block) for block in self.blocks])
+
+
+class IRTable:
+    def __init__(self, name, elem_type, values):
+        self.name = name
+        self.elem_type = elem_type
+        self.values = values
+
+
+class IRModule:
+    def __init__(self):
+        self.globals = []    # (Var, Const initial value)
+        self.tables = []     # IRTable
+        self.functions = []  # IRFunction
+
+    def __repr__(self):
+        lines = [f"global {var.type} {var} = {init}" for var, init in self.globals]
+        lines += [f"table {table.name}[{len(table.values)}]" for table in self.tables]
+        lines += [repr(func) for func in self.functions]
+        return "\n\n".join(lines)
+
+
+def verify_function(func, module=None):
+    """Check the structural invariants of a function, raising on violation"""
+    if not func.blocks:
+        raise IRVerificationError(f"{func.name}: function has no blocks")
+
+    blocks = set(func.blocks)
+    labels = set()
+    defined = set(func.params) | set(func.variables)
+    if module is not None:
+        defined |= {var for var, _ in module.globals}
+
+    for block in func.blocks:
+        if block.label in labels:
+            raise IRVerificationError(f"{func.name}: duplicate label {block.label}")
+        labels.add(block.label)
+
+        if not isinstance(block.terminator, TERMINATORS):
+            raise IRVerificationError(f"{func.name}: block {block.label} has no terminator")
+        for succ in block.successors():
+            if succ not in blocks:
+                raise IRVerificationError(
+                    f"{func.name}: block {block.label} jumps to missing block {succ.label}")
+
+        for instr in block.instrs + [block.terminator]:
+            if isinstance(instr, TERMINATORS) and instr is not block.terminator:
+                raise IRVerificationError(f"{func.name}: terminator inside block {block.label}")
+            for operand in instr.operands():
+                if isinstance(operand, Var) and operand not in defined:
+                    raise IRVerificationError(
+                        f"{func.name}: {instr} reads undeclared {operand}")
+                if not isinstance(operand, (Var, Const)):
+                    raise IRVerificationError(f"{func.name}: {instr} has a bad operand")
+            if instr.dest is not None and instr.dest not in defined:
+                raise IRVerificationError(f"{func.name}: {instr} writes undeclared {instr.dest}")
+
+        if isinstance(block.terminator, Return):
+            if (block.terminator.value is None) != (func.return_type is None):
+                raise IRVerificationError(f"{func.name}: return does not match the function type")
@@ -0,0 +1,130 @@
+import io
+
+from c_support import C_TYPES, RUNTIME_INCLUDES, STANDARD_INCLUDES, escape, print_call
+from code_writer import CodeWriter
+from ir import BinOp, Branch, CallInstr, Const, Copy, Index, Jump, Print, Return, UnOp
+
+
+class IREmitter:
+    """Emits C from an IR module.
+
+    Every variable is declared at the top of its function and control flow
+    becomes labels and gotos.  Labels are only printed for blocks that are
+    jumped to, and jumps to the block that follows are left out.
+    """
+
+    def __init__(self, runtime=False):
+        self.c_code = []
+        self.runtime = runtime  # Include hinglish_rt.h and print through it
+
+    def emit(self, module):
+        """Convert an IR module to C code"""
+        output = io.StringIO()
+        self.emit_to(module, output)
+        return output.getvalue()
+
+    def emit_to(self, module, stream):
+        """Convert an IR module to C code, streaming it into a text or binary stream"""
+        self.c_code = CodeWriter(stream)
+        self.c_code.extend((RUNTIME_INCLUDES if self.runtime else STANDARD_INCLUDES) + [""])
+
+        for var, init in module.globals:
+            self.c_code.append(f"{C_TYPES[var.type]} {var.name} = {self.value(init)};")
+        if module.globals:
+            self.c_code.append("")
+
+        for table in module.tables:
+            self.emit_table(table)
+
+        # Prototypes let functions call each other in any order
+        prototypes = [self.signature(func) + ";" for func in module.functions if func.name != "main"]
+        if prototypes:
+            self.c_code.extend(prototypes)
+            self.c_code.append("")
+
+        for func in module.functions:
+            self.emit_function(func)
+        self.c_code.flush()
+
+    def signature(self, func):
+        return_type = C_TYPES[func.return_type] if func.return_type else "void"
+        params = ", ".join(f"{C_TYPES[param.type]} {param.name}" for param in func.params)
+        return f"{return_type} {func.name}({params or 'void'})"
+
+    def emit_table(self, table):
+        self.c_code.append(f"static const {C_TYPES[table.elem_type]} {table.name}[{len(table.values)}] = {{")
+        for start in range(0, len(table.values), 10):
+            row = ", ".join(str(value) for value in table.values[start:start + 10])
+            self.c_code.append(f"    {row},")
+        self.c_code.append("};")
+        self.c_code.append("")
+
+    def emit_function(self, func):
+        self.c_code.append(self.signature(func) + " {")
+        for var in func.variables:
+            self.c_code.append(f"    {C_TYPES[var.type]} {var.name};")
+
+        terminators = []
+        for index, block in enumerate(func.blocks):
+            following = func.blocks[index + 1] if index + 1 < len(func.blocks) else None
+            terminators.append(self.terminator(block.terminator, following))
+        targeted = {target for lines, targets in terminators for target in targets}
+
+        for block, (lines, _) in zip(func.blocks, terminators):
+            if block in targeted:
+                self.c_code.append(f"{block.label}:")
+            for instr in block.instrs:
+                self.c_code.append(f"    {self.instruction(instr)}")
+            self.c_code.extend(f"    {line}" for line in lines)
+
+        self.c_code.append("}")
+        self.c_code.append("")
+
+    def terminator(self, terminator, following):
+        """Return the C lines of a terminator and the blocks they jump to"""
+        if isinstance(terminator, Return):
+            value = f" {self.value(terminator.value)}" if terminator.value is not None else ""
+            return [f"return{value};"], []
+        if isinstance(terminator, Jump):
+            if terminator.target is following:
+                return [], []
+            return [f"goto {terminator.target.label};"], [terminator.target]
+
+        cond = self.value(terminator.cond)
+        if terminator.if_true is following:
+            return [f"if (!{cond}) goto {terminator.if_false.label};"], [terminator.if_false]
+        lines = [f"if ({cond}) goto {terminator.if_true.label};"]
+        if terminator.if_false is following:
+            return lines, [terminator.if_true]
+        lines.append(f"goto {terminator.if_false.label};")
+        return lines, [terminator.if_true, terminator.if_false]
+
+    def instruction(self, instr):
+        if isinstance(instr, Copy):
+            return f"{instr.dest.name} = {self.value(instr.src)};"
+        if isinstance(instr, BinOp):
+            return f"{instr.dest.name} = {self.value(instr.left)} {instr.op} {self.value(instr.right)};"
+        if isinstance(instr, UnOp):
+            return f"{instr.dest.name} = {instr.op}{self.value(instr.operand)};"
+        if isinstance(instr, Index):
+            return f"{instr.dest.name} = {instr.table}[{self.value(instr.index)}];"
+        if isinstance(instr, CallInstr):
+            call = f"{instr.func}({', '.join(self.value(arg) for arg in instr.args)})"
+            return f"{instr.dest.name} = {call};" if instr.dest else f"{call};"
+        if isinstance(instr, Print):
+            return print_call(instr.value.type, self.value(instr.value), self.runtime)
+        raise Exception(f"No C translation for {type(instr).__name__}")
+
+    def value(self, value):
+        """C spelling of an operand"""
+        if not isinstance(value, Const):
+            return value.name
+        if value.type == "vakya":
+            return f'"{escape(value.value, chr(34))}"'
+        if value.type == "akshar":
+            return f"'{escape(value.value, chr(39))}'"
+        if value.type == "ank" and value.value == -2 ** 31:
+            return "(-2147483647 - 1)"  # The literal 2147483648 does not fit an int
+        if value.value < 0:
+            return f"({value.value})"  # Keeps `x - -1` from becoming `x--1`
+        return str(value.value)
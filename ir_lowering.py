@@ -0,0 +1,347 @@
+from parser import *  # Import all AST node classes
+from ir import (BasicBlock, BinOp, Branch, CallInstr, Const, Copy, Index, IRFunction,
+                IRModule, IRTable, Jump, Print, Return, UnOp, Var)
+from optimizer import int_constant
+
+# Default value of a declared but uninitialised variable, as in the C generator
+DEFAULT_VALUES = {"ank": 0, "sankhya": 0.0, "vakya": "", "akshar": "\0"}
+
+
+class IRLoweringError(Exception):
+    """Raised when an AST construct has no IR equivalent"""
+    pass
+
+
+class IRLowering:
+    """Lowers an analyzed AST into three-address IR.
+
+    Relies on the `type` annotations the semantic analyzer leaves on
+    expression nodes.  Source variables keep their names where possible;
+    shadowed ones are renamed so every IR variable is unique per function.
+    """
+
+    def __init__(self):
+        self.module = None
+        self.func = None
+        self.block = None
+        self.scopes = []
+        self.functions = {}  # Name -> FunctionDeclaration, for return types
+        self.used_names = set()
+        self.label_counter = 0
+        self.temp_counter = 0
+
+    def lower(self, program):
+        """Lower a whole program into an IRModule"""
+        self.module = IRModule()
+        self.functions = {stmt.name: stmt for stmt in program.statements
+                          if isinstance(stmt, FunctionDeclaration)}
+        self.scopes = [{}]
+
+        for stmt in program.statements:
+            if isinstance(stmt, FunctionDeclaration):
+                self.module.functions.append(self.lower_function(stmt))
+            elif isinstance(stmt, VarDeclaration):
+                self.lower_global(stmt)
+            elif isinstance(stmt, ConstTable):
+                self.module.tables.append(IRTable(stmt.name, stmt.elem_type, stmt.values))
+            else:
+                raise IRLoweringError(f"Unsupported top-level statement {type(stmt).__name__}")
+        return self.module
+
+    def lower_global(self, var_decl):
+        var_type = var_decl.var_type.value
+        if var_decl.initializer is None:
+            init = Const(DEFAULT_VALUES[var_type], var_type)
+        else:
+            init = self.constant(var_decl.initializer)
+            if init is None:
+                raise IRLoweringError(f"Global '{var_decl.name}' needs a constant initializer")
+        var = Var(var_decl.name, var_type, 'global')
+        self.scopes[0][var_decl.name] = var
+        self.module.globals.append((var, init))
+
+    def lower_function(self, func_decl):
+        return_type = func_decl.return_type.value if func_decl.return_type else None
+        if func_decl.name == "main":
+            return_type = "ank"
+
+        self.used_names = {node.name for node in self.all_nodes(func_decl)
+                           if isinstance(node, (VarDeclaration, Variable, Parameter))}
+        params = [Var(param.name, param.type.value, 'param') for param in func_decl.params]
+        self.func = IRFunction(func_decl.name, return_type, params)
+        self.label_counter = 0
+        self.temp_counter = 0
+
+        self.scopes.append({param.name: var for param, var in zip(func_decl.params, params)})
+        self.block = self.new_block()
+        self.visit(func_decl.body)
+
+        # Falling off the end returns 0 from main and a zero value elsewhere
+        if self.block.terminator is None:
+            if return_type is None:
+                self.block.terminator = Return(None)
+            else:
+                self.block.terminator = Return(Const(DEFAULT_VALUES[return_type], return_type))
+        self.scopes.pop()
+
+        func, self.func = self.func, None
+        return func
+
+    # Helpers
+    def all_nodes(self, node):
+        yield node
+        for value in vars(node).values():
+            children = value if isinstance(value, list) else [value]
+            for child in children:
+                if isinstance(child, ASTNode):
+                    yield from self.all_nodes(child)
+
+    def new_block(self):
+        block = BasicBlock(f"L{self.label_counter}")
+        self.label_counter += 1
+        self.func.blocks.append(block)
+        return block
+
+    def terminate(self, terminator, next_block=None):
+        """End the current block and continue in next_block (or a fresh one)"""
+        if self.block.terminator is None:
+            self.block.terminator = terminator
+        self.block = next_block if next_block is not None else self.new_block()
+
+    def start_block(self, block):
+        """Fall through into a block created earlier"""
+        self.terminate(Jump(block), block)
+
+    def new_temp(self, type_name):
+        self.temp_counter += 1
+        name = f"hp_t{self.temp_counter}"
+        while name in self.used_names:
+            self.temp_counter += 1
+            name = f"hp_t{self.temp_counter}"
+        var = Var(name, type_name, 'temp')
+        self.func.variables.append(var)
+        return var
+
+    def declare(self, name, type_name):
+        """Declare a source variable in the current scope, renaming if shadowed"""
+        unique = name
+        if any(var.name == unique for var in self.func.variables + self.func.params):
+            suffix = 1
+            while f"{name}_{suffix}" in self.used_names:
+                suffix += 1
+            unique = f"{name}_{suffix}"
+        self.used_names.add(unique)
+        var = Var(unique, type_name, 'local')
+        self.func.variables.append(var)
+        self.scopes[-1][name] = var
+        return var
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise IRLoweringError(f"Variable '{name}' is not defined")
+
+    def emit(self, instr):
+        self.block.instrs.append(instr)
+
+    def expr_type(self, node):
+        expr_type = getattr(node, 'type', None)
+        if expr_type == "boolean":
+            return "ank"
+        if expr_type not in DEFAULT_VALUES:
+            raise IRLoweringError(f"Expression {node} has no usable type")
+        return expr_type
+
+    def constant(self, node):
+        """Return a Const for a literal expression, or None"""
+        value = int_constant(node)
+        if value is not None:
+            return Const(value, "ank")
+        if isinstance(node, Grouping):
+            return self.constant(node.expression)
+        if isinstance(node, Literal):
+            literal_type = self.expr_type(node)
+            if literal_type == "sankhya":
+                return Const(float(node.value), literal_type)
+            return Const(node.value, literal_type)
+        return None
+
+    # Dispatch
+    def visit(self, node):
+        """Visit an AST node and dispatch to the appropriate method"""
+        method_name = f"visit_{type(node).__name__}"
+        method = getattr(self, method_name, self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node):
+        raise IRLoweringError(f"No IR lowering defined for {type(node).__name__}")
+
+    # Statements
+    def visit_BlockStatement(self, block):
+        self.scopes.append({})
+        for statement in block.statements:
+            self.visit(statement)
+        self.scopes.pop()
+
+    def visit_VarDeclaration(self, var_decl):
+        var_type = var_decl.var_type.value
+        if var_decl.initializer is not None:
+            value = self.visit(var_decl.initializer)
+        else:
+            value = Const(DEFAULT_VALUES[var_type], var_type)
+        var = self.declare(var_decl.name, var_type)
+        self.emit(Copy(var, value))
+
+    def visit_ExpressionStatement(self, expr_stmt):
+        self.visit(expr_stmt.expression)
+
+    def visit_PrintStatement(self, print_stmt):
+        self.emit(Print(self.visit(print_stmt.expression)))
+
+    def visit_ReturnStatement(self, return_stmt):
+        value = self.visit(return_stmt.value) if return_stmt.value is not None else None
+        if value is None and self.func.return_type is not None:
+            value = Const(DEFAULT_VALUES[self.func.return_type], self.func.return_type)
+        self.terminate(Return(value))
+
+    def visit_IfStatement(self, if_stmt):
+        cond = self.visit(if_stmt.condition)
+        then_block = self.new_block()
+        else_block = self.new_block() if if_stmt.else_branch else None
+        end_block = self.new_block()
+        self.terminate(Branch(cond, then_block, else_block or end_block), then_block)
+
+        self.visit(if_stmt.then_branch)
+        if else_block:
+            self.terminate(Jump(end_block), else_block)
+            self.visit(if_stmt.else_branch)
+        self.terminate(Jump(end_block), end_block)
+
+    def visit_WhileStatement(self, while_stmt):
+        cond_block = self.new_block()
+        body_block = self.new_block()
+        end_block = self.new_block()
+
+        self.start_block(cond_block)
+        cond = self.visit(while_stmt.condition)
+        self.terminate(Branch(cond, body_block, end_block), body_block)
+        self.visit(while_stmt.body)
+        self.terminate(Jump(cond_block), end_block)
+
+    def visit_ForStatement(self, for_stmt):
+        self.scopes.append({})
+        if for_stmt.initializer is not None:
+            self.visit(for_stmt.initializer)
+
+        cond_block = self.new_block()
+        body_block = self.new_block()
+        end_block = self.new_block()
+
+        self.start_block(cond_block)
+        if for_stmt.condition is not None:
+            cond = self.visit(for_stmt.condition)
+            self.terminate(Branch(cond, body_block, end_block), body_block)
+        else:
+            self.start_block(body_block)
+        self.visit(for_stmt.body)
+        if for_stmt.increment is not None:
+            self.visit(for_stmt.increment)
+        self.terminate(Jump(cond_block), end_block)
+        self.scopes.pop()
+
+    def visit_SwitchStatement(self, switch):
+        # The IR has no switch, so the cases become a chain of tests again
+        subject = self.visit(switch.subject)
+        bodies = []
+        for case in switch.cases:
+            body_block = self.new_block()
+            bodies.append((body_block, case.body))
+            for value in case.values:
+                test = self.new_temp("ank")
+                self.emit(BinOp(test, "==", subject, Const(value, subject.type)))
+                next_block = self.new_block()
+                self.terminate(Branch(test, body_block, next_block), next_block)
+
+        end_block = self.new_block()
+        if switch.default is not None:
+            self.visit(switch.default)
+        for body_block, body in bodies:
+            self.terminate(Jump(end_block), body_block)
+            self.visit(body)
+        self.terminate(Jump(end_block), end_block)
+
+    # Expressions
+    def visit_Literal(self, literal):
+        return self.constant(literal)
+
+    def visit_Variable(self, variable):
+        return self.lookup(variable.name)
+
+    def visit_Grouping(self, grouping):
+        return self.visit(grouping.expression)
+
+    def visit_Assignment(self, assign):
+        value = self.visit(assign.value)
+        var = self.lookup(assign.name)
+        self.emit(Copy(var, value))
+        return var
+
+    def visit_Binary(self, binary):
+        left = self.visit(binary.left)
+        right = self.visit(binary.right)
+        dest = self.new_temp(self.expr_type(binary))
+        self.emit(BinOp(dest, binary.operator.value, left, right))
+        return dest
+
+    def visit_Unary(self, unary):
+        operand = self.visit(unary.right)
+        op = "!" if unary.operator.value == "nahi" else "-"
+        dest = self.new_temp(self.expr_type(unary))
+        self.emit(UnOp(dest, op, operand))
+        return dest
+
+    def visit_Logical(self, logical):
+        # Short-circuit evaluation becomes control flow
+        is_and = logical.operator.value == "aur"
+        result = self.new_temp("ank")
+        rhs_block = self.new_block()
+        end_block = self.new_block()
+
+        left = self.visit(logical.left)
+        self.emit(BinOp(result, "!=", left, Const(0, "ank")))
+        if is_and:
+            self.terminate(Branch(result, rhs_block, end_block), rhs_block)
+        else:
+            self.terminate(Branch(result, end_block, rhs_block), rhs_block)
+
+        right = self.visit(logical.right)
+        self.emit(BinOp(result, "!=", right, Const(0, "ank")))
+        self.terminate(Jump(end_block), end_block)
+        return result
+
+    def visit_Call(self, call):
+        if not isinstance(call.callee, Variable):
+            raise IRLoweringError("Cannot call a non-function value")
+        args = [self.visit(arg) for arg in call.arguments]
+
+        func_decl = self.functions.get(call.callee.name)
+        return_type = None
+        if func_decl is not None and (func_decl.return_type or func_decl.name == "main"):
+            return_type = func_decl.return_type.value if func_decl.return_type else "ank"
+        dest = self.new_temp(return_type) if return_type else None
+        self.emit(CallInstr(dest, call.callee.name, args))
+        return dest
+
+    def visit_Sequence(self, sequence):
+        value = None
+        for expr in sequence.expressions:
+            value = self.visit(expr)
+        return value
+
+    def visit_TableLookup(self, lookup):
+        index = self.visit(lookup.index)
+        table = next(t for t in self.module.tables if t.name == lookup.table)
+        dest = self.new_temp(table.elem_type)
+        self.emit(Index(dest, lookup.table, index))
+        return dest
@@ -0,0 +1,285 @@
+import time
+
+from const_eval import EvaluationError, check_range, int_binary
+from ir import BinOp, Branch, CallInstr, Const, Copy, Jump, UnOp, Var, verify_function
+
+
+class IRPass:
+    """Base class of function passes; run() returns whether anything changed"""
+    name = None
+
+    def run(self, func, module):
+        raise NotImplementedError
+
+
+class ConstantFolding(IRPass):
+    """Folds integer operations on constants and trivial algebraic identities"""
+    name = "fold"
+
+    def run(self, func, module):
+        changed = False
+        for block in func.blocks:
+            for index, instr in enumerate(block.instrs):
+                folded = self.fold(instr)
+                if folded is not None:
+                    block.instrs[index] = folded
+                    changed = True
+        return changed
+
+    def fold(self, instr):
+        """Return a Copy replacing an instruction, or None"""
+        if isinstance(instr, BinOp) and instr.dest.type == "ank":
+            left, right = instr.left, instr.right
+            if self.is_int(left) and self.is_int(right):
+                try:
+                    return Copy(instr.dest, Const(int_binary(instr.op, left.value, right.value), "ank"))
+                except EvaluationError:
+                    return None  # Overflow and division by zero stay for runtime
+            return self.simplify(instr)
+        if isinstance(instr, UnOp) and instr.dest.type == "ank" and self.is_int(instr.operand):
+            value = instr.operand.value
+            if instr.op == "!":
+                return Copy(instr.dest, Const(0 if value else 1, "ank"))
+            try:
+                return Copy(instr.dest, Const(check_range(-value), "ank"))
+            except EvaluationError:
+                return None
+        return None
+
+    def simplify(self, instr):
+        """x + 0, x - 0, x * 1 and x * 0 on integer operands"""
+        left, right = instr.left, instr.right
+        if left.type != "ank" or right.type != "ank":
+            return None
+        if instr.op in ("+", "-") and right == Const(0, "ank"):
+            return Copy(instr.dest, left)
+        if instr.op == "+" and left == Const(0, "ank"):
+            return Copy(instr.dest, right)
+        if instr.op == "*":
+            if right == Const(1, "ank"):
+                return Copy(instr.dest, left)
+            if left == Const(1, "ank"):
+                return Copy(instr.dest, right)
+            if Const(0, "ank") in (left, right):
+                return Copy(instr.dest, Const(0, "ank"))
+        return None
+
+    def is_int(self, value):
+        return isinstance(value, Const) and value.type == "ank"
+
+
+class CopyPropagation(IRPass):
+    """Replaces uses of copied variables by their source within each block"""
+    name = "copyprop"
+
+    def run(self, func, module):
+        changed = False
+        for block in func.blocks:
+            copies = {}  # Var -> value it currently holds
+
+            def replace(value):
+                nonlocal changed
+                if value in copies:
+                    changed = True
+                    return copies[value]
+                return value
+
+            for instr in block.instrs:
+                instr.map_operands(replace)
+                if isinstance(instr, CallInstr):
+                    # Callees may write any global
+                    copies = {var: value for var, value in copies.items()
+                              if var.kind != 'global' and getattr(value, 'kind', None) != 'global'}
+                if instr.dest is not None:
+                    copies = {var: value for var, value in copies.items()
+                              if var is not instr.dest and value is not instr.dest}
+                    # Copies between types convert the value and cannot be propagated
+                    if isinstance(instr, Copy) and instr.src is not instr.dest \
+                            and instr.src.type == instr.dest.type:
+                        copies[instr.dest] = instr.src
+            block.terminator.map_operands(replace)
+        return changed
+
+
+class SimplifyCFG(IRPass):
+    """Folds constant branches, threads jumps, merges blocks and drops dead ones"""
+    name = "simplifycfg"
+
+    def run(self, func, module):
+        changed = False
+        for block in func.blocks:
+            term = block.terminator
+            if isinstance(term, Branch):
+                if isinstance(term.cond, Const):
+                    block.terminator = Jump(term.if_true if term.cond.value else term.if_false)
+                    changed = True
+                elif term.if_true is term.if_false:
+                    block.terminator = Jump(term.if_true)
+                    changed = True
+
+        # Skip over blocks that only jump elsewhere
+        for block in func.blocks:
+            term = block.terminator
+            if isinstance(term, Jump):
+                target = self.forward(term.target)
+                if target is not term.target:
+                    term.target = target
+                    changed = True
+            elif isinstance(term, Branch):
+                if_true, if_false = self.forward(term.if_true), self.forward(term.if_false)
+                if (if_true, if_false) != (term.if_true, term.if_false):
+                    term.if_true, term.if_false = if_true, if_false
+                    changed = True
+
+        changed |= self.remove_unreachable(func)
+
+        # Merge a block into its only predecessor when that jumps straight to it
+        merged = True
+        while merged:
+            merged = False
+            preds = func.predecessors()
+            for block in func.blocks:
+                term = block.terminator
+                if not isinstance(term, Jump):
+                    continue
+                succ = term.target
+                if succ is block or succ is func.entry or len(preds[succ]) != 1:
+                    continue
+                block.instrs.extend(succ.instrs)
+                block.terminator = succ.terminator
+                func.blocks.remove(succ)
+                merged = changed = True
+                break
+        return changed
+
+    def forward(self, block):
+        """Follow a chain of empty jump-only blocks"""
+        seen = set()
+        while not block.instrs and isinstance(block.terminator, Jump) and block not in seen:
+            seen.add(block)
+            block = block.terminator.target
+        return block
+
+    def remove_unreachable(self, func):
+        reachable = set()
+        stack = [func.entry]
+        while stack:
+            block = stack.pop()
+            if block not in reachable:
+                reachable.add(block)
+                stack.extend(block.successors())
+        if len(reachable) == len(func.blocks):
+            return False
+        func.blocks = [block for block in func.blocks if block in reachable]
+        return True
+
+
+class DeadCodeElimination(IRPass):
+    """Removes instructions whose results are never read, using liveness.
+
+    Calls and prints always stay, and so do writes to globals, which other
+    functions may read.  Variables left unused afterwards are dropped.
+    """
+    name = "dce"
+
+    def run(self, func, module):
+        live_out = self.liveness(func)
+        changed = False
+        for block in func.blocks:
+            live = set(live_out[block])
+            live.update(self.reads(block.terminator))
+            kept = []
+            for instr in reversed(block.instrs):
+                dest = instr.dest
+                if not instr.has_side_effects and dest is not None \
+                        and dest.kind != 'global' and dest not in live:
+                    changed = True
+                    continue
+                if dest is not None:
+                    live.discard(dest)
+                live.update(self.reads(instr))
+                kept.append(instr)
+            kept.reverse()
+            block.instrs = kept
+
+        used = set()
+        for block in func.blocks:
+            for instr in block.instrs + [block.terminator]:
+                used.update(self.reads(instr))
+                if instr.dest is not None:
+                    used.add(instr.dest)
+        variables = [var for var in func.variables if var in used]
+        if len(variables) != len(func.variables):
+            func.variables = variables
+            changed = True
+        return changed
+
+    def reads(self, instr):
+        return [value for value in instr.operands() if isinstance(value, Var)]
+
+    def liveness(self, func):
+        """Compute the variables live at the end of each block"""
+        uses = {}
+        defs = {}
+        for block in func.blocks:
+            block_uses, block_defs = set(), set()
+            for instr in block.instrs + [block.terminator]:
+                block_uses.update(var for var in self.reads(instr) if var not in block_defs)
+                if instr.dest is not None:
+                    block_defs.add(instr.dest)
+            uses[block], defs[block] = block_uses, block_defs
+
+        live_in = {block: set() for block in func.blocks}
+        live_out = {block: set() for block in func.blocks}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(func.blocks):
+                out = set()
+                for succ in block.successors():
+                    out |= live_in[succ]
+                new_in = uses[block] | (out - defs[block])
+                if out != live_out[block] or new_in != live_in[block]:
+                    live_out[block], live_in[block] = out, new_in
+                    changed = True
+        return live_out
+
+
+class PassManager:
+    """Runs IR passes over every function of a module.
+
+    -O1 runs the pipeline once; -O2 repeats it until nothing changes or
+    max_rounds is reached.  Time spent in each pass is accumulated in
+    `timings`, and with `verify` on every function is checked after each
+    pass so a broken pass is caught where it ran.
+    """
+
+    def __init__(self, opt_level=1, verify=True, max_rounds=4):
+        self.opt_level = opt_level
+        self.verify = verify
+        self.max_rounds = max_rounds
+        self.passes = [ConstantFolding(), CopyPropagation(), SimplifyCFG(), DeadCodeElimination()]
+        self.timings = {}  # Pass name -> seconds
+        self.rounds = {}   # Function name -> rounds run
+
+    def run(self, module):
+        """Optimize a module in place and return it"""
+        self.timings = {ir_pass.name: 0.0 for ir_pass in self.passes}
+        for func in module.functions:
+            if self.verify:
+                verify_function(func, module)
+            if self.opt_level <= 0:
+                continue
+            rounds = 1 if self.opt_level == 1 else self.max_rounds
+            for round_number in range(1, rounds + 1):
+                changed = False
+                for ir_pass in self.passes:
+                    start = time.perf_counter()
+                    changed |= ir_pass.run(func, module)
+                    self.timings[ir_pass.name] += time.perf_counter() - start
+                    if self.verify:
+                        verify_function(func, module)
+                self.rounds[func.name] = round_number
+                if not changed:
+                    break
+        return module
@@ -134,50 +134,61 @@ class Lexer:
     
     def tokenize(self):
         """Convert the source code into tokens"""
-        while self.position < len(self.source):
-            # Skip whitespace
-            self.skip_whitespace()
-            
-            # Check if we've reached the end
-            if self.position >= len(self.source):
-                break
-            
-            char = self.peek()
-            
-            # Handle comments
-            if char == '#':
-                self.skip_comment()
-                continue
-            
-            # Handle identifiers and keywords
-            elif char.isalpha() or char == '_':
-                self.tokenize_identifier()
-            
-            # Handle numbers
-            elif char.isdigit():
-                self.tokenize_number()
-            
-            # Handle string literals
-            elif char == '"':
-                self.tokenize_string()
-            
-            # Handle character literals
-            elif char == "'":
-                self.tokenize_char()
-            
-            # Handle operators and delimiters
-            elif char in '+-*/(){}[];,=<>!':
-                self.tokenize_operator_or_delimiter()
-                
-            # Unrecognized character
-            else:
-                self.tokens.append(Token(TokenType.UNKNOWN, char, self.line, self.column))
-                self.advance()
+        while self.scan_token():
+            pass
         
         # Add EOF token
         self.tokens.append(Token(TokenType.EOF, "", self.line, self.column))
         return self.tokens
     
+    def iter_tokens(self):
+        """Yield the tokens one at a time as they are scanned, without keeping them"""
+        while self.scan_token():
+            yield from self.tokens
+            self.tokens.clear()
+        yield Token(TokenType.EOF, "", self.line, self.column)
+    
+    def scan_token(self):
+        """Append the next token (or none, for a comment) to self.tokens; False at the end"""
+        # Skip whitespace
+        self.skip_whitespace()
+        
+        # Check if we've reached the end
+        if self.position >= len(self.source):
+            return False
+        
+        char = self.peek()
+        
+        # Handle comments
+        if char == '#':
+            self.skip_comment()
+        
+        # Handle identifiers and keywords
+        elif char.isalpha() or char == '_':
+            self.tokenize_identifier()
+        
+        # Handle numbers
+        elif char.isdigit():
+            self.tokenize_number()
+        
+        # Handle string literals
+        elif char == '"':
+            self.tokenize_string()
+        
+        # Handle character literals
+        elif char == "'":
+            self.tokenize_char()
+        
+        # Handle operators and delimiters
+        elif char in '+-*/(){}[];,=<>!':
+            self.tokenize_operator_or_delimiter()
+            
+        # Unrecognized character
+        else:
+            self.tokens.append(Token(TokenType.UNKNOWN, char, self.line, self.column))
+            self.advance()
+        return True
+    
     def tokenize_identifier(self):
         """Tokenize an identifier or keyword"""
         start_column = self.column
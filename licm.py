@@ -0,0 +1,197 @@
+from parser import *  # Import all AST node classes
+from cse import HashConser
+from effects import IMPURE, PURE, EffectAnalyzer
+from optimizer import TEMP_TYPES, NodeTransformer, declare_temp, walk
+
+
+class NodeReplacer(NodeTransformer):
+    """Replaces every occurrence of one node object"""
+
+    def __init__(self, target, replacement):
+        self.target = target
+        self.replacement = replacement
+
+    def visit(self, node):
+        if node is self.target:
+            return self.replacement
+        return super().visit(node)
+
+
+class LoopInvariantCodeMotion(NodeTransformer):
+    """Hoists loop-invariant expressions out of karo and jabtak loops.
+
+    An expression is invariant when none of its variables is assigned
+    anywhere in the loop and every call in it goes to a const function, or
+    to a pure one while the loop writes no globals.  Everything invariant in
+    the loop condition is hoisted, since the condition always runs at least
+    once.  From the body only call-free expressions that cannot trap are
+    hoisted, because the body may not run at all.  Hoisted values live in
+    `hp_licm_<n>` temporaries declared just before the loop.
+    """
+
+    def __init__(self):
+        self.report = []  # (function, temporary, expression)
+        self.effects = {}
+        self.global_names = set()
+        self.local_names = set()
+        self.current_function = None
+        self.conser = None
+        self.temp_counter = 0
+
+    def hoist(self, program):
+        """Run the pass on every function and return the new program"""
+        self.report = []
+        self.effects = EffectAnalyzer().analyze(program)
+        self.global_names = {stmt.name for stmt in program.statements
+                             if isinstance(stmt, VarDeclaration)}
+        return self.visit(program)
+
+    def visit_FunctionDeclaration(self, func):
+        self.current_function = func
+        self.local_names = {param.name for param in func.params}
+        self.local_names.update(node.name for node in walk(func.body)
+                                if isinstance(node, VarDeclaration))
+        self.local_names -= self.global_names
+        self.conser = HashConser()
+
+        body = self.visit(func.body)
+        self.current_function = None
+        if body is func.body:
+            return func
+        return FunctionDeclaration(func.name, func.params, func.return_type, body)
+
+    def visit_WhileStatement(self, loop):
+        return self.hoist_loop(self.generic_visit(loop))
+
+    def visit_ForStatement(self, loop):
+        return self.hoist_loop(self.generic_visit(loop))
+
+    def hoist_loop(self, loop):
+        """Move the invariant expressions of one loop in front of it"""
+        if self.current_function is None:
+            return loop
+
+        loop = self.conser.visit(loop)
+        assigned = {node.name for node in walk(loop)
+                    if isinstance(node, (Assignment, VarDeclaration))}
+        writes_globals = any(
+            (isinstance(node, Assignment) and node.name not in self.local_names)
+            or (isinstance(node, Call) and self.effect_of(node) == IMPURE)
+            for node in walk(loop))
+
+        memo = {}
+
+        def invariant(node):
+            if id(node) not in memo:
+                memo[id(node)] = self.is_invariant(node, assigned, writes_globals, invariant)
+            return memo[id(node)]
+
+        # The For initializer runs before the first condition check, so
+        # anything it could affect must stay in place
+        init_has_call = isinstance(loop, ForStatement) and loop.initializer is not None and \
+            any(isinstance(node, Call) for node in walk(loop.initializer))
+
+        candidates = []
+        if loop.condition is not None:
+            self.collect(loop.condition, invariant, not init_has_call, candidates)
+
+        roots = []
+        for stmt in self.straight_line(loop.body):
+            if isinstance(stmt, ExpressionStatement):
+                roots.append(stmt.expression.value if isinstance(stmt.expression, Assignment)
+                             else stmt.expression)
+            elif isinstance(stmt, VarDeclaration) and stmt.initializer:
+                roots.append(stmt.initializer)
+            elif isinstance(stmt, PrintStatement):
+                roots.append(stmt.expression)
+            elif isinstance(stmt, IfStatement):
+                roots.append(stmt.condition)
+        if isinstance(loop, ForStatement) and loop.increment is not None:
+            roots.append(loop.increment.value if isinstance(loop.increment, Assignment)
+                         else loop.increment)
+        for root in roots:
+            self.collect(root, invariant, False, candidates)
+
+        declarations = []
+        seen = set()
+        for node in candidates:
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            self.temp_counter += 1
+            temp_name = f"hp_licm_{self.temp_counter}"
+            declaration, temp = declare_temp(temp_name, node)
+            declarations.append(declaration)
+            loop = NodeReplacer(node, temp).visit(loop)
+            self.local_names.add(temp_name)
+            self.report.append((self.current_function.name, temp_name, node))
+
+        if not declarations:
+            return loop
+        return BlockStatement(declarations + [loop])
+
+    def straight_line(self, stmt):
+        """Yield the statements run in sequence, looking into nested blocks"""
+        if isinstance(stmt, BlockStatement):
+            for child in stmt.statements:
+                yield from self.straight_line(child)
+        else:
+            yield stmt
+
+    def effect_of(self, call):
+        if not isinstance(call.callee, Variable):
+            return IMPURE
+        return self.effects.get(call.callee.name, IMPURE)
+
+    def is_invariant(self, node, assigned, writes_globals, invariant):
+        """Check whether a node has the same value on every iteration"""
+        if isinstance(node, Literal):
+            return True
+        if isinstance(node, Variable):
+            if node.name in assigned:
+                return False
+            return node.name in self.local_names or not writes_globals
+        if isinstance(node, Call):
+            effect = self.effect_of(node)
+            if effect == IMPURE or (effect == PURE and writes_globals):
+                return False
+            return all(invariant(arg) for arg in node.arguments)
+        if isinstance(node, (Binary, Unary, Grouping, Logical, TableLookup)):
+            children = [child for child in vars(node).values() if isinstance(child, ASTNode)]
+            return all(invariant(child) for child in children)
+        return False
+
+    def collect(self, node, invariant, allow_calls, candidates):
+        """Find maximal invariant subexpressions worth hoisting"""
+        if self.is_hoistable(node, invariant, allow_calls):
+            candidates.append(node)
+            return
+        if isinstance(node, Logical):
+            # The right operand is evaluated conditionally
+            self.collect(node.left, invariant, allow_calls, candidates)
+            return
+        for value in vars(node).values():
+            children = value if isinstance(value, list) else [value]
+            for child in children:
+                if isinstance(child, ASTNode):
+                    self.collect(child, invariant, allow_calls, candidates)
+
+    def is_hoistable(self, node, invariant, allow_calls):
+        """Check whether an expression can be computed ahead of the loop"""
+        if isinstance(node, (Literal, Variable)) or getattr(node, 'type', None) not in TEMP_TYPES:
+            return False
+        if not invariant(node):
+            return False
+        has_operand = False
+        has_operation = False
+        for child in walk(node):
+            if isinstance(child, (Variable, Call)):
+                has_operand = True
+            if isinstance(child, (Binary, Unary, Logical, TableLookup, Call)):
+                has_operation = True
+            if not allow_calls:
+                if isinstance(child, Call):
+                    return False
+                if isinstance(child, Binary) and child.operator.value in ("/", "%"):
+                    return False
+        return has_operand and has_operation
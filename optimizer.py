@@ -0,0 +1,187 @@
+import copy
+
+from parser import *  # Import all AST node classes
+
+
+def make_token(token_type, value):
+    """Create a synthetic token for nodes built by optimization passes"""
+    return Token(token_type, value, 0, 0)
+
+
+def variable(name, var_type=None):
+    """Build a variable reference, annotated with its type when known"""
+    node = Variable(make_token(TokenType.IDENTIFIER, name))
+    if var_type is not None:
+        node.type = var_type
+    return node
+
+
+# Types a temporary can be declared with; comparisons produce C ints
+TEMP_TYPES = {
+    "ank": (TokenType.INT, "ank"),
+    "sankhya": (TokenType.FLOAT, "sankhya"),
+    "akshar": (TokenType.CHAR, "akshar"),
+    "boolean": (TokenType.INT, "ank"),
+}
+
+
+def declare_temp(name, expr):
+    """Declare a temporary initialized with an expression of a TEMP_TYPES type.
+
+    Returns the declaration and a reference to the new variable.
+    """
+    token_type, type_name = TEMP_TYPES[expr.type]
+    declaration = VarDeclaration(make_token(token_type, type_name), name, expr)
+    return declaration, variable(name, type_name)
+
+
+def child_nodes(node):
+    """Yield the direct AST children of a node"""
+    for value in vars(node).values():
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ASTNode):
+                    yield item
+
+
+def walk(node):
+    """Yield a node and all of its descendants in pre-order"""
+    yield node
+    for child in child_nodes(node):
+        yield from walk(child)
+
+
+def int_literal(value):
+    """Build an AST node for an integer constant, negating via Unary if needed.
+
+    The nodes are typed like analyzed ones, since the IR lowering needs a
+    type on every expression.
+    """
+    node = Literal(str(abs(value)))
+    node.type = "ank"
+    if value < 0:
+        node = Unary(make_token(TokenType.MINUS, "-"), node)
+        node.type = "ank"
+    return node
+
+
+def int_constant(node):
+    """Return the integer value of a constant expression node, or None"""
+    if isinstance(node, Literal) and isinstance(node.value, str) and node.value.isdigit():
+        return int(node.value)
+    if isinstance(node, Grouping):
+        return int_constant(node.expression)
+    if isinstance(node, Unary) and node.operator.value == "-":
+        value = int_constant(node.right)
+        return -value if value is not None else None
+    return None
+
+
+class NodeTransformer:
+    """Base class for AST passes that rewrite the tree.
+
+    Subclasses define visit_<NodeType> methods returning the replacement node.
+    Nodes are copied on write so subtrees shared between several parents are
+    never modified in place.  Inside statement lists a visitor may return None
+    to drop the statement or a list to splice several statements in.
+    """
+
+    def visit(self, node):
+        """Visit an AST node and dispatch to the appropriate method"""
+        method_name = f"visit_{type(node).__name__}"
+        method = getattr(self, method_name, self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node):
+        """Transform all child nodes, copying this node if any child changed"""
+        changes = {}
+        for field, value in vars(node).items():
+            if isinstance(value, ASTNode):
+                new_value = self.visit(value)
+            elif isinstance(value, list) and any(isinstance(item, ASTNode) for item in value):
+                new_value = self.visit_list(value)
+            else:
+                continue
+            if new_value is not value:
+                changes[field] = new_value
+
+        if not changes:
+            return node
+
+        new_node = copy.copy(node)
+        for field, value in changes.items():
+            setattr(new_node, field, value)
+        return new_node
+
+    def visit_list(self, items):
+        """Transform a list of nodes, returning the same list if nothing changed"""
+        result = []
+        changed = False
+        for item in items:
+            new_item = self.visit(item) if isinstance(item, ASTNode) else item
+            if new_item is not item:
+                changed = True
+            if new_item is None:
+                continue
+            if isinstance(new_item, list):
+                result.extend(new_item)
+            else:
+                result.append(new_item)
+        return result if changed else items
+
+
+def function_table(program):
+    """Map function names to their declarations in a program"""
+    return {stmt.name: stmt for stmt in program.statements
+            if isinstance(stmt, FunctionDeclaration)}
+
+
+class Optimizer:
+    """Runs the AST optimization passes enabled for an optimization level"""
+
+    def __init__(self, opt_level=1, lookup_tables=False, inline_max_size=16, inline_max_depth=3):
+        self.opt_level = opt_level
+        self.lookup_tables = lookup_tables
+        self.inline_max_size = inline_max_size
+        self.inline_max_depth = inline_max_depth
+        self.reports = {}
+
+    def optimize(self, program):
+        """Return an optimized copy of the program"""
+        if self.opt_level < 1:
+            return program
+
+        from const_eval import ConstantCallFolder
+
+        folder = ConstantCallFolder(build_tables=self.lookup_tables)
+        program = folder.fold(program)
+        self.reports['const_eval'] = folder.report
+
+        from cse import CommonSubexpressionEliminator
+
+        eliminator = CommonSubexpressionEliminator()
+        program = eliminator.eliminate(program)
+        self.reports['cse'] = eliminator.report
+
+        from licm import LoopInvariantCodeMotion
+
+        licm = LoopInvariantCodeMotion()
+        program = licm.hoist(program)
+        self.reports['licm'] = licm.report
+
+        if self.opt_level >= 2:
+            from inliner import Inliner
+
+            inliner = Inliner(self.inline_max_size, self.inline_max_depth)
+            program = inliner.inline(program)
+            self.reports['inline'] = inliner.report
+
+        from switch_lowering import SwitchLowering
+
+        lowering = SwitchLowering()
+        program = lowering.lower(program)
+        self.reports['switch'] = lowering.report
+
+        return program
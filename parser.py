@@ -139,6 +139,44 @@ class Call(ASTNode):
     def __repr__(self):
         return f"Call({self.callee}, {self.arguments})"
 
+# Nodes below are only produced by optimization passes, never by the parser
+
+class ConstTable(ASTNode):
+    def __init__(self, name, elem_type, values):
+        self.name = name
+        self.elem_type = elem_type  # Hinglish type name of the elements
+        self.values = values        # Precomputed Python values
+    def __repr__(self):
+        return f"ConstTable({self.name}, {self.elem_type}, {self.values})"
+
+class Sequence(ASTNode):
+    def __init__(self, expressions):
+        self.expressions = expressions  # Evaluated in order, value of the last
+    def __repr__(self):
+        return f"Sequence({self.expressions})"
+
+class TableLookup(ASTNode):
+    def __init__(self, table, index):
+        self.table = table  # Name of a ConstTable
+        self.index = index
+    def __repr__(self):
+        return f"TableLookup({self.table}, {self.index})"
+
+class SwitchCase(ASTNode):
+    def __init__(self, values, body):
+        self.values = values  # Literal nodes, none repeated within a switch
+        self.body = body
+    def __repr__(self):
+        return f"Case({self.values}, {self.body})"
+
+class SwitchStatement(ASTNode):
+    def __init__(self, subject, cases, default):
+        self.subject = subject  # Variable compared against every case
+        self.cases = cases
+        self.default = default  # Statement run when no case matches, or None
+    def __repr__(self):
+        return f"Switch({self.subject}, {self.cases}, {self.default})"
+
 
 # Parser Implementation
 class Parser:
@@ -171,6 +209,14 @@ class Parser:
         return VarDeclaration(var_type, name, initializer)
 
     def function_declaration(self):
+        name, parameters, return_type = self.function_signature()
+        self.consume(TokenType.LEFT_BRACE, "Expect '{' before function body.")
+        body = BlockStatement(self.block())
+        
+        return FunctionDeclaration(name, parameters, return_type, body)
+
+    def function_signature(self):
+        """Parse a function's name, parameters and return type, up to its body"""
         name = self.consume(TokenType.IDENTIFIER, "Expect function name.").value
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after function name.")
         
@@ -200,10 +246,7 @@ class Parser:
                                           TokenType.STRING, TokenType.CHAR], 
                                          "Expect return type.")
         
-        self.consume(TokenType.LEFT_BRACE, "Expect '{' before function body.")
-        body = BlockStatement(self.block())
-        
-        return FunctionDeclaration(name, parameters, return_type, body)
+        return name, parameters, return_type
 
     def statement(self):
         if self.match(TokenType.IF):
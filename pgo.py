@@ -0,0 +1,119 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from build_cache import cache_root
+
+
+class PGOError(Exception):
+    """Raised when a stage of a profile-guided build fails"""
+    pass
+
+
+class PGOBuilder:
+    """Builds an executable with profile-guided optimization.
+
+    Stage 1 compiles an instrumented binary with -fprofile-generate, stage 2
+    runs it on the training inputs and argument sets, and stage 3 rebuilds
+    with -fprofile-use.  Each build works in its own staging directory,
+    where the object file is compiled under a fixed name so gcc writes the
+    .gcda profile next to it.  The trained profile is then renamed into a
+    cache entry keyed by the hash of the C code and the flags, so concurrent
+    builds of the same program never share files.  Later builds copy the
+    profile from there and skip straight to stage 3.
+    """
+
+    OBJECT_NAME = "hpc_pgo.o"
+
+    def __init__(self, flags, train_inputs=(), train_args=(), timeout=60, cache_dir=None, log=print):
+        self.flags = list(flags)                # gcc flags of the build profile
+        self.train_inputs = list(train_inputs)  # Files fed to training runs on stdin
+        self.train_args = list(train_args)      # Argument lists for training runs
+        self.timeout = timeout                  # Seconds allowed per training run
+        self.cache_dir = os.path.abspath(cache_dir or os.path.join(cache_root(), "pgo"))
+        self.log = log
+
+    def entry_dir(self, c_code):
+        """Cache directory for one program and set of flags"""
+        digest = hashlib.sha256(c_code.encode())
+        digest.update("\0".join(self.flags).encode())
+        return os.path.join(self.cache_dir, digest.hexdigest())
+
+    def build(self, c_code, output_file):
+        """Run the PGO stages needed to build output_file from c_code"""
+        entry = self.entry_dir(c_code)
+        cached_profile = os.path.join(entry, os.path.splitext(self.OBJECT_NAME)[0] + ".gcda")
+        os.makedirs(entry, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix="staging-", dir=self.cache_dir)
+        try:
+            obj = os.path.join(staging, self.OBJECT_NAME)
+            profile = os.path.splitext(obj)[0] + ".gcda"
+
+            if os.path.exists(cached_profile):
+                self.log(f"PGO: reusing cached profile {cached_profile}")
+                shutil.copyfile(cached_profile, profile)
+            else:
+                instrumented = os.path.join(staging, "hpc_pgo_instrumented")
+                self.log("PGO stage 1: building instrumented binary")
+                self.compile_object(c_code, obj, ["-fprofile-generate"])
+                self.link(obj, instrumented, ["-fprofile-generate"])
+
+                self.log("PGO stage 2: training")
+                self.train(instrumented)
+                if not os.path.exists(profile):
+                    raise PGOError("Training runs produced no profile data")
+                self.publish(profile, cached_profile)
+
+            self.log("PGO stage 3: rebuilding with profile feedback")
+            self.compile_object(c_code, obj, ["-fprofile-use", "-fprofile-correction", "-Wno-missing-profile"])
+            self.link(obj, output_file, [])
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return True
+
+    def publish(self, profile, cached_profile):
+        """Copy a trained profile into the cache, renaming it into place so readers never see part of it"""
+        fd, temporary = tempfile.mkstemp(suffix=".gcda.tmp", dir=os.path.dirname(cached_profile))
+        os.close(fd)
+        try:
+            shutil.copyfile(profile, temporary)
+            os.replace(temporary, cached_profile)
+        except OSError:
+            os.remove(temporary)
+            raise
+
+    def train(self, instrumented):
+        """Run the instrumented binary once per training input and argument set"""
+        runs = [(path, []) for path in self.train_inputs]
+        runs += [(None, args) for args in self.train_args]
+        if not runs:
+            runs = [(None, [])]
+
+        for input_path, args in runs:
+            description = input_path or " ".join(args) or "no input"
+            self.log(f"  Training run: {description}")
+            stdin = open(input_path, 'rb') if input_path else subprocess.DEVNULL
+            try:
+                subprocess.run([instrumented] + args, stdin=stdin, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                # Profile data is only written on a normal exit
+                raise PGOError(f"Training run '{description}' timed out after {self.timeout}s")
+            finally:
+                if input_path:
+                    stdin.close()
+
+    def compile_object(self, c_code, obj, extra_flags):
+        self.run_gcc(['gcc', '-x', 'c', '-', '-c'] + self.flags + extra_flags + ['-o', obj], c_code)
+
+    def link(self, obj, output_file, extra_flags):
+        self.run_gcc(['gcc', obj] + self.flags + extra_flags + ['-o', output_file])
+
+    def run_gcc(self, cmd, c_code=None):
+        self.log(f"Running command: {' '.join(cmd)}")
+        result = subprocess.run(cmd, input=c_code.encode() if c_code is not None else None,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise PGOError(f"GCC compilation failed: {result.stderr.decode()}")
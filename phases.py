@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from code_writer import is_binary_stream
+
+# Chrome trace threads: the compiler's own phases, and the programs it runs
+COMPILER_THREAD = 1
+PROCESS_THREAD = 2
+
+
+class Phase:
+    """Measurements of one compiler phase or one run of an external program"""
+
+    def __init__(self, name, category, start):
+        self.name = name
+        self.category = category  # "phase" for compiler work, "process" for gcc and program runs
+        self.start = start        # Seconds since the timer was created
+        self.wall = 0.0           # Seconds
+        self.cpu = 0.0            # Seconds of this process, or of the program for a process
+        self.peak_memory = None   # Peak bytes traced by tracemalloc during a phase
+        self.counters = {}        # Tokens, AST nodes, bytes emitted and so on
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'start': self.start,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'peak_memory': self.peak_memory,
+            'counters': self.counters,
+        }
+
+
+class PhaseTimer:
+    """Records wall time, CPU time, peak memory and counters per compiler phase.
+
+    Disabled timers measure nothing: their phase() and process() yield None,
+    so callers only compute counters under `if phase:`.  Phases must not
+    nest, since each one restarts tracemalloc's peak; process spans may
+    overlap them, as gcc does while it reads the C being generated.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.origin = time.perf_counter()
+        self.phases = []
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the compiler itself"""
+        if not self.enabled:
+            yield None
+            return
+        record = Phase(name, "phase", time.perf_counter() - self.origin)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record.cpu = time.process_time() - cpu
+            record.wall = time.perf_counter() - self.origin - record.start
+            if self.trace_memory:
+                record.peak_memory = tracemalloc.get_traced_memory()[1]
+            self.phases.append(record)
+
+    @contextmanager
+    def process(self, name):
+        """Time an external program, such as gcc, that is waited for inside the block.
+
+        Its CPU time is that of the children reaped meanwhile.
+        """
+        if not self.enabled:
+            yield None
+            return
+        record = Phase(name, "process", time.perf_counter() - self.origin)
+        cpu = children_cpu_time()
+        try:
+            yield record
+        finally:
+            record.cpu = children_cpu_time() - cpu
+            record.wall = time.perf_counter() - self.origin - record.start
+            self.phases.append(record)
+
+    def report(self):
+        """Return the measurements as lines of a table, in the order the phases started"""
+        lines = [f"{'Phase':<16}{'Wall ms':>11}{'CPU ms':>11}{'Peak KiB':>11}  Counters"]
+        for record in sorted(self.phases, key=lambda record: record.start):
+            peak = f"{record.peak_memory / 1024:.1f}" if record.peak_memory is not None else "-"
+            counters = ", ".join(f"{name}={value}" for name, value in record.counters.items())
+            lines.append(f"{record.name:<16}{record.wall * 1000:>11.3f}{record.cpu * 1000:>11.3f}"
+                         f"{peak:>11}  {counters}")
+        total = time.perf_counter() - self.origin
+        lines.append(f"{'total':<16}{total * 1000:>11.3f}")
+        return lines
+
+    def to_dict(self):
+        return {'phases': [record.to_dict() for record in self.phases],
+                'memory_traced': self.trace_memory}
+
+    def trace_events(self):
+        """Return the measurements as Chrome trace events, in microseconds"""
+        pid = os.getpid()
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': COMPILER_THREAD, 'args': {'name': 'hpc'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': PROCESS_THREAD, 'args': {'name': 'programs'}},
+        ]
+        for record in self.phases:
+            args = {'cpu_ms': record.cpu * 1000, **record.counters}
+            if record.peak_memory is not None:
+                args['peak_memory'] = record.peak_memory
+            events.append({
+                'name': record.name,
+                'cat': record.category,
+                'ph': 'X',
+                'ts': record.start * 1e6,
+                'dur': record.wall * 1e6,
+                'pid': pid,
+                'tid': PROCESS_THREAD if record.category == "process" else COMPILER_THREAD,
+                'args': args,
+            })
+        return events
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_chrome_trace(self, path):
+        """Write a trace loadable by chrome://tracing and Perfetto"""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+
+
+def children_cpu_time():
+    """User and system CPU seconds of the child processes reaped so far"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class CountingStream:
+    """Passes writes through to a binary stream, counting the bytes"""
+
+    mode = "wb"
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        return self.stream.write(data)
+
+
+class CountingTextStream(CountingStream, io.TextIOBase):
+    """Passes writes through to a text stream, counting the bytes they encode to"""
+
+    mode = "w"
+
+    def write(self, data):
+        self.bytes += len(data.encode())
+        return self.stream.write(data)
+
+
+def counting_stream(stream):
+    """Wrap a text or binary stream so the bytes written to it are counted"""
+    if is_binary_stream(stream):
+        return CountingStream(stream)
+    return CountingTextStream(stream)
+
+
+def count_nodes(node):
+    """Number of nodes in an AST"""
+    from optimizer import walk
+    return sum(1 for _ in walk(node))
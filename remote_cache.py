@@ -0,0 +1,79 @@
+import hashlib
+import http.client
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Header carrying the SHA-256 of an artifact's bytes, both ways
+DIGEST_HEADER = "X-Content-SHA256"
+
+
+class HTTPRemoteCache:
+    """Artifact store shared between machines over plain HTTP.
+
+    An artifact is addressed by the content hash of its build and a file
+    name, as `<url>/<key>/<name>`: GET returns it or 404, PUT stores it.
+    Both send the artifact's SHA-256 in an X-Content-SHA256 header, and a
+    download that does not match it counts as a miss.  Any other failure
+    disables the remote for the rest of the process with
+    a warning, so a missing server slows no more than one request and never
+    fails a build.
+    """
+
+    def __init__(self, url, timeout=5):
+        self.url = url.rstrip('/')
+        self.timeout = timeout  # Seconds per request
+        self.available = True
+
+    def get(self, key, name):
+        """Return the artifact's bytes, or None if it is missing or the remote is down"""
+        if not self.available:
+            return None
+        try:
+            with urllib.request.urlopen(f"{self.url}/{key}/{name}", timeout=self.timeout) as response:
+                data = response.read()
+                digest = response.headers.get(DIGEST_HEADER)
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                self.disable(e)
+            return None
+        except (OSError, http.client.HTTPException) as e:
+            self.disable(e)
+            return None
+
+        if digest != hashlib.sha256(data).hexdigest():
+            print(f"Warning: Remote cache '{self.url}' sent a corrupt '{name}' for {key[:12]}, ignoring it")
+            return None
+        return data
+
+    def put(self, key, name, data):
+        """Upload an artifact; failures only disable the remote"""
+        if not self.available:
+            return
+        headers = {"Content-Type": "application/octet-stream", DIGEST_HEADER: hashlib.sha256(data).hexdigest()}
+        request = urllib.request.Request(f"{self.url}/{key}/{name}", data=data, method='PUT', headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except (OSError, http.client.HTTPException) as e:
+            self.disable(e)
+
+    def disable(self, error):
+        print(f"Warning: Remote cache '{self.url}' unavailable ({error}), continuing without it")
+        self.available = False
+
+
+# Remote cache implementations by URL scheme
+REMOTE_BACKENDS = {
+    "http": HTTPRemoteCache,
+    "https": HTTPRemoteCache,
+}
+
+
+def open_remote(url, timeout=5):
+    """Remote cache for a URL, or None if its scheme has no backend"""
+    scheme = urllib.parse.urlparse(url).scheme
+    if scheme not in REMOTE_BACKENDS:
+        print(f"Warning: No remote cache backend for '{url}', continuing without it")
+        return None
+    return REMOTE_BACKENDS[scheme](url, timeout)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from build_cache import cache_root, gcc_version
+
+RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_HEADER = "hinglish_rt.h"
+RUNTIME_SOURCE = "hinglish_rt.c"
+RUNTIME_LIBRARY = "libhinglish_rt.a"
+
+# Flags that only affect linking, which the runtime is built without
+LINK_ONLY_FLAGS = ("-s", "-static")
+
+
+class RuntimeLibraryError(Exception):
+    """Raised when the runtime library cannot be built"""
+    pass
+
+
+class RuntimeLibrary:
+    """The hinglish_rt runtime, prebuilt once per set of gcc code generation flags.
+
+    An entry in the cache holds a copy of hinglish_rt.h, its precompiled
+    header and libhinglish_rt.a, all compiled with the program's flags so
+    gcc accepts the precompiled header.  Entries are keyed by the runtime
+    sources, the flags and the gcc version, and are built in a temporary
+    directory and renamed into place, so parallel builds never see half of
+    one.
+    """
+
+    def __init__(self, flags, root=None, log=print):
+        # Profiles that differ only in how they link share a runtime
+        self.flags = [flag for flag in flags if flag not in LINK_ONLY_FLAGS and not flag.startswith("-Wl,")]
+        self.root = os.path.abspath(root or os.path.join(cache_root(), "runtime"))
+        self.log = log
+
+    def key(self):
+        digest = hashlib.sha256()
+        for name in (RUNTIME_HEADER, RUNTIME_SOURCE):
+            with open(os.path.join(RUNTIME_DIR, name), 'rb') as f:
+                digest.update(f.read())
+        for part in [gcc_version()] + self.flags:
+            digest.update(b"\0" + part.encode())
+        return digest.hexdigest()
+
+    def prepare(self):
+        """Directory of the built runtime, building it first if needed"""
+        entry = os.path.join(self.root, self.key())
+        if os.path.isdir(entry):
+            return entry
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix="staging-", dir=self.root)
+        try:
+            self.log(f"Building the runtime library for: {' '.join(self.flags)}")
+            self.build(staging)
+            try:
+                os.rename(staging, entry)
+                staging = None
+            except OSError:
+                if not os.path.isdir(entry):
+                    raise
+                # Another build finished the same entry first
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+        return entry
+
+    def build(self, directory):
+        shutil.copyfile(os.path.join(RUNTIME_DIR, RUNTIME_HEADER), os.path.join(directory, RUNTIME_HEADER))
+        obj = os.path.join(directory, "hinglish_rt.o")
+        self.run(['gcc', '-x', 'c-header', RUNTIME_HEADER] + self.flags + ['-o', RUNTIME_HEADER + '.gch'], directory)
+        self.run(['gcc', '-c', os.path.join(RUNTIME_DIR, RUNTIME_SOURCE), '-I', directory] + self.flags + ['-o', obj],
+                 directory)
+        # gcc-ar indexes the symbols of -flto objects, which plain ar may not
+        self.run([shutil.which('gcc-ar') or 'ar', 'rcs', RUNTIME_LIBRARY, obj], directory)
+        os.remove(obj)
+
+    def run(self, cmd, directory):
+        try:
+            result = subprocess.run(cmd, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as e:
+            raise RuntimeLibraryError(f"{cmd[0]} not found") from e
+        if result.returncode != 0:
+            raise RuntimeLibraryError(f"{' '.join(cmd)} failed: {result.stderr.decode()}")
+
+    def gcc_args(self, directory):
+        """Arguments after the program's source that include and link the runtime in directory"""
+        return ['-I', directory, '-L', directory, '-lhinglish_rt']
@@ -36,37 +36,46 @@ class SemanticAnalyzer:
         self.current_function = None
         self.errors = []
     
-    def analyze(self, program):
+    def analyze(self, program, print_errors=True):
         """Analyze AST for semantic errors and return type information"""
         try:
             self.visit(program)
-            
-            # Create result object with analysis results
-            result = {
-                'success': len(self.errors) == 0,
-                'errors': self.errors.copy(),
-                'symbol_table': self.symbols  # Return the symbol table for use by code generator
-            }
-            
-            # Print errors if any
-            if not result['success']:
-                for error in self.errors:
-                    print(f"Semantic Error: {error}")
-            
-            return result
+            return self.report(print_errors)
         except SemanticError as e:
-            print(f"Semantic Error: {e}")
+            if print_errors:
+                print(f"Semantic Error: {e}")
             return {
                 'success': False,
                 'errors': [str(e)],
                 'symbol_table': self.symbols
             }
     
+    def report(self, print_errors=True):
+        """Return the results of the analysis so far, printing its errors if asked"""
+        # Create result object with analysis results
+        result = {
+            'success': len(self.errors) == 0,
+            'errors': self.errors.copy(),
+            'symbol_table': self.symbols  # Return the symbol table for use by code generator
+        }
+        
+        # Print errors if any
+        if not result['success'] and print_errors:
+            for error in self.errors:
+                print(f"Semantic Error: {error}")
+        
+        return result
+    
     def visit(self, node):
         """Visit a node in the AST"""
         method_name = f'visit_{type(node).__name__}'
         method = getattr(self, method_name, self.generic_visit)
-        return method(node)
+        result = method(node)
+        
+        # Annotate expressions with their type for optimization passes
+        if result is not None:
+            node.type = result
+        return result
     
     def generic_visit(self, node):
         """Default handler for unhandled node types"""
@@ -74,11 +83,27 @@ class SemanticAnalyzer:
     
     def visit_Program(self, program):
         """Visit the program node"""
+        # Declare every function first so calls may precede definitions
+        self.declare_functions(stmt for stmt in program.statements if isinstance(stmt, FunctionDeclaration))
+        
         for statement in program.statements:
             self.visit(statement)
     
+    def declare_functions(self, functions):
+        """Define the return types of functions, whose bodies may not be parsed yet"""
+        for func in functions:
+            return_type = func.return_type.value if func.return_type else \
+                          ("ank" if func.name == "main" else None)
+            self.symbols.define(func.name, return_type)
+    
     def visit_FunctionDeclaration(self, func):
         """Visit function declaration"""
+        self.enter_function(func)
+        self.visit(func.body)
+        self.exit_function()
+    
+    def enter_function(self, func):
+        """Make func the current function and open its scope, holding the parameters"""
         self.current_function = func
         
         # Create a special Token-like object for return type
@@ -102,25 +127,21 @@ class SemanticAnalyzer:
         # Add parameters to scope
         for param in func.params:
             self.symbols.define(param.name, param.type.value)
-        
-        self.visit(func.body)
+    
+    def exit_function(self):
+        """Close the scope of the current function"""
         self.symbols.exit_scope()
         self.current_function = None
     
     def visit_VarDeclaration(self, var_decl):
         """Visit variable declaration"""
-        # Check if variable is already defined in current scope
-        if var_decl.name in self.symbols.scopes[-1]:
-            self.errors.append(f"Variable '{var_decl.name}' is already defined in this scope")
+        self.check_redefinition(var_decl.name)
         
         # Validate initializer if present
         if var_decl.initializer:
-            init_type = self.visit(var_decl.initializer)
-            if not self.check_type_compatibility(var_decl.var_type.value, init_type):
-                self.errors.append(f"Cannot assign {init_type} to variable '{var_decl.name}' of type {var_decl.var_type.value}")
+            self.visit(var_decl.initializer)
         
-        # Add to symbol table
-        self.symbols.define(var_decl.name, var_decl.var_type.value)
+        self.define_variable(var_decl)
     
     def visit_BlockStatement(self, block):
         """Visit block statement"""
@@ -131,9 +152,7 @@ class SemanticAnalyzer:
     
     def visit_IfStatement(self, if_stmt):
         """Visit if statement"""
-        cond_type = self.visit(if_stmt.condition)
-        if cond_type != "boolean":
-            self.errors.append(f"Condition in if statement must be a boolean expression")
+        self.check_condition(self.visit(if_stmt.condition), "if")
         
         self.visit(if_stmt.then_branch)
         if if_stmt.else_branch:
@@ -141,9 +160,7 @@ class SemanticAnalyzer:
     
     def visit_WhileStatement(self, while_stmt):
         """Visit while statement"""
-        cond_type = self.visit(while_stmt.condition)
-        if cond_type != "boolean":
-            self.errors.append(f"Condition in while statement must be a boolean expression")
+        self.check_condition(self.visit(while_stmt.condition), "while")
         
         self.visit(while_stmt.body)
     
@@ -155,9 +172,7 @@ class SemanticAnalyzer:
             self.visit(for_stmt.initializer)
         
         if for_stmt.condition:
-            cond_type = self.visit(for_stmt.condition)
-            if cond_type != "boolean":
-                self.errors.append(f"Condition in for statement must be a boolean expression")
+            self.check_condition(self.visit(for_stmt.condition), "for")
         
         if for_stmt.increment:
             self.visit(for_stmt.increment)
@@ -171,21 +186,9 @@ class SemanticAnalyzer:
     
     def visit_ReturnStatement(self, return_stmt):
         """Visit return statement"""
-        if not self.current_function:
-            self.errors.append(f"Return statement outside of function")
-            return
-        
-        expected_type = self.current_function.return_type
-        if expected_type is None:  # void function
-            if return_stmt.value is not None:
-                self.errors.append(f"Cannot return a value from a void function")
-        else:
-            if return_stmt.value is None:
-                self.errors.append(f"Function must return a value of type {expected_type.value}")
-            else:
-                return_type = self.visit(return_stmt.value)
-                if not self.check_type_compatibility(expected_type.value, return_type):
-                    self.errors.append(f"Return type mismatch: expected {expected_type.value}, got {return_type}")
+        expected_type = self.expected_return_type(return_stmt)
+        if expected_type is not None:
+            self.check_return_type(expected_type, self.visit(return_stmt.value))
     
     def visit_ExpressionStatement(self, expr_stmt):
         """Visit expression statement"""
@@ -193,33 +196,132 @@ class SemanticAnalyzer:
     
     def visit_Assignment(self, assign):
         """Visit assignment"""
-        var_type = self.symbols.lookup(assign.name)
+        var_type = self.variable_type(assign.name)
         if var_type is None:
-            self.errors.append(f"Variable '{assign.name}' is not defined")
             return "unknown"
         
-        value_type = self.visit(assign.value)
-        if not self.check_type_compatibility(var_type, value_type):
-            self.errors.append(f"Cannot assign {value_type} to variable '{assign.name}' of type {var_type}")
-        
+        self.check_assignable(assign.name, var_type, self.visit(assign.value))
         return var_type
     
     def visit_Logical(self, logical):
         """Visit logical expression"""
         left_type = self.visit(logical.left)
         right_type = self.visit(logical.right)
-        
-        if left_type != "boolean" or right_type != "boolean":
-            self.errors.append(f"Logical operators require boolean operands")
-        
-        return "boolean"
+        return self.logical_type(left_type, right_type)
     
     def visit_Binary(self, binary):
         """Visit binary expression"""
         left_type = self.visit(binary.left)
         right_type = self.visit(binary.right)
-        op = binary.operator.value
+        return self.binary_type(binary.operator.value, left_type, right_type)
+    
+    def visit_Unary(self, unary):
+        """Visit unary expression"""
+        operand_type = self.visit(unary.right)
+        return self.unary_type(unary.operator.value, operand_type)
+    
+    def visit_Call(self, call):
+        """Visit function call"""
+        call_type, check_arguments = self.call_type(call)
+        
+        # TODO: Check argument count and types when we have function parameters
+        if check_arguments:
+            for arg in call.arguments:
+                self.visit(arg)
         
+        return call_type
+    
+    def visit_Variable(self, variable):
+        """Visit variable reference"""
+        var_type = self.variable_type(variable.name)
+        if var_type is None:
+            return "unknown"
+        
+        # Annotate the variable node with its type for code generation
+        variable.type = var_type
+        return var_type
+    
+    def visit_Literal(self, literal):
+        """Visit literal"""
+        value = literal.value
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return "ank"
+        elif isinstance(value, float) or (isinstance(value, str) and self.is_float(value)):
+            return "sankhya"
+        elif isinstance(value, str):
+            # Check if it's a character (single character in quotes)
+            if len(value) == 1:
+                return "akshar"
+            # Otherwise treat as string
+            return "vakya"
+        return "unknown"
+    
+    def visit_Grouping(self, grouping):
+        """Visit expression grouping"""
+        return self.visit(grouping.expression)
+    
+    # Checks on the types of visited subexpressions, which FusedGenerator
+    # shares while it generates C in the same traversal
+    def check_redefinition(self, name):
+        """Check a variable is not already defined in the current scope"""
+        if name in self.symbols.scopes[-1]:
+            self.errors.append(f"Variable '{name}' is already defined in this scope")
+    
+    def define_variable(self, var_decl):
+        """Check the type of a visited initializer and add the variable to the symbol table"""
+        if var_decl.initializer:
+            self.check_assignable(var_decl.name, var_decl.var_type.value, var_decl.initializer.type)
+        self.symbols.define(var_decl.name, var_decl.var_type.value)
+    
+    def check_assignable(self, name, var_type, value_type):
+        """Check a value of value_type may be stored in the variable"""
+        if not self.check_type_compatibility(var_type, value_type):
+            self.errors.append(f"Cannot assign {value_type} to variable '{name}' of type {var_type}")
+    
+    def check_condition(self, cond_type, statement):
+        """Check the condition of an if, while or for statement is boolean"""
+        if cond_type != "boolean":
+            self.errors.append(f"Condition in {statement} statement must be a boolean expression")
+    
+    def expected_return_type(self, return_stmt):
+        """Check a return statement fits the current function.
+        
+        Returns the type its value must have, or None if there is no value to check.
+        """
+        if not self.current_function:
+            self.errors.append(f"Return statement outside of function")
+            return None
+        
+        expected_type = self.current_function.return_type
+        if expected_type is None:  # void function
+            if return_stmt.value is not None:
+                self.errors.append(f"Cannot return a value from a void function")
+            return None
+        if return_stmt.value is None:
+            self.errors.append(f"Function must return a value of type {expected_type.value}")
+            return None
+        return expected_type.value
+    
+    def check_return_type(self, expected_type, return_type):
+        """Check the type of a returned value"""
+        if not self.check_type_compatibility(expected_type, return_type):
+            self.errors.append(f"Return type mismatch: expected {expected_type}, got {return_type}")
+    
+    def variable_type(self, name):
+        """Look up the type of a variable, or return None if it is not defined"""
+        var_type = self.symbols.lookup(name)
+        if var_type is None:
+            self.errors.append(f"Variable '{name}' is not defined")
+        return var_type
+    
+    def logical_type(self, left_type, right_type):
+        """Type of a logical expression"""
+        if left_type != "boolean" or right_type != "boolean":
+            self.errors.append(f"Logical operators require boolean operands")
+        return "boolean"
+    
+    def binary_type(self, op, left_type, right_type):
+        """Type of a binary expression"""
         # Comparison operators
         if op in ["<", ">", "<=", ">=", "==", "!="]:
             # Type compatibility for comparison
@@ -244,11 +346,8 @@ class SemanticAnalyzer:
         
         return "unknown"
     
-    def visit_Unary(self, unary):
-        """Visit unary expression"""
-        operand_type = self.visit(unary.right)
-        op = unary.operator.value
-        
+    def unary_type(self, op, operand_type):
+        """Type of a unary expression"""
         if op == "-":
             if not self.is_numeric_type(operand_type):
                 self.errors.append(f"Unary '{op}' requires numeric operand")
@@ -260,12 +359,16 @@ class SemanticAnalyzer:
         
         return "unknown"
     
-    def visit_Call(self, call):
-        """Visit function call"""
+    def call_type(self, call):
+        """Type of a call to a named function.
+        
+        Returns the type and whether the arguments are to be checked, which
+        they are not when the callee is unknown.
+        """
         callee = call.callee
         if not isinstance(callee, Variable):
             self.errors.append(f"Cannot call a non-function value")
-            return "unknown"
+            return "unknown", False
         
         func_name = callee.name
         func_type = self.symbols.lookup(func_name)
@@ -273,46 +376,12 @@ class SemanticAnalyzer:
         if func_type is None:
             # Special case for built-in likho function
             if func_name == "likho":
-                for arg in call.arguments:
-                    self.visit(arg)
-                return "void"
+                return "void", True
             
             self.errors.append(f"Function '{func_name}' is not defined")
-            return "unknown"
-        
-        # TODO: Check argument count and types when we have function parameters
+            return "unknown", False
         
-        return func_type
-    
-    def visit_Variable(self, variable):
-        """Visit variable reference"""
-        var_type = self.symbols.lookup(variable.name)
-        if var_type is None:
-            self.errors.append(f"Variable '{variable.name}' is not defined")
-            return "unknown"
-        
-        # Annotate the variable node with its type for code generation
-        variable.type = var_type
-        return var_type
-    
-    def visit_Literal(self, literal):
-        """Visit literal"""
-        value = literal.value
-        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
-            return "ank"
-        elif isinstance(value, float) or (isinstance(value, str) and self.is_float(value)):
-            return "sankhya"
-        elif isinstance(value, str):
-            # Check if it's a character (single character in quotes)
-            if len(value) == 1:
-                return "akshar"
-            # Otherwise treat as string
-            return "vakya"
-        return "unknown"
-    
-    def visit_Grouping(self, grouping):
-        """Visit expression grouping"""
-        return self.visit(grouping.expression)
+        return func_type, True
     
     # Helper methods
     def is_float(self, value):
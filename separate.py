@@ -0,0 +1,150 @@
+import contextlib
+import hashlib
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from build_cache import DEFAULT_MAX_SIZE, cache_root, gcc_version
+
+HEADER_NAME = "hinglish_program.h"
+
+
+class ObjectCache:
+    """Object files addressed by the hash of their unit, header, flags and gcc.
+
+    Objects are written under a temporary name and renamed into place, so
+    parallel builds can share the cache.  Using an object bumps its
+    modification time and the least recently used ones are removed once the
+    cache grows beyond max_size.
+    """
+
+    def __init__(self, root=None, max_size=DEFAULT_MAX_SIZE):
+        self.root = root or os.path.join(cache_root(), "objects")
+        self.max_size = max_size
+
+    def key(self, header, unit, flags):
+        digest = hashlib.sha256()
+        for part in [header, unit, gcc_version()] + list(flags):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".o")
+
+    def lookup(self, key):
+        """Path of the cached object for key, or None"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temporary(self, key):
+        """Unique path beside the object's cache path for gcc to write it to"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(suffix=".o.tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        return temporary
+
+    def store(self, key, obj):
+        """Rename a compiled object from its temporary path into the cache"""
+        path = self.path(key)
+        os.replace(obj, path)
+        return path
+
+    def evict(self):
+        if not os.path.isdir(self.root):
+            return
+        objects = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                objects.append((os.path.getmtime(path), os.path.getsize(path), path))
+        total = sum(size for _, size, _ in objects)
+        for _, size, path in sorted(objects):
+            if total <= self.max_size:
+                break
+            # Another build may have removed it already
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+
+class SeparateBuilder:
+    """Compiles a program split into units, one gcc per changed unit, and links the objects.
+
+    Units whose object is already cached are not recompiled, and the rest are
+    compiled in parallel, so after an edit gcc only compiles the functions
+    that changed (all of them if the shared header changed).
+    """
+
+    def __init__(self, flags, jobs=None, cache=None, log=print):
+        self.flags = list(flags)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache or ObjectCache()
+        self.log = log
+        self.compiled = []  # Names of the units compiled by the last build
+        self.reused = []    # Names of the units found in the object cache
+
+    def build(self, header, units, output_file):
+        """Build output_file from a header and (name, code) units; True on success"""
+        self.compiled = []
+        self.reused = []
+        with tempfile.TemporaryDirectory(prefix="hpc-units-") as workdir:
+            with open(os.path.join(workdir, HEADER_NAME), 'w') as f:
+                f.write(header)
+
+            objects = {}
+            missing = []
+            for name, code in units:
+                key = self.cache.key(header, code, self.flags)
+                objects[name] = self.cache.lookup(key)
+                if objects[name]:
+                    self.reused.append(name)
+                else:
+                    missing.append((name, code, key))
+
+            with ThreadPoolExecutor(self.jobs) as pool:
+                results = list(pool.map(lambda unit: self.compile_unit(workdir, *unit), missing))
+            errors = [errors for _, _, errors in results if errors is not None]
+            if errors:
+                print(f"GCC compilation failed: {''.join(errors)}")
+                return False
+            for name, path, _ in results:
+                objects[name] = path
+                self.compiled.append(name)
+            self.log(f"Compiled {len(self.compiled)} of {len(units)} units "
+                     f"({len(self.reused)} from the object cache)")
+
+            cmd = ['gcc'] + [objects[name] for name, _ in units] + self.flags + ['-o', output_file]
+            self.log(f"Running command: gcc <{len(units)} objects> {' '.join(cmd[1 + len(units):])}")
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                print(f"GCC linking failed: {result.stderr.decode()}")
+                return False
+        self.cache.evict()
+        return True
+
+    def compile_unit(self, workdir, name, code, key):
+        """Compile one unit into the object cache; returns (name, path, errors or None)"""
+        obj = self.cache.temporary(key)
+        cmd = ['gcc', '-x', 'c', '-', '-c', '-I', workdir] + self.flags + ['-o', obj]
+        result = subprocess.run(cmd, input=code.encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            os.remove(obj)
+            return name, None, result.stderr.decode()
+        return name, self.cache.store(key, obj), None
+
+
+def write_units(directory, header, units):
+    """Write a header and its units as C files, for --keep-c"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, HEADER_NAME), 'w') as f:
+        f.write(header)
+    for name, code in units:
+        with open(os.path.join(directory, f"{name}.c"), 'w') as f:
+            f.write(code)
@@ -0,0 +1,109 @@
+import io
+import time
+
+from lexer import Lexer
+from parser import Parser
+from sem_analyser import SemanticAnalyzer
+from optimizer import Optimizer
+from generator import CodeGenerator
+from fused import FusedGenerator
+from ir_lowering import IRLowering
+from ir_passes import PassManager
+from ir_codegen import IREmitter
+
+
+class TranspileResult:
+    """Outcome of one transpilation"""
+
+    def __init__(self, c_code=None, errors=None, timings=None, reports=None):
+        self.c_code = c_code          # Generated C, or None if the source did not parse
+        self.errors = errors or []    # Error messages, without the "Semantic Error:" prefix
+        self.timings = timings or {}  # Seconds spent per phase, in pipeline order
+        self.reports = reports or {}  # Optimizer reports, as in Optimizer.reports
+
+    @property
+    def success(self):
+        return self.c_code is not None and not self.errors
+
+    def __repr__(self):
+        return f"TranspileResult(success={self.success}, errors={self.errors})"
+
+
+class TranspileService:
+    """Reentrant in-memory transpiler for multi-threaded services.
+
+    The settings are fixed when the service is created and every call builds
+    its own lexer, parser, analyzer and generator, so one service can be
+    shared by any number of threads.  Nothing is printed: diagnostics and
+    phase timings come back in the TranspileResult.  As with hpc, C is still
+    generated for programs with semantic errors, but they are not optimized.
+    With fused set, -O0 transpilations on the AST backend analyze and
+    generate in a single traversal, timed as one 'fused' phase.
+    """
+
+    def __init__(self, opt_level=0, lookup_tables=False, inline_max_size=16,
+                 inline_max_depth=3, backend="ast", fused=False):
+        self.opt_level = opt_level
+        self.lookup_tables = lookup_tables
+        self.inline_max_size = inline_max_size
+        self.inline_max_depth = inline_max_depth
+        self.backend = backend
+        self.fused = fused and opt_level == 0 and backend == "ast"
+
+    def transpile(self, source_code):
+        """Transpile Hinglish source code to C, returning a TranspileResult"""
+        timings = {}
+        clock = time.perf_counter()
+
+        def phase(name):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[name] = now - clock
+            clock = now
+
+        try:
+            tokens = Lexer(source_code).tokenize()
+            phase('lex')
+            ast = Parser(tokens).parse()
+            phase('parse')
+        except Exception as e:
+            return TranspileResult(errors=[str(e)], timings=timings)
+
+        if self.fused:
+            output = io.StringIO()
+            generator = FusedGenerator()
+            try:
+                analysis = generator.transpile(ast, output, print_errors=False)
+            except Exception as e:
+                return TranspileResult(errors=generator.analyzer.errors + [str(e)], timings=timings)
+            phase('fused')
+            return TranspileResult(output.getvalue(), analysis['errors'], timings)
+
+        analysis = SemanticAnalyzer().analyze(ast, print_errors=False)
+        phase('analyze')
+
+        reports = {}
+        if self.opt_level > 0 and analysis['success']:
+            optimizer = Optimizer(self.opt_level, lookup_tables=self.lookup_tables,
+                                  inline_max_size=self.inline_max_size,
+                                  inline_max_depth=self.inline_max_depth)
+            ast = optimizer.optimize(ast)
+            reports = optimizer.reports
+            phase('optimize')
+
+        output = io.StringIO()
+        try:
+            if self.backend == "ir" and analysis['success']:
+                module = IRLowering().lower(ast)
+                phase('lower')
+                PassManager(self.opt_level).run(module)
+                phase('ir_passes')
+                IREmitter().emit_to(module, output)
+            else:
+                generator = CodeGenerator(analysis['symbol_table'], attributes=self.opt_level > 0)
+                generator.generate_to(ast, output)
+            phase('generate')
+        except Exception as e:
+            return TranspileResult(errors=analysis['errors'] + [str(e)], timings=timings, reports=reports)
+
+        return TranspileResult(output.getvalue(), analysis['errors'], timings, reports)
@@ -0,0 +1,99 @@
+import re
+
+from lexer import Lexer
+from parser import FunctionDeclaration, Parser
+from sem_analyser import SemanticAnalyzer
+from generator import CodeGenerator
+
+
+class StreamingParser(Parser):
+    """Parser that reads tokens from an iterator, keeping only the current and previous one"""
+
+    def __init__(self, tokens):
+        super().__init__(None)
+        self.stream = iter(tokens)
+        self.current_token = next(self.stream)
+        self.previous_token = None
+
+    def advance(self):
+        if not self.is_at_end():
+            self.previous_token = self.current_token
+            self.current_token = next(self.stream)
+        return self.previous_token
+
+    def peek(self):
+        return self.current_token
+
+    def previous(self):
+        return self.previous_token
+
+    def declarations(self):
+        """Yield the top-level declarations one at a time"""
+        while not self.is_at_end():
+            yield self.declaration()
+
+
+# What the signature scan has to see: comments and literals to skip, braces
+# to know the nesting depth, and the vidhi keyword
+SIGNATURE_SCAN = re.compile(r"""#[^\n]*|"(?:\\.|[^"\\])*"?|'(?:\\.|.)?'?|[{}]|\bvidhi\b""", re.DOTALL)
+
+
+def scan_signatures(source_code):
+    """Return every top-level function, without its body, in one cheap pass over the source.
+
+    Only the signatures themselves are tokenized and parsed.  Scanning stops
+    at the first malformed one; parsing the program then reports the error,
+    or an earlier one.
+    """
+    signatures = []
+    depth = 0
+    for match in SIGNATURE_SCAN.finditer(source_code):
+        text = match.group()
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+        elif text == "vidhi" and depth == 0:
+            lexer = Lexer(source_code)
+            lexer.position = match.end()
+            try:
+                signatures.append(FunctionDeclaration(*StreamingParser(lexer.iter_tokens()).function_signature(), None))
+            except Exception:
+                break
+    return signatures
+
+
+class StreamingTranspiler:
+    """Transpiles a program one top-level declaration at a time.
+
+    A cheap first pass over the source collects the function signatures,
+    so the prototypes are written first and calls are checked before the
+    callee is parsed.  The second pass parses one declaration, analyzes it against
+    the global scope built so far, writes its C and drops its tokens and
+    AST, so memory grows with the largest declaration rather than the whole
+    program.  The C is that of the whole-program pipeline at -O0, which
+    gives prototypes no gcc attributes, since those need every body.
+    """
+
+    def __init__(self, runtime=False, log=print, instrument=None):
+        self.runtime = runtime  # Include hinglish_rt.h and print through it
+        self.log = log
+        self.instrument = instrument or (lambda visitor: visitor)  # Hook given each visitor, for profiling
+
+    def transpile_to(self, source_code, stream, print_errors=True):
+        """Write the C for source_code into a text or binary stream; returns the analysis result"""
+        signatures = scan_signatures(source_code)
+        self.log(f"Found {len(signatures)} function signatures")
+
+        analyzer = self.instrument(SemanticAnalyzer())
+        analyzer.declare_functions(signatures)
+        parser = StreamingParser(Lexer(source_code).iter_tokens())
+
+        def analyzed():
+            for declaration in parser.declarations():
+                analyzer.visit(declaration)
+                yield declaration
+
+        generator = self.instrument(CodeGenerator(analyzer.symbols, runtime=self.runtime))
+        generator.generate_declarations_to(signatures, analyzed(), stream)
+        return analyzer.report(print_errors)
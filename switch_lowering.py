@@ -0,0 +1,106 @@
+from parser import *  # Import all AST node classes
+from optimizer import NodeTransformer, int_constant
+
+
+class SwitchLowering(NodeTransformer):
+    """Turns if-else chains that compare one variable against constants into switches.
+
+    A chain is a run of `agar (x == 1) ... nahi_to agar (x == 2) ...` tests of
+    the same ank or akshar variable against literals of its type, where `ya`
+    may join several tests into one case.  The chain ends at the first
+    condition of any other shape and everything from there on becomes the
+    default, so the tests still run in their original order.  A value already
+    tested earlier in the chain is dropped from later cases, since the
+    earlier branch is the one that runs for it.
+    """
+
+    def __init__(self, min_cases=3):
+        self.min_cases = min_cases  # Shorter chains are left to gcc
+        self.report = []            # (function, variable, number of cases)
+        self.current_function = None
+
+    def lower(self, program):
+        """Lower every qualifying chain and return the new program"""
+        self.report = []
+        return self.visit(program)
+
+    def visit_FunctionDeclaration(self, func):
+        self.current_function = func
+        result = self.generic_visit(func)
+        self.current_function = None
+        return result
+
+    def visit_IfStatement(self, if_stmt):
+        # Chains are matched from their head, before the tail is rewritten
+        subject, cases, rest = self.collect_chain(if_stmt)
+        if len(cases) < self.min_cases:
+            return self.generic_visit(if_stmt)
+
+        cases = [SwitchCase(values, self.visit(body)) for values, body in cases]
+        default = self.visit(rest) if rest is not None else None
+        if self.current_function is not None:
+            self.report.append((self.current_function.name, subject.name, len(cases)))
+        return SwitchStatement(subject, cases, default)
+
+    def collect_chain(self, if_stmt):
+        """Split an if-else chain into (subject, [(values, body)], rest)"""
+        subject = None
+        cases = []
+        seen = set()
+        node = if_stmt
+        while isinstance(node, IfStatement):
+            tests = self.equality_tests(node.condition)
+            if tests is None:
+                break
+            variable, values = tests
+            if subject is None:
+                subject = variable
+            elif variable.name != subject.name:
+                break
+
+            values = [value for value in dict.fromkeys(values) if value not in seen]
+            seen.update(values)
+            if values:
+                cases.append((values, node.then_branch))
+
+            node = node.else_branch
+            # `nahi_to { agar ... }` continues the chain like `nahi_to agar`
+            if isinstance(node, BlockStatement) and len(node.statements) == 1 \
+                    and isinstance(node.statements[0], IfStatement):
+                node = node.statements[0]
+        return subject, cases, node
+
+    def equality_tests(self, condition):
+        """Return (variable, values) if a condition only tests one variable for equality"""
+        while isinstance(condition, Grouping):
+            condition = condition.expression
+
+        if isinstance(condition, Logical) and condition.operator.value == "ya":
+            left = self.equality_tests(condition.left)
+            right = self.equality_tests(condition.right)
+            if left is None or right is None or left[0].name != right[0].name:
+                return None
+            return left[0], left[1] + right[1]
+
+        if not isinstance(condition, Binary) or condition.operator.value != "==":
+            return None
+        if isinstance(condition.left, Variable):
+            variable, constant = condition.left, condition.right
+        elif isinstance(condition.right, Variable):
+            variable, constant = condition.right, condition.left
+        else:
+            return None
+
+        value = self.case_value(constant, getattr(variable, 'type', None))
+        if value is None:
+            return None
+        return variable, [value]
+
+    def case_value(self, node, subject_type):
+        """Python value of a case constant, or None if it does not fit the subject"""
+        if subject_type == "ank":
+            return int_constant(node)
+        if subject_type == "akshar" and isinstance(node, Literal) \
+                and getattr(node, 'type', None) == "akshar":
+            return node.value
+        return None
@@ -2,9 +2,16 @@ from lexer import Lexer, TokenType
 from parser import Parser
 from sem_analyser import SemanticAnalyzer
 from generator import CodeGenerator
+from fused import FusedGenerator
+from optimizer import Optimizer
+from ir_lowering import IRLowering
+from ir_passes import PassManager
+from ir_codegen import IREmitter
 import subprocess
 import os
 import tempfile
+import contextlib
+import sys
 
 def run_test(name, source_code, expected_pattern=None, expect_semantic_errors=None):
     """Run a parser test and verify the output contains expected patterns"""
@@ -74,7 +81,13 @@ def run_test(name, source_code, expected_pattern=None, expect_semantic_errors=No
         print(f"\n❌ ERROR: {e}")
         return False
 
-def run_generator_test(name, source_code, expected_output=None):
+def runtime_gcc_args():
+    """gcc arguments that include and link the runtime library, prebuilt for plain gcc flags"""
+    from runtime import RuntimeLibrary
+    library = RuntimeLibrary([], log=lambda message: None)
+    return library.gcc_args(library.prepare())
+
+def run_generator_test(name, source_code, expected_output=None, opt_level=0, backend="ast", runtime=False):
     """Run a full transpilation test focusing only on program output validation"""
     print(f"\n{'=' * 50}")
     print(f"CODE GENERATION TEST: {name}")
@@ -89,28 +102,40 @@ def run_generator_test(name, source_code, expected_output=None):
         tokens = lexer.tokenize()
         parser = Parser(tokens)
         ast = parser.parse()
-        analyzer = SemanticAnalyzer()
-        
-        analysis_result = analyzer.analyze(ast)
+        if backend == "fused":
+            # Analysis happens while the C is generated
+            generator = FusedGenerator(runtime)
+            c_code = generator.generate(ast)
+            analysis_result = generator.analyzer.report()
+        else:
+            analyzer = SemanticAnalyzer()
+            analysis_result = analyzer.analyze(ast)
 
         if not analysis_result['success']:
             print("Semantic analysis failed!")
             return
+        
+        if opt_level:
+            ast = Optimizer(opt_level).optimize(ast)
             
-        generator = CodeGenerator(analysis_result['symbol_table'])
-        c_code = generator.generate(ast)
+        if backend == "ir":
+            module = IRLowering().lower(ast)
+            PassManager(opt_level).run(module)
+            c_code = IREmitter(runtime).emit(module)
+        elif backend != "fused":
+            generator = CodeGenerator(analysis_result['symbol_table'], runtime=runtime, attributes=opt_level > 0)
+            c_code = generator.generate(ast)
         
         # Only attempt to compile and run if there's expected output to verify
         if expected_output is not None:
-            # Save C code to a temporary file
-            with tempfile.NamedTemporaryFile(suffix='.c', delete=False) as temp_c_file:
-                temp_c_path = temp_c_file.name
-                temp_c_file.write(c_code.encode())
+            # Only the executable needs a path, gcc reads the C code from stdin
+            with tempfile.NamedTemporaryFile(suffix='.exe', delete=False) as temp_exe_file:
+                temp_exe_path = temp_exe_file.name
             
             # Compile the C code
-            temp_exe_path = temp_c_path + '.exe'
             compile_result = subprocess.run(
-                ['gcc', temp_c_path, '-o', temp_exe_path], 
+                ['gcc', '-x', 'c', '-'] + (runtime_gcc_args() if runtime else []) + ['-o', temp_exe_path], 
+                input=c_code,
                 capture_output=True, 
                 text=True
             )
@@ -122,7 +147,7 @@ def run_generator_test(name, source_code, expected_output=None):
                 print(f"```\n{c_code}\n```")
                 
                 # Clean up
-                os.unlink(temp_c_path)
+                os.unlink(temp_exe_path)
                 return False
             
             # Run the compiled program
@@ -136,7 +161,6 @@ def run_generator_test(name, source_code, expected_output=None):
             print(f"```\n{run_result.stdout}\n```")
             
             # Clean up
-            os.unlink(temp_c_path)
             os.unlink(temp_exe_path)
             
             # Check output
@@ -560,9 +584,1261 @@ code_gen_tests = [
         }
         """,
         "expected_output": "19"
+    },
+    {
+        "name": "Compile-Time Function Evaluation",
+        "source": """
+        vidhi fibonacci(ank n) ank {
+            agar (n <= 1) {
+                wapas n;
+            }
+            wapas fibonacci(n - 1) + fibonacci(n - 2);
+        }
+        
+        vidhi main() {
+            likho(fibonacci(25));  # Folded to 75025 at -O1
+            wapas 0;
+        }
+        """,
+        "expected_output": "75025",
+        "opt_level": 1
+    },
+    {
+        "name": "Inlined Helper Functions",
+        "source": """
+        vidhi square(ank x) ank {
+            wapas x * x;
+        }
+        
+        vidhi sum_squares(ank a, ank b) ank {
+            wapas square(a) + square(b);
+        }
+        
+        vidhi main() {
+            ank total = 0;
+            karo (ank i = 1; i <= 4; i = i + 1) {
+                total = total + sum_squares(i, i + 1);
+            }
+            likho(total);  # 5 + 13 + 25 + 41 = 84
+            wapas 0;
+        }
+        """,
+        "expected_output": "84",
+        "opt_level": 2
+    },
+    {
+        "name": "Common Subexpressions",
+        "source": """
+        vidhi main() {
+            ank a = 4;
+            ank b = 3;
+            ank c = (a + b) * (a + b);
+            a = a + 1;
+            ank d = (a + b) - c;  # a changed, so a + b is recomputed
+            likho(c);
+            likho(d);
+            wapas 0;
+        }
+        """,
+        "expected_output": "49\n-41",
+        "opt_level": 1
+    },
+    {
+        "name": "Loop-Invariant Code Motion",
+        "source": """
+        ank scale = 3;
+        
+        vidhi bound(ank n) ank {
+            wapas n * scale;
+        }
+        
+        vidhi main() {
+            ank n = 4;
+            ank total = 0;
+            karo (ank i = 0; i < bound(n); i = i + 1) {
+                total = total + n * 2;
+            }
+            likho(total);  # 12 iterations of 8
+            ank j = 0;
+            jabtak (j < bound(n)) {
+                scale = 1;  # Writes the global bound() reads
+                j = j + 1;
+            }
+            likho(j);
+            wapas 0;
+        }
+        """,
+        "expected_output": "96\n4",
+        "opt_level": 1
+    },
+    {
+        "name": "IR Backend",
+        "source": """
+        ank calls = 0;
+        vidhi tick(ank x) ank {
+            calls = calls + 1;
+            wapas x;
+        }
+        vidhi main() {
+            ank total = 2 * 3 + 4;
+            karo (ank i = 0; i < 4; i = i + 1) {
+                ank total = i;  # Shadows the outer total
+                agar (total > 1) { likho(total); }
+            }
+            agar (calls > 5 aur tick(1) > 0) { likho("never"); }
+            agar (tick(1) > 0 ya tick(2) > 0) { likho('y'); }
+            sankhya half = 2.5;
+            likho(half * 2.0);
+            likho("tab\tend");
+            likho(total + calls);
+            wapas 0;
+        }
+        """,
+        "expected_output": "2\n3\ny\n5.000000\ntab\tend\n11",
+        "opt_level": 2,
+        "backend": "ir"
+    },
+    {
+        "name": "IR Backend Folded Negative Constant",
+        "source": """
+        vidhi dv(ank a, ank b) ank {
+            wapas a / b;
+        }
+        vidhi main() {
+            likho(dv(-7, 2));  # Folded to -3 before lowering
+            wapas 0;
+        }
+        """,
+        "expected_output": "-3",
+        "opt_level": 1,
+        "backend": "ir"
+    },
+    {
+        "name": "Calls Before Definitions",
+        "source": """
+        ank base = 10;
+        vidhi main() {
+            ank total = 0;
+            karo (ank i = 0; i < 5; i = i + 1) {
+                total = total + square(i) + offset(i);
+            }
+            likho(total);
+            likho(fact(5));
+            wapas 0;
+        }
+        vidhi square(ank x) ank { wapas x * x; }
+        vidhi offset(ank x) ank { wapas x + base; }
+        vidhi fact(ank n) ank {
+            agar (n <= 1) { wapas 1; }
+            wapas n * fact(n - 1);
+        }
+        """,
+        "expected_output": "90\n120"
+    },
+    {
+        "name": "Switch Lowering",
+        "source": """
+        vidhi code(ank d) ank {
+            agar (d == 1) { wapas 10; }
+            nahi_to agar (d == 2 ya d == 3) { wapas 20; }
+            nahi_to agar (d == 2) { wapas 99; }  # Unreachable duplicate
+            nahi_to agar (d == -4) { wapas 40; }
+            nahi_to agar (d > 10) { wapas 50; }  # Ends the switch
+            nahi_to agar (d == 11) { wapas 99; }
+            nahi_to { wapas 0; }
+        }
+        vidhi main() {
+            ank total = 0;
+            karo (ank i = -5; i < 13; i = i + 1) {
+                total = total * 2 + code(i);
+            }
+            likho(total);
+            likho(code(3));
+            likho(code(12));
+            wapas 0;
+        }
+        """,
+        "expected_output": "2672790\n20\n50",
+        "opt_level": 1
+    },
+    {
+        "name": "Fused Analysis and Generation",
+        "source": """
+        ank total = 0;
+        vidhi average(ank a, ank b) sankhya {
+            sankhya s = a + b;
+            wapas s / 2;
+        }
+        vidhi main() {
+            sankhya x = average(3, 4);
+            vakya message = "done";
+            karo (ank i = 1; i < 4; i = i + 1) {
+                ank x = i * i;
+                total = total + x;
+                likho(x);
+            }
+            likho(x);
+            likho(total);
+            likho(message);
+            wapas 0;
+        }
+        """,
+        "expected_output": "1\n4\n9\n3.500000\n14\ndone",
+        "backend": "fused"
+    },
+    {
+        "name": "Runtime Library Printing",
+        "source": """
+        vidhi main() {
+            ank zero = 0;
+            ank negative = -42;
+            ank smallest = -2147483647 - 1;
+            ank largest = 2147483647;
+            sankhya ratio = -2.5;
+            likho(zero);
+            likho(negative);
+            likho(smallest);
+            likho(largest);
+            likho(-7);
+            likho(ratio);
+            likho("namaste");
+            likho('A');
+            wapas 0;
+        }
+        """,
+        "expected_output": "0\n-42\n-2147483648\n2147483647\n-7\n-2.500000\nnamaste\nA",
+        "runtime": True
+    },
+    {
+        "name": "Runtime Library Printing (IR)",
+        "source": """
+        vidhi main() {
+            ank zero = 0;
+            ank negative = -42;
+            ank smallest = -2147483647 - 1;
+            ank largest = 2147483647;
+            sankhya ratio = -2.5;
+            likho(zero);
+            likho(negative);
+            likho(smallest);
+            likho(largest);
+            likho(-7);
+            likho(ratio);
+            likho("namaste");
+            likho('A');
+            wapas 0;
+        }
+        """,
+        "expected_output": "0\n-42\n-2147483648\n2147483647\n-7\n-2.500000\nnamaste\nA",
+        "runtime": True,
+        "backend": "ir",
+        "opt_level": 2
+    },
+    {
+        "name": "Runtime Library Printing (Fused)",
+        "source": """
+        vidhi main() {
+            ank zero = 0;
+            ank negative = -42;
+            ank smallest = -2147483647 - 1;
+            ank largest = 2147483647;
+            sankhya ratio = -2.5;
+            likho(zero);
+            likho(negative);
+            likho(smallest);
+            likho(largest);
+            likho(-7);
+            likho(ratio);
+            likho("namaste");
+            likho('A');
+            wapas 0;
+        }
+        """,
+        "expected_output": "0\n-42\n-2147483648\n2147483647\n-7\n-2.500000\nnamaste\nA",
+        "runtime": True,
+        "backend": "fused"
     }
 ]
 
+def run_system_test(name, test):
+    """Run a test of the compiler's components, which raises AssertionError when it fails"""
+    print(f"\n{'=' * 50}")
+    print(f"SYSTEM TEST: {name}")
+    print(f"{'=' * 50}")
+
+    try:
+        test()
+        print("\n✅ PASSED")
+        return True
+    except AssertionError as e:
+        print(f"\n❌ FAILED: {e}")
+        return False
+    except Exception as e:
+        print(f"\n❌ ERROR: {type(e).__name__}: {e}")
+        return False
+
+# System tests: each function raises AssertionError when the component misbehaves
+
+STREAM_PROGRAM = """
+vidhi main() {
+    likho("namaste");
+    wapas 0;
+}
+"""
+
+def generate_c(source_code, stream=None):
+    """Analyze and generate a program at -O0; returns its C, or writes it into a stream"""
+    ast = Parser(Lexer(source_code).tokenize()).parse()
+    analysis_result = SemanticAnalyzer().analyze(ast, print_errors=False)
+    assert analysis_result['success'], analysis_result['errors']
+    generator = CodeGenerator(analysis_result['symbol_table'])
+    if stream is None:
+        return generator.generate(ast)
+    generator.generate_to(ast, stream)
+
+def test_code_writer_text_file():
+    expected = generate_c(STREAM_PROGRAM)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "out.c")
+        with open(path, "w") as f:
+            generate_c(STREAM_PROGRAM, f)
+        with open(path) as f:
+            assert f.read() == expected
+
+def test_code_writer_binary_file():
+    expected = generate_c(STREAM_PROGRAM)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "out.c")
+        with open(path, "wb") as f:
+            generate_c(STREAM_PROGRAM, f)
+        with open(path, "rb") as f:
+            assert f.read() == expected.encode()
+
+def test_code_writer_named_temporary_file():
+    # The wrapper tempfile returns is no io class, only its mode tells text from binary
+    expected = generate_c(STREAM_PROGRAM)
+    with tempfile.NamedTemporaryFile("w+", suffix=".c") as f:
+        generate_c(STREAM_PROGRAM, f)
+        f.seek(0)
+        assert f.read() == expected
+    with tempfile.NamedTemporaryFile("w+b", suffix=".c") as f:
+        generate_c(STREAM_PROGRAM, f)
+        f.seek(0)
+        assert f.read() == expected.encode()
+
+def test_counting_stream():
+    from phases import counting_stream
+    expected = generate_c(STREAM_PROGRAM)
+    for mode in ("w+", "w+b"):
+        with tempfile.NamedTemporaryFile(mode, suffix=".c") as f:
+            counter = counting_stream(f)
+            generate_c(STREAM_PROGRAM, counter)
+            assert counter.bytes == len(expected.encode()), mode
+
+CACHE_PROGRAM = """
+vidhi square(ank n) ank {
+    wapas n * n;
+}
+vidhi main() {
+    likho(square(7));
+    wapas 0;
+}
+"""
+
+@contextlib.contextmanager
+def cache_directory():
+    """Point HPC_CACHE_DIR at a new temporary directory for the duration"""
+    previous = os.environ.get("HPC_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["HPC_CACHE_DIR"] = directory
+        try:
+            yield directory
+        finally:
+            if previous is None:
+                del os.environ["HPC_CACHE_DIR"]
+            else:
+                os.environ["HPC_CACHE_DIR"] = previous
+
+def write_program(directory, source_code, name="program.hp"):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(source_code)
+    return path
+
+def run_program(executable):
+    """Standard output of a compiled program"""
+    return subprocess.run([executable], capture_output=True, text=True, check=True).stdout
+
+def test_build_cache_hit_and_miss():
+    from build_cache import BuildCache
+    from compiler import HinglishCompiler
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        source = write_program(directory, CACHE_PROGRAM)
+        executable = os.path.join(directory, "program")
+        compiler = HinglishCompiler(use_cache=True, runtime=False)
+        assert compiler.compile(source, executable)
+        stats = BuildCache().stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (0, 1, 1), stats
+
+        os.remove(executable)
+        assert compiler.compile(source, executable)
+        stats = BuildCache().stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1), stats
+        assert run_program(executable) == "49\n"
+
+def test_build_cache_key_invalidation():
+    from unittest import mock
+    from build_cache import BuildCache
+    from compiler import HinglishCompiler
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        source = write_program(directory, CACHE_PROGRAM)
+        executable = os.path.join(directory, "program")
+        for gcc_flags in ([], ["-DHPC_TEST"], []):
+            assert HinglishCompiler(use_cache=True, runtime=False, gcc_flags=gcc_flags).compile(source, executable)
+        stats = BuildCache().stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2), stats
+
+        cache = BuildCache()
+        key = cache.key(CACHE_PROGRAM, ["-O0"])
+        assert cache.key(CACHE_PROGRAM, ["-O0"]) == key
+        assert cache.key(CACHE_PROGRAM, ["-O1"]) != key
+        assert cache.key(CACHE_PROGRAM + "\n", ["-O0"]) != key
+        with mock.patch("build_cache.gcc_version", return_value="gcc (HPC test) 99.0.0"):
+            assert cache.key(CACHE_PROGRAM, ["-O0"]) != key
+
+def test_remote_cache_round_trip():
+    import threading
+    from build_cache import BuildCache
+    from cache_server import CacheServer
+    from compiler import HinglishCompiler
+    import urllib.error
+    import urllib.request
+    from remote_cache import DIGEST_HEADER, HTTPRemoteCache
+    with tempfile.TemporaryDirectory() as directory:
+        server = CacheServer(("127.0.0.1", 0), os.path.join(directory, "remote"))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}"
+            remote = HTTPRemoteCache(url)
+            assert remote.get("0" * 64, "program") is None
+            assert remote.available, "a missing artifact must not disable the remote"
+            remote.put("0" * 64, "program", b"artifact")
+            assert remote.get("0" * 64, "program") == b"artifact"
+
+            # A damaged artifact is a miss, and the server refuses uploads that fail their digest
+            stored = os.path.join(directory, "remote", "0" * 64, "program")
+            with open(stored, "rb") as f:
+                damaged = f.read()[:-1] + b"X"
+            with open(stored, "wb") as f:
+                f.write(damaged)
+            assert remote.get("0" * 64, "program") is None
+            assert remote.available, "a corrupt artifact must not disable the remote"
+            request = urllib.request.Request(f"{url}/{'1' * 64}/program", data=b"artifact", method="PUT",
+                                             headers={DIGEST_HEADER: "0" * 64})
+            try:
+                urllib.request.urlopen(request)
+                assert False, "the server stored an upload that fails its digest"
+            except urllib.error.HTTPError as e:
+                assert e.code == 400, e.code
+
+            # Two machines with empty local caches: the first builds and uploads, the second downloads
+            source = write_program(directory, CACHE_PROGRAM)
+            for machine in ("first", "second"):
+                with cache_directory():
+                    executable = os.path.join(directory, machine)
+                    assert HinglishCompiler(use_cache=True, runtime=False, remote_cache=url).compile(source, executable)
+                    stats = BuildCache().stats()
+                    assert run_program(executable) == "49\n"
+            assert (stats["remote_hits"], stats["misses"], stats["entries"]) == (1, 0, 1), stats
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+def test_remote_cache_broken_responses():
+    import io
+    import socket
+    import threading
+    from remote_cache import HTTPRemoteCache
+    # The download gets less body than promised, the upload a reply that is no HTTP
+    replies = [b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\ntruncated", b"garbage\r\n\r\n"]
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        for reply in replies:
+            connection, _ = listener.accept()
+            with connection:
+                connection.recv(65536)
+                connection.sendall(reply)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    output = io.StringIO()
+    try:
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        with contextlib.redirect_stdout(output):
+            remote = HTTPRemoteCache(url)
+            assert remote.get("0" * 64, "program") is None
+            assert not remote.available, "an incomplete response must disable the remote"
+            remote = HTTPRemoteCache(url)
+            remote.put("0" * 64, "program", b"artifact")
+            assert not remote.available, "a malformed response must disable the remote"
+        assert output.getvalue().count("unavailable") == 2, output.getvalue()
+    finally:
+        thread.join(timeout=10)
+        listener.close()
+
+COMPILER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiler.py")
+
+def test_async_compile_and_run():
+    import asyncio
+    from compiler import HinglishCompiler
+    endless = "vidhi main() {\n    jabtak (1 < 2) {\n    }\n    wapas 0;\n}\n"
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        # One slot, so the jobs queue for the semaphore in every event loop
+        compiler = HinglishCompiler(runtime=False, max_concurrent=1)
+
+        async def build_and_run(names):
+            executables = [os.path.join(directory, name) for name in names]
+            built = await asyncio.gather(*(compiler.compile_async(CACHE_PROGRAM, executable, timeout=60)
+                                           for executable in executables))
+            assert all(built), built
+            return await asyncio.gather(*(compiler.run_async(executable, timeout=30)
+                                          for executable in executables))
+
+        # A second asyncio.run gets a new loop, which the compiler's semaphore must not be bound to
+        for names in (["a", "b", "c"], ["d", "e"]):
+            results = asyncio.run(build_and_run(names))
+            assert results == [(0, b"49\n", b"")] * len(names), results
+
+        async def time_out():
+            executable = os.path.join(directory, "endless")
+            assert await compiler.compile_async(endless, executable, timeout=60)
+            try:
+                await compiler.run_async(executable, timeout=0.5)
+            except asyncio.TimeoutError:
+                return True
+            return False
+
+        assert asyncio.run(time_out()), "run_async did not time out"
+
+def test_transpile_service_threads():
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+    from service import TranspileService
+    sources = [test["source"] for test in code_gen_tests]
+    sources += [test["source"] for test in tests if test.get("expect_semantic_errors")]
+    services = [TranspileService(), TranspileService(opt_level=2), TranspileService(opt_level=2, backend="ir"),
+                TranspileService(fused=True)]
+
+    def outcome(service, source):
+        result = service.transpile(source)
+        return result.c_code, result.errors
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        for service in services:
+            expected = [outcome(service, source) for source in sources]
+            jobs = sources * 4
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda source: outcome(service, source), jobs))
+            assert results == expected * 4, f"threaded results differ (opt_level={service.opt_level}, " \
+                                            f"backend={service.backend}, fused={service.fused})"
+    assert output.getvalue() == "", f"the service printed: {output.getvalue()!r}"
+
+def test_distributed_build():
+    import socket
+    import threading
+    from build_profiles import PROFILES
+    from distributed import Coordinator, CompileWorker, Job
+    programs = [f"vidhi main() {{\n    likho({n});\n    wapas 0;\n}}\n" for n in range(1, 6)]
+    programs[3] = "vidhi main() {\n    ank x = \"text\";\n    wapas 0;\n}\n"  # Fails analysis
+    jobs = [Job(index, f"p{index}.hp", source, PROFILES["debug"].gcc_flags()) for index, source in enumerate(programs)]
+    options = dict(opt_level=0, lookup_tables=False, inline_max_size=16, inline_max_depth=3, backend="ast", fused=False)
+    messages = []
+
+    class DyingWorker(CompileWorker):
+        """Drops its connection in the middle of its first job, as a killed worker would"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.connections = threading.local()
+            self.died = threading.Event()
+
+        def connect(self):
+            self.connections.current = super().connect()
+            return self.connections.current
+
+        def build(self, job, payload):
+            self.died.set()
+            self.connections.current.shutdown(socket.SHUT_RDWR)
+            return super().build(job, payload)
+
+    coordinator = Coordinator(("127.0.0.1", 0), options, idle_timeout=30, token="secret", log=messages.append)
+    reported = []
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("success", coordinator.run(jobs, False, reported.append)))
+    thread.start()
+    assert coordinator.listening.wait(10), "the coordinator did not start listening"
+    address = ("127.0.0.1", coordinator.port)
+
+    # The dying worker takes the first job; the others only connect once it is gone
+    dying = DyingWorker(address, 1, "dying", connect_timeout=10, token="secret", log=messages.append)
+    workers = [dying] + [CompileWorker(address, 1, f"worker{n}", connect_timeout=10, token="secret",
+                                       log=messages.append) for n in range(2)]
+    threads = [threading.Thread(target=dying.run)]
+    threads[0].start()
+    assert dying.died.wait(30), "the dying worker got no job"
+    threads += [threading.Thread(target=worker.run) for worker in workers[1:]]
+    for worker_thread in threads[1:]:
+        worker_thread.start()
+    thread.join(120)
+    assert not thread.is_alive(), "the coordinator did not finish"
+    for worker_thread in threads:
+        worker_thread.join(30)
+
+    assert result["success"] is False, "a build with an invalid program must fail"
+    assert [job.index for job in reported] == list(range(len(jobs))), "results not reported in input order"
+    assert [job.attempts for job in jobs] == [2, 1, 1, 1, 1], [job.attempts for job in jobs]
+    assert jobs[0].worker in ("worker0/0", "worker1/0"), jobs[0].worker
+    assert any("retrying" in message for message in messages), messages
+    assert not jobs[3].success and "Semantic Error" in jobs[3].output, jobs[3].output
+
+    with tempfile.TemporaryDirectory() as directory:
+        for job in jobs:
+            if job.index == 3:
+                continue
+            assert job.success, job.output
+            executable = os.path.join(directory, f"p{job.index}")
+            with open(executable, "wb") as f:
+                f.write(job.executable)
+            os.chmod(executable, 0o755)
+            assert run_program(executable) == f"{job.index + 1}\n"
+
+def test_distributed_rejects_bad_tokens_and_flags():
+    import threading
+    from distributed import Coordinator, CompileWorker, Job, allowed_gcc_flag
+    assert all(allowed_gcc_flag(flag) for flag in ["-O2", "-march=native", "-flto", "-Wl,--gc-sections", "-DN=1"])
+    assert not any(allowed_gcc_flag(flag) for flag in ["-wrapper", "-B/tmp", "-specs=x", "-fplugin=x",
+                                                       "-Wl,-rpath,x", "@flags", "-o"])
+
+    options = dict(opt_level=0, lookup_tables=False, inline_max_size=16, inline_max_depth=3, backend="ast", fused=False)
+    jobs = [Job(0, "p0.hp", CACHE_PROGRAM, ["-O0", "-wrapper", "/bin/true"])]
+    coordinator = Coordinator(("127.0.0.1", 0), options, idle_timeout=30, token="secret", log=lambda message: None)
+    thread = threading.Thread(target=coordinator.run, args=(jobs,))
+    thread.start()
+    assert coordinator.listening.wait(10), "the coordinator did not start listening"
+    address = ("127.0.0.1", coordinator.port)
+    intruder = CompileWorker(address, 1, "intruder", connect_timeout=10, token="guess", log=lambda message: None)
+    assert intruder.run() is False and intruder.built == 0, "a worker with the wrong token was accepted"
+    assert CompileWorker(address, 1, "worker", connect_timeout=10, token="secret", log=lambda message: None).run()
+    thread.join(60)
+    assert jobs[0].done and not jobs[0].success, "a job with -wrapper was built"
+    assert "refuses gcc flags: -wrapper /bin/true" in jobs[0].output, jobs[0].output
+
+def test_distributed_rejects_malformed_messages():
+    import json
+    import socket
+    import struct
+    import threading
+    from distributed import (MAX_HEADER_SIZE, MAX_PAYLOAD_SIZE, Coordinator, CompileWorker, Job,
+                             receive_message, send_message)
+    options = dict(opt_level=0, lookup_tables=False, inline_max_size=16, inline_max_depth=3, backend="ast", fused=False)
+    jobs = [Job(0, "p0.hp", CACHE_PROGRAM, [])]
+    coordinator = Coordinator(("127.0.0.1", 0), options, idle_timeout=30, log=lambda message: None)
+    thread = threading.Thread(target=coordinator.run, args=(jobs,))
+    thread.start()
+    assert coordinator.listening.wait(10), "the coordinator did not start listening"
+    address = ("127.0.0.1", coordinator.port)
+
+    def reply_to(message):
+        """The coordinator's answer to raw bytes from a new peer; None if it hangs up"""
+        with socket.create_connection(address, timeout=10) as peer:
+            peer.sendall(message)
+            return receive_message(peer.makefile('rb'))[0]
+
+    # Oversized messages are refused from their header alone, without waiting for the rest
+    assert reply_to(struct.pack("!I", MAX_HEADER_SIZE + 1)) is None
+    header = json.dumps({'type': 'register', 'name': "big", 'size': MAX_PAYLOAD_SIZE + 1}).encode()
+    assert reply_to(struct.pack("!I", len(header)) + header) is None
+    header = json.dumps({'type': 'register', 'name': "odd", 'size': "0"}).encode()
+    assert reply_to(struct.pack("!I", len(header)) + header) is None
+    with socket.create_connection(address, timeout=10) as peer:
+        send_message(peer, {'type': 'register'})
+        header, _ = receive_message(peer.makefile('rb'))
+        assert header == {'type': 'rejected', 'reason': "malformed registration", 'size': 0}, header
+
+    # The coordinator still serves well-formed workers afterwards
+    assert CompileWorker(address, 1, "worker", connect_timeout=10, log=lambda message: None).run()
+    thread.join(60)
+    assert jobs[0].done and jobs[0].success, jobs[0].output
+
+SEPARATE_PROGRAM = """
+ank base = 10;
+vidhi dugna(ank n) ank {
+    wapas n * 2;
+}
+vidhi tigna(ank n) ank {
+    wapas n * 3;
+}
+vidhi jod(ank n) ank {
+    wapas n + base;
+}
+vidhi main() {
+    likho(dugna(1));
+    likho(tigna(2));
+    likho(jod(3));
+    wapas 0;
+}
+"""
+
+def separate_build(builder, source_code, executable, unit_size=1):
+    """Generate a program's units and build them; returns (success, unit names)"""
+    from separate import HEADER_NAME
+    ast = Parser(Lexer(source_code).tokenize()).parse()
+    analysis_result = SemanticAnalyzer().analyze(ast, print_errors=False)
+    assert analysis_result['success'], analysis_result['errors']
+    header, units = CodeGenerator(analysis_result['symbol_table']).generate_units(ast, HEADER_NAME,
+                                                                                  unit_size=unit_size)
+    return builder.build(header, units, executable), [name for name, _ in units]
+
+def separate_builder(directory):
+    from build_profiles import PROFILES
+    from separate import ObjectCache, SeparateBuilder
+    cache = ObjectCache(os.path.join(directory, "objects"))
+    return SeparateBuilder(PROFILES["debug"].gcc_flags(), jobs=2, cache=cache, log=lambda message: None)
+
+def test_separate_recompiles_changed_unit():
+    with tempfile.TemporaryDirectory() as directory:
+        builder = separate_builder(directory)
+        executable = os.path.join(directory, "program")
+        success, names = separate_build(builder, SEPARATE_PROGRAM, executable)
+        assert success and sorted(builder.compiled) == sorted(names), builder.compiled
+        assert run_program(executable) == "2\n6\n13\n"
+
+        edited = SEPARATE_PROGRAM.replace("wapas n * 3;", "wapas n * 30;")
+        assert separate_build(builder, edited, executable)[0]
+        assert builder.compiled == ["tigna"], builder.compiled
+        assert run_program(executable) == "2\n60\n13\n"
+
+        # A new global changes the header every unit includes
+        changed_header = edited.replace("ank base = 10;", "ank base = 10;\nank unused = 0;")
+        success, names = separate_build(builder, changed_header, executable)
+        assert success and sorted(builder.compiled) == sorted(names) and not builder.reused, builder.compiled
+        assert run_program(executable) == "2\n60\n13\n"
+
+def test_separate_unit_with_gcc_error():
+    import io
+    from separate import HEADER_NAME
+    ast = Parser(Lexer(SEPARATE_PROGRAM).tokenize()).parse()
+    analysis_result = SemanticAnalyzer().analyze(ast, print_errors=False)
+    header, units = CodeGenerator(analysis_result['symbol_table']).generate_units(ast, HEADER_NAME)
+    units = [(name, code + "this is not C;\n" if name == "tigna" else code) for name, code in units]
+    with tempfile.TemporaryDirectory() as directory:
+        builder = separate_builder(directory)
+        executable = os.path.join(directory, "program")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assert not builder.build(header, units, executable), "a unit with a gcc error built"
+        assert "GCC compilation failed" in output.getvalue(), output.getvalue()
+        assert not os.path.exists(executable)
+        leftovers = [name for _, _, files in os.walk(builder.cache.root) for name in files
+                     if name.endswith(".o.tmp")]
+        assert not leftovers, leftovers
+
+def test_separate_unit_size():
+    with tempfile.TemporaryDirectory() as directory:
+        outputs = []
+        for unit_size in (1, 2, 10):
+            executable = os.path.join(directory, f"program{unit_size}")
+            success, names = separate_build(separate_builder(directory), SEPARATE_PROGRAM, executable, unit_size)
+            assert success, unit_size
+            # The globals unit, then one per unit_size functions
+            assert len(names) == 1 + -(-4 // unit_size), names
+            outputs.append(run_program(executable))
+        assert outputs == ["2\n6\n13\n"] * 3, outputs
+
+def build_and_run(c_code, gcc_args=()):
+    """Compile C code with gcc and return the program's standard output"""
+    with tempfile.TemporaryDirectory() as directory:
+        executable = os.path.join(directory, "program")
+        result = subprocess.run(['gcc', '-x', 'c', '-'] + list(gcc_args) + ['-o', executable],
+                                input=c_code, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return run_program(executable)
+
+def test_runtime_matches_standalone():
+    from compiler import HinglishCompiler
+    gcc_args = runtime_gcc_args()
+    for test in code_gen_tests:
+        backend = test.get("backend", "ast")
+        compiler = HinglishCompiler(opt_level=test.get("opt_level", 0), backend="ir" if backend == "ir" else "ast",
+                                    fused=backend == "fused")
+        standalone = build_and_run(compiler.transpile(test["source"]))
+        linked = build_and_run(compiler.transpile(test["source"], runtime=True), gcc_args)
+        assert linked == standalone, f"{test['name']}: {linked!r} != {standalone!r}"
+
+TABLE_PROGRAM = """
+vidhi fibonacci(ank n) ank {
+    agar (n <= 1) {
+        wapas n;
+    }
+    wapas fibonacci(n - 1) + fibonacci(n - 2);
+}
+vidhi main() {
+    karo (ank i = 18; i < 21; i = i + 1) {
+        likho(fibonacci(i));
+    }
+    wapas 0;
+}
+"""
+
+def test_constant_calls_folded_and_tabled():
+    from compiler import HinglishCompiler
+    from optimizer import Optimizer
+    source = next(test["source"] for test in code_gen_tests if test["name"] == "Compile-Time Function Evaluation")
+    optimizer = Optimizer(1)
+    optimizer.optimize(Parser(Lexer(source).tokenize()).parse())
+    assert optimizer.reports['const_eval'] == [("fibonacci", [25], 75025)], optimizer.reports['const_eval']
+
+    for backend in ("ast", "ir"):
+        c_code = HinglishCompiler(opt_level=1, backend=backend).transpile(source)
+        assert "fibonacci(25)" not in c_code and "75025" in c_code, f"{backend}: call not folded"
+        assert build_and_run(c_code) == "75025\n"
+
+        # A call with a run-time argument cannot fold, so its function gets a table
+        c_code = HinglishCompiler(opt_level=1, backend=backend, lookup_tables=True).transpile(TABLE_PROGRAM)
+        assert "hp_table_fibonacci[" in c_code, f"{backend}: no lookup table"
+        assert build_and_run(c_code) == "2584\n4181\n6765\n"
+
+def whole_program_c(source_code):
+    """C and semantic errors of the whole-program pipeline at -O0"""
+    ast = Parser(Lexer(source_code).tokenize()).parse()
+    analysis_result = SemanticAnalyzer().analyze(ast, print_errors=False)
+    return CodeGenerator(analysis_result['symbol_table']).generate(ast), analysis_result['errors']
+
+def streamed_c(source_code):
+    """C and semantic errors of the streaming transpiler"""
+    import io
+    from streaming import StreamingTranspiler
+    output = io.StringIO()
+    analysis_result = StreamingTranspiler(log=lambda message: None).transpile_to(source_code, output,
+                                                                               print_errors=False)
+    return output.getvalue(), analysis_result['errors']
+
+def test_streaming_matches_whole_program():
+    sources = [test["source"] for test in tests + code_gen_tests]
+    example = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example.hp")
+    with open(example) as f:
+        sources.append(f.read())
+    compared = 0
+    for source in sources:
+        try:
+            expected = whole_program_c(source)
+        except Exception:
+            continue  # Syntax error tests; see test_streaming_parse_error_in_last_function
+        assert streamed_c(source) == expected, f"streaming output differs for:\n{source}"
+        compared += 1
+    assert compared >= len(code_gen_tests), compared
+
+def test_fused_matches_two_pass():
+    # Both share SemanticAnalyzer's checks, so the C and the errors must agree
+    from service import TranspileService
+    sources = [test["source"] for test in tests + code_gen_tests]
+    two_pass, fused = TranspileService(), TranspileService(fused=True)
+    for source in sources:
+        expected, result = two_pass.transpile(source), fused.transpile(source)
+        assert (result.c_code, result.errors) == (expected.c_code, expected.errors), \
+            f"fused output differs for:\n{source}"
+
+def test_streaming_signatures_in_comments_and_strings():
+    from streaming import scan_signatures
+    source = """
+    # vidhi commented(ank x) ank {
+    vakya note = "vidhi quoted() { not a function";
+    akshar brace = '{';
+    vidhi real(ank n) ank {
+        vakya inner = "} vidhi inner() {";
+        # }
+        wapas n + 1;
+    }
+    vidhi main() {
+        likho(note);
+        likho(brace);
+        likho(real(41));
+        wapas 0;
+    }
+    """
+    assert [signature.name for signature in scan_signatures(source)] == ["real", "main"]
+    c_code, errors = streamed_c(source)
+    assert not errors, errors
+    assert (c_code, errors) == whole_program_c(source)
+    assert build_and_run(c_code) == "vidhi quoted() { not a function\n{\n42\n"
+
+def test_streaming_parse_error_in_last_function():
+    source = """
+    vidhi first() ank {
+        wapas 1;
+    }
+    vidhi broken() ank {
+        wapas (1 + ;
+    }
+    """
+    def error(transpile):
+        try:
+            transpile(source)
+        except Exception as e:
+            return str(e)
+        return None
+
+    expected = error(whole_program_c)
+    assert expected, "the whole-program parser accepted a syntax error"
+    assert error(streamed_c) == expected, f"{error(streamed_c)} != {expected}"
+
+def hpc(*args, **kwargs):
+    """Run the compiler's command line"""
+    return subprocess.run([sys.executable, COMPILER_PATH] + list(args), capture_output=True, text=True,
+                          timeout=120, **kwargs)
+
+def test_batch_build():
+    import re
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, "sub"))
+        programs = {"a.hp": "1", "sub/b.hp": "2", "sub/c.hp": "3", "d.hp": "4"}
+        for name, value in programs.items():
+            write_program(directory, f"vidhi main() {{\n    likho({value});\n    wapas 0;\n}}\n", name)
+
+        # Output is per file in input order however the builds finish; only the timings vary
+        outputs = []
+        for _ in range(2):
+            result = hpc(directory, "-j", "2")
+            assert result.returncode == 0, result.stdout + result.stderr
+            outputs.append(re.sub(r" *\d+\.\d ms", " ms", result.stdout))
+        assert outputs[0] == outputs[1], outputs
+        built = [line.split()[0] for line in outputs[0].splitlines() if line.startswith("  ")]
+        assert built == [os.path.join(directory, name) for name in ("a.hp", "d.hp", "sub/b.hp", "sub/c.hp")], built
+        for name, value in programs.items():
+            assert run_program(os.path.join(directory, name[:-3])) == value + "\n", name
+
+        # One broken file fails the batch, but not the builds of the others
+        broken = write_program(directory, "vidhi main() {\n    likho(;\n}\n", "broken.hp")
+        for name in programs:
+            os.remove(os.path.join(directory, name[:-3]))
+        result = hpc(directory, "-j", "2")
+        assert result.returncode != 0, result.stdout
+        assert f"{broken}:" in result.stdout and "Built 4/5 programs" in result.stdout, result.stdout
+        assert all(os.path.exists(os.path.join(directory, name[:-3])) for name in programs)
+
+def test_build_profile_flags():
+    from compiler import HinglishCompiler
+    sections = ["-ffunction-sections", "-fdata-sections", "-Wl,--gc-sections"]
+    expected = {
+        "debug": ["-O0", "-g"],
+        "release": ["-O2"] + sections + ["-s"],
+        "fast": ["-O3", "-march=native"] + sections + ["-s"],
+        "size": ["-Os"] + sections + ["-s"],
+        "lto": ["-O2", "-flto"] + sections + ["-static", "-s"],
+    }
+    assert HinglishCompiler().build_flags() == expected["debug"]
+    for name, flags in expected.items():
+        assert HinglishCompiler(profile=name).build_flags() == flags, name
+
+    # --static and --no-static override the profile; extra flags come last, so they win
+    assert HinglishCompiler(profile="debug", static=True).build_flags() == ["-O0", "-g", "-static"]
+    assert HinglishCompiler(profile="release", static=True, gcc_flags=["-O3", "-DN=1"]).build_flags() == \
+        ["-O2"] + sections + ["-static", "-s", "-O3", "-DN=1"]
+    assert HinglishCompiler(profile="lto", static=False).build_flags() == ["-O2", "-flto"] + sections + ["-s"]
+
+    # The command line splits each --gcc-flags value like a shell
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        source = write_program(directory, CACHE_PROGRAM)
+        for args, flags in [((), expected["debug"]),
+                            (("-p", "lto", "--no-static", "--gcc-flags=-DN=1 -fno-plt", "--gcc-flags=-DM=2"),
+                             ["-O2", "-flto"] + sections + ["-s", "-DN=1", "-fno-plt", "-DM=2"])]:
+            result = hpc(source, "-v", "--no-daemon", *args)
+            assert result.returncode == 0, result.stdout + result.stderr
+            assert f"Running command: gcc -x c - {' '.join(flags)} -I " in result.stdout, result.stdout
+
+def test_pgo_reuses_profile():
+    import glob
+    import io
+    from unittest import mock
+    from build_cache import cache_root
+    from compiler import HinglishCompiler
+    from pgo import PGOBuilder
+    trained = []
+    train = PGOBuilder.train
+
+    def counting_train(builder, instrumented):
+        trained.append(instrumented)
+        train(builder, instrumented)
+
+    with cache_directory(), tempfile.TemporaryDirectory() as directory, \
+            mock.patch.object(PGOBuilder, "train", counting_train):
+        source = write_program(directory, CACHE_PROGRAM)
+        logs = []
+        for build in ("first", "second"):
+            executable = os.path.join(directory, build)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                assert HinglishCompiler(verbose=True, profile="release", pgo=True).compile(source, executable)
+            logs.append(output.getvalue())
+            assert run_program(executable) == "49\n"
+            assert len(trained) == 1, f"{build} build trained {len(trained)} times in all"
+        assert len(glob.glob(os.path.join(cache_root(), "pgo", "*", "*.gcda"))) == 1
+        assert "PGO stage 2: training" in logs[0] and "PGO: reusing cached profile" not in logs[0]
+        assert "PGO stage 2: training" not in logs[1] and "PGO: reusing cached profile" in logs[1]
+
+def test_tune_configurations():
+    import json
+    from compiler import HinglishCompiler, choose_profile
+    from tune import TUNING_FILE, Tuner
+    with tempfile.TemporaryDirectory() as directory:
+        source = write_program(directory, CACHE_PROGRAM)
+        timed = []
+        tuner = Tuner(repeat=1, configurations=[["-O1"], ["-O2", "-fno-plt"]], log=timed.append)
+        best = tuner.tune(HinglishCompiler().transpile(CACHE_PROGRAM))
+        assert len(timed) == 2 and best[0] in (["-O1"], ["-O2", "-fno-plt"]), timed
+
+        result = hpc("tune", source, "--repeat", "1", "--config=-O1", "--config=-O2 -fno-plt")
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert result.stdout.count(" ms  ") == 2, result.stdout
+        with open(os.path.join(directory, TUNING_FILE)) as f:
+            flags = json.load(f)["programs"]["program.hp"]["flags"]
+        assert flags in (["-O1"], ["-O2", "-fno-plt"]), flags
+
+        # Builds without a profile pick the tuned flags up; an explicit one wins
+        profile = choose_profile(None, source)
+        assert profile.name == "tuned" and profile.opt_flags == flags, profile
+        assert HinglishCompiler(profile=profile).build_flags()[:len(flags)] == flags
+        assert choose_profile("size", source) == "size"
+
+def test_gcc_pipe():
+    import io
+    from compiler import HinglishCompiler
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        # Far more diagnostics than a pipe buffer holds: gcc must not stall writing them
+        unused = "".join(f"    ank v{i} = {i};\n" for i in range(3000))
+        source = write_program(directory, f"vidhi main() {{\n{unused}    wapas 0;\n}}\n", "unused.hp")
+        executable = os.path.join(directory, "unused")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            compiler = HinglishCompiler(use_cache=False, gcc_flags=["-Werror=unused-variable"])
+            assert not compiler.compile(source, executable)
+        assert output.getvalue().startswith("GCC compilation failed"), output.getvalue()[:200]
+        assert "v0" in output.getvalue() and "v2999" in output.getvalue()
+        assert not os.path.exists(executable)
+
+        # --keep-c copies exactly the C gcc was given
+        source = write_program(directory, CACHE_PROGRAM)
+        executable = os.path.join(directory, "program")
+        compiler = HinglishCompiler(use_cache=False)
+        assert compiler.compile(source, executable, keep_c=True)
+        with open(os.path.join(directory, "program.c")) as f:
+            assert f.read() == compiler.transpile(CACHE_PROGRAM, runtime=True)
+        assert run_program(executable) == "49\n"
+
+        # From stdin: standalone C to stdout, or an executable with -o
+        result = hpc("-", "--no-daemon", input=CACHE_PROGRAM)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout == compiler.transpile(CACHE_PROGRAM)
+        executable = os.path.join(directory, "piped")
+        result = hpc("-", "-o", executable, input=CACHE_PROGRAM)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert run_program(executable) == "49\n"
+
+def test_daemon_start_compile_stop():
+    import time
+    from daemon import DaemonClient
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "daemon.sock")
+        daemon = subprocess.Popen([sys.executable, COMPILER_PATH, "--daemon", "--socket", socket_path, "-j", "2"],
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            client = DaemonClient(socket_path)
+            deadline = time.monotonic() + 60
+            while not client.running():
+                assert daemon.poll() is None, f"daemon exited: {daemon.stdout.read()}"
+                assert time.monotonic() < deadline, "daemon did not start listening"
+                time.sleep(0.1)
+
+            source = write_program(directory, CACHE_PROGRAM)
+            executable = os.path.join(directory, "program")
+            result = hpc(source, "-o", executable, "--socket", socket_path, "-v")
+            assert result.returncode == 0, result.stdout + result.stderr
+            assert "Daemon request:" in result.stdout, "the build did not go through the daemon"
+            assert run_program(executable) == "49\n"
+
+            result = hpc("-", "--socket", socket_path, input=CACHE_PROGRAM)
+            assert result.returncode == 0, result.stderr
+            assert result.stdout == generate_c(CACHE_PROGRAM)
+
+            result = hpc("--stop-daemon", "--socket", socket_path)
+            assert result.returncode == 0, result.stdout
+            daemon.wait(timeout=30)
+            assert daemon.returncode == 0
+            assert not os.path.exists(socket_path), "the daemon left its socket behind"
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+                daemon.wait()
+            daemon.stdout.close()
+
+def test_phases_json_and_trace():
+    import json
+    from phases import count_nodes
+    with cache_directory(), tempfile.TemporaryDirectory() as directory:
+        source = write_program(directory, CACHE_PROGRAM)
+        phases_json = os.path.join(directory, "phases.json")
+        trace = os.path.join(directory, "trace.json")
+        result = hpc(source, "-o", os.path.join(directory, "program"), "--no-cache", "--run",
+                     "--phases-json", phases_json, "--trace", trace)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert "Wall ms" in result.stderr, "the phase report goes to stderr"
+
+        with open(phases_json) as f:
+            report = json.load(f)
+        assert report["memory_traced"] is True
+        phases = {phase["name"]: phase for phase in report["phases"]}
+        for name in ("read", "lex", "parse", "analyze", "generate", "gcc", "run"):
+            assert name in phases, f"no '{name}' phase in {sorted(phases)}"
+        for phase in phases.values():
+            assert phase["wall"] >= 0 and phase["cpu"] >= 0, phase
+            assert (phase["peak_memory"] is None) == (phase["category"] == "process"), phase
+        assert phases["gcc"]["category"] == phases["run"]["category"] == "process"
+        assert phases["read"]["counters"]["bytes"] == len(CACHE_PROGRAM.encode())
+        tokens = Lexer(CACHE_PROGRAM).tokenize()
+        assert phases["lex"]["counters"]["tokens"] == len(tokens)
+        assert phases["parse"]["counters"]["nodes"] == count_nodes(Parser(tokens).parse())
+        assert phases["generate"]["counters"]["bytes"] > 0
+
+        with open(trace) as f:
+            events = json.load(f)["traceEvents"]
+        spans = [event for event in events if event["ph"] == "X"]
+        assert {event["name"] for event in events if event["ph"] == "M"} == {"thread_name"}
+        assert len(spans) == len(report["phases"]), spans
+        for event in spans:
+            for field in ("name", "cat", "ts", "dur", "pid", "tid", "args"):
+                assert field in event, (field, event)
+            assert event["dur"] >= 0, event
+        processes = {event["name"]: event for event in spans if event["cat"] == "process"}
+        assert set(processes) == {"gcc", "run"}, processes
+        assert len({event["tid"] for event in processes.values()}) == 1
+        assert all(event["tid"] != processes["gcc"]["tid"] for event in spans if event["cat"] == "phase")
+
+def test_disabled_phase_timer():
+    import tracemalloc
+    from phases import PhaseTimer
+    tracemalloc.stop()
+    timer = PhaseTimer(enabled=False)
+    with timer.phase("lex") as phase:
+        assert phase is None
+    with timer.process("gcc") as process:
+        assert process is None
+    assert not tracemalloc.is_tracing(), "a disabled timer started tracemalloc"
+    assert timer.phases == [] and timer.to_dict() == {'phases': [], 'memory_traced': False}
+    try:
+        timer = PhaseTimer(trace_memory=False)
+        with timer.phase("lex") as phase:
+            assert phase is not None
+        assert not tracemalloc.is_tracing(), "trace_memory=False started tracemalloc"
+        assert timer.phases[0].peak_memory is None
+    finally:
+        tracemalloc.stop()
+
+def test_visitor_profiler():
+    from collections import Counter
+    from optimizer import walk
+    from visitor_profile import VisitorProfiler
+    example = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example.hp")
+    with open(example) as f:
+        ast = Parser(Lexer(f.read()).tokenize()).parse()
+    nodes = Counter(type(node).__name__ for node in walk(ast))
+
+    def visits(visitor):
+        """Count the calls of a visitor's own visit, by node type"""
+        counts = Counter()
+        visit = visitor.visit
+
+        def counting_visit(node):
+            counts[type(node).__name__] += 1
+            return visit(node)
+        visitor.visit = counting_visit
+        return counts
+
+    profiler = VisitorProfiler()
+    analyzer = SemanticAnalyzer()
+    analyzer_visits = visits(analyzer)
+    profiler.attach(analyzer)
+    analysis_result = analyzer.analyze(ast, print_errors=False)
+    analyzer_counts = {name: stats.calls for name, stats in profiler.node_types.items()}
+    assert analyzer_counts == analyzer_visits, (analyzer_counts, analyzer_visits)
+
+    generator = CodeGenerator(analysis_result['symbol_table'])
+    generator_visits = visits(generator)
+    profiler.attach(generator)
+    generator.generate(ast)
+    both = Counter(analyzer_visits) + generator_visits
+    assert {name: stats.calls for name, stats in profiler.node_types.items()} == both
+
+    # Both visit every node of these types once; parameters, callees and for
+    # loop initializers are handled by their parent instead
+    for name, count in nodes.items():
+        if name not in ("Parameter", "Variable", "VarDeclaration"):
+            assert analyzer_visits[name] == generator_visits[name] == count, (name, count)
+    assert generator_visits["Variable"] == nodes["Variable"]
+
+    assert sum(stats.calls for stats in profiler.methods.values()) == sum(both.values())
+    assert profiler.methods["SemanticAnalyzer.visit_Binary"].calls == nodes["Binary"]
+    assert profiler.methods["CodeGenerator.visit_Binary"].calls == nodes["Binary"]
+    for stats in list(profiler.methods.values()) + list(profiler.node_types.values()):
+        assert stats.active == 0 and -1e-9 <= stats.self_time <= stats.cumulative + 1e-9
+    assert profiler.report()[0].startswith("Node type")
+
+    # Detaching removes the instance attribute, so the counting wrapper's
+    # instance visit goes too and the class's visit is back
+    calls = sum(stats.calls for stats in profiler.node_types.values())
+    profiler.detach(generator)
+    assert "visit" not in vars(generator)
+    assert generator.visit.__func__ is CodeGenerator.visit
+    generator.generate(ast)
+    assert sum(stats.calls for stats in profiler.node_types.values()) == calls
+
+system_tests = [
+    {"name": "Code Writer Text File", "test": test_code_writer_text_file},
+    {"name": "Code Writer Binary File", "test": test_code_writer_binary_file},
+    {"name": "Code Writer Named Temporary File", "test": test_code_writer_named_temporary_file},
+    {"name": "Counting Stream", "test": test_counting_stream},
+    {"name": "Build Cache Hit and Miss", "test": test_build_cache_hit_and_miss},
+    {"name": "Build Cache Key Invalidation", "test": test_build_cache_key_invalidation},
+    {"name": "Remote Cache Round Trip", "test": test_remote_cache_round_trip},
+    {"name": "Remote Cache Broken Responses", "test": test_remote_cache_broken_responses},
+    {"name": "Build Profile Flags", "test": test_build_profile_flags},
+    {"name": "PGO Reuses Cached Profile", "test": test_pgo_reuses_profile},
+    {"name": "Tune Over Given Configurations", "test": test_tune_configurations},
+    {"name": "GCC Pipe, Kept C and Standard Input", "test": test_gcc_pipe},
+    {"name": "Batch Build", "test": test_batch_build},
+    {"name": "Daemon Start, Compile and Stop", "test": test_daemon_start_compile_stop},
+    {"name": "Async Compile and Run", "test": test_async_compile_and_run},
+    {"name": "Transpile Service Threads", "test": test_transpile_service_threads},
+    {"name": "Distributed Build", "test": test_distributed_build},
+    {"name": "Distributed Tokens and Flags", "test": test_distributed_rejects_bad_tokens_and_flags},
+    {"name": "Distributed Malformed Messages", "test": test_distributed_rejects_malformed_messages},
+    {"name": "Separate Build Recompiles Changed Units", "test": test_separate_recompiles_changed_unit},
+    {"name": "Separate Build Unit with GCC Error", "test": test_separate_unit_with_gcc_error},
+    {"name": "Separate Build Unit Size", "test": test_separate_unit_size},
+    {"name": "Runtime Matches Standalone Output", "test": test_runtime_matches_standalone},
+    {"name": "Constant Calls Folded and Tabled", "test": test_constant_calls_folded_and_tabled},
+    {"name": "Streaming Matches Whole Program", "test": test_streaming_matches_whole_program},
+    {"name": "Fused Matches Two-Pass", "test": test_fused_matches_two_pass},
+    {"name": "Streaming Signatures in Comments and Strings", "test": test_streaming_signatures_in_comments_and_strings},
+    {"name": "Streaming Parse Error in Last Function", "test": test_streaming_parse_error_in_last_function},
+    {"name": "Phases JSON and Trace", "test": test_phases_json_and_trace},
+    {"name": "Disabled Phase Timer", "test": test_disabled_phase_timer},
+    {"name": "Visitor Profiler", "test": test_visitor_profiler},
+]
+
 def run_all_tests():
     """Run all test cases and report results"""
     passed = 0
@@ -599,17 +1875,32 @@ def run_all_tests():
         if run_generator_test(
             test["name"], 
             test["source"], 
-            test.get("expected_output")
+            test.get("expected_output"),
+            test.get("opt_level", 0),
+            test.get("backend", "ast"),
+            test.get("runtime", False)
         ):
             gen_passed += 1
     
     print(f"\n{'=' * 50}")
     print(f"CODE GENERATION SUMMARY: {gen_passed}/{gen_total} tests passed")
     print(f"{'=' * 50}")
+
+    # Run system tests
+    print(f"\n{'=' * 50}")
+    print(f"RUNNING SYSTEM TESTS")
+    print(f"{'=' * 50}")
+
+    sys_passed = sum(1 for test in system_tests if run_system_test(test["name"], test["test"]))
+    sys_total = len(system_tests)
+
+    print(f"\n{'=' * 50}")
+    print(f"SYSTEM TESTS SUMMARY: {sys_passed}/{sys_total} tests passed")
+    print(f"{'=' * 50}")
     
     # Overall summary
     print(f"\n{'=' * 50}")
-    print(f"OVERALL SUMMARY: {passed + gen_passed}/{total + gen_total} tests passed")
+    print(f"OVERALL SUMMARY: {passed + gen_passed + sys_passed}/{total + gen_total + sys_total} tests passed")
     print(f"{'=' * 50}")
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from build_profiles import BuildProfile
+
+TUNING_FILE = "hpc-tune.json"
+
+# Each dimension of the search space; the first choice of each is the baseline
+OPT_LEVELS = [["-O2"], ["-O1"], ["-O3"], ["-Os"]]
+TOGGLES = [["-march=native"], ["-funroll-loops"], ["-fno-plt"], ["-flto"]]
+
+
+def search_space():
+    """Every flag combination the tuner tries, baseline first"""
+    for opt_flags in OPT_LEVELS:
+        for enabled in itertools.product([False, True], repeat=len(TOGGLES)):
+            flags = list(opt_flags)
+            for toggle, on in zip(TOGGLES, enabled):
+                if on:
+                    flags += toggle
+            yield flags
+
+
+def tuned_profile(flags):
+    """Build profile for tuned flags, linked like the release profile"""
+    return BuildProfile("tuned", flags, gc_sections=True, strip=True,
+                        description=f"Tuned flags {' '.join(flags)}")
+
+
+def tuning_file_for(input_file):
+    """The project's tuning file sits next to the program"""
+    return os.path.join(os.path.dirname(os.path.abspath(input_file)), TUNING_FILE)
+
+
+def load_tuned_profile(input_file):
+    """Return the tuned profile recorded for a program, or None"""
+    path = tuning_file_for(input_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            programs = json.load(f).get("programs", {})
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable tuning file '{path}': {e}")
+        return None
+    entry = programs.get(os.path.basename(input_file))
+    return tuned_profile(entry["flags"]) if entry else None
+
+
+def save_tuning(input_file, flags, seconds):
+    """Record the fastest flags for a program in its project's tuning file"""
+    path = tuning_file_for(input_file)
+    data = {"programs": {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data.setdefault("programs", {})[os.path.basename(input_file)] = {
+        "flags": flags,
+        "seconds": round(seconds, 6),
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+class Tuner:
+    """Finds the fastest gcc flags for one program by building and timing it.
+
+    Every configuration, by default each combination in search_space(), is
+    compiled from the same C code and run `repeat` times; its time is the fastest of those runs, which is
+    the least disturbed by other load on the machine.  Combinations that do
+    not compile, fail or exceed the timeout are dropped.
+    """
+
+    def __init__(self, repeat=3, timeout=10, run_input=None, run_args=(), configurations=None, log=print):
+        self.repeat = repeat        # Timed runs per combination
+        self.timeout = timeout      # Seconds allowed per run
+        self.run_input = run_input  # File fed to each run on stdin
+        self.run_args = list(run_args)
+        # Flag lists to try, or None for the whole search space
+        self.configurations = [list(flags) for flags in configurations] if configurations is not None else None
+        self.log = log
+        self.results = []           # (seconds, flags), fastest first
+
+    def tune(self, c_code):
+        """Time every combination and return (flags, seconds) of the fastest, or None"""
+        self.results = []
+        with tempfile.TemporaryDirectory(prefix="hpc-tune-") as workdir:
+            executable = os.path.join(workdir, "program")
+            configurations = self.configurations if self.configurations is not None else search_space()
+            for flags in configurations:
+                seconds = self.measure(c_code, flags, executable)
+                if seconds is None:
+                    continue
+                self.log(f"  {seconds * 1000:9.3f} ms  {' '.join(flags)}")
+                self.results.append((seconds, flags))
+        self.results.sort(key=lambda result: result[0])
+        if not self.results:
+            return None
+        seconds, flags = self.results[0]
+        return flags, seconds
+
+    def measure(self, c_code, flags, executable):
+        """Best run time of the program built with flags, or None if it failed"""
+        cmd = ['gcc', '-x', 'c', '-'] + tuned_profile(flags).gcc_flags() + ['-o', executable]
+        result = subprocess.run(cmd, input=c_code.encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            self.log(f"  Skipping {' '.join(flags)}: gcc failed")
+            return None
+
+        best = None
+        for _ in range(self.repeat):
+            stdin = open(self.run_input, 'rb') if self.run_input else subprocess.DEVNULL
+            try:
+                start = time.perf_counter()
+                run = subprocess.run([executable] + self.run_args, stdin=stdin, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL, timeout=self.timeout)
+                elapsed = time.perf_counter() - start
+            except subprocess.TimeoutExpired:
+                self.log(f"  Skipping {' '.join(flags)}: run exceeded {self.timeout}s")
+                return None
+            finally:
+                if self.run_input:
+                    stdin.close()
+            if run.returncode != 0:
+                self.log(f"  Skipping {' '.join(flags)}: exit code {run.returncode}")
+                return None
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,103 @@
+import time
+from collections import defaultdict
+
+
+class VisitStats:
+    """Calls and time of one visit_* method or one AST node type"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cumulative = 0.0  # Seconds including nested visits, counting recursive calls once
+        self.self_time = 0.0   # Seconds excluding nested visits
+        self.active = 0        # Calls in progress, to spot recursion
+
+
+class VisitorProfiler:
+    """Records call counts and time per visit_* method and per AST node type.
+
+    attach() shadows the visit dispatch of one visitor instance, such as a
+    SemanticAnalyzer or CodeGenerator, with a timed one; every nested visit
+    goes through it, since visit_* methods recurse through self.visit.
+    Visitors that are not attached keep their class's visit, so the hook
+    costs nothing unless used.  The times include some of the profiler's
+    own overhead, so compare them with each other rather than with
+    unprofiled runs.
+    """
+
+    def __init__(self):
+        self.methods = defaultdict(VisitStats)     # "Visitor.visit_X" -> stats
+        self.node_types = defaultdict(VisitStats)  # Node class name -> stats
+        self.nested = []  # Seconds spent in nested visits, per call in progress
+
+    def attach(self, visitor):
+        """Profile the visits of a visitor; returns the visitor"""
+        visit = visitor.visit
+        owner = type(visitor).__name__
+
+        def profiled_visit(node):
+            node_type = type(node).__name__
+            method = f"visit_{node_type}"
+            if not hasattr(visitor, method):
+                method = "generic_visit"
+            entries = (self.methods[f"{owner}.{method}"], self.node_types[node_type])
+            for stats in entries:
+                stats.active += 1
+            self.nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return visit(node)
+            finally:
+                elapsed = time.perf_counter() - start
+                self_time = elapsed - self.nested.pop()
+                if self.nested:
+                    self.nested[-1] += elapsed
+                for stats in entries:
+                    stats.active -= 1
+                    stats.calls += 1
+                    stats.self_time += self_time
+                    if not stats.active:
+                        stats.cumulative += elapsed
+
+        visitor.visit = profiled_visit
+        return visitor
+
+    def detach(self, visitor):
+        """Stop profiling a visitor, restoring its class's visit"""
+        del visitor.visit
+
+    def report(self, limit=10):
+        """Return the hottest node types and visit methods, by self time, as lines of tables"""
+        lines = []
+        for title, table in (("Node type", self.node_types), ("Visit method", self.methods)):
+            hottest = sorted(table.items(), key=lambda item: item[1].self_time, reverse=True)[:limit]
+            width = max([len(title)] + [len(name) for name, _ in hottest]) + 2
+            lines.append(f"{title:<{width}}{'Calls':>9}{'Self ms':>11}{'Cum ms':>11}{'Self us/call':>14}")
+            for name, stats in hottest:
+                lines.append(f"{name:<{width}}{stats.calls:>9}{stats.self_time * 1000:>11.3f}"
+                             f"{stats.cumulative * 1000:>11.3f}{stats.self_time / stats.calls * 1e6:>14.3f}")
+            lines.append("")
+        return lines[:-1]
+
+
+# Example usage
+if __name__ == "__main__":
+    import io
+    import sys
+    from lexer import Lexer
+    from parser import Parser
+    from sem_analyser import SemanticAnalyzer
+    from generator import CodeGenerator
+
+    if len(sys.argv) != 2:
+        print("Usage: python visitor_profile.py input.hp")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        source = f.read()
+    ast = Parser(Lexer(source).tokenize()).parse()
+
+    profiler = VisitorProfiler()
+    analyzer = profiler.attach(SemanticAnalyzer())
+    result = analyzer.analyze(ast)
+    profiler.attach(CodeGenerator(result['symbol_table'])).generate_to(ast, io.StringIO())
+    print("\n".join(profiler.report()))